@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-17 02:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assignments', '0003_alter_assignment_course_alter_assignment_due_date'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='assignment',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, verbose_name='آخر تحديث'),
+        ),
+    ]
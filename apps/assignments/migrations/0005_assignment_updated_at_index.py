@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-17 03:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assignments', '0004_assignment_updated_at'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='assignment',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, verbose_name='آخر تحديث'),
+        ),
+    ]
@@ -10,6 +10,7 @@ class Assignment(models.Model):
     description = models.TextField("وصف الواجب", blank=True)
     attachment = models.FileField(upload_to="assignment_files/", blank=True, null=True)
     external_link = models.URLField(blank=True)
+    updated_at = models.DateTimeField("آخر تحديث", auto_now=True, db_index=True)
 
     def __str__(self) -> str:
         return f"{self.title} ({self.course.name})"
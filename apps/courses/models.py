@@ -4,6 +4,7 @@
 class Course(models.Model):
     name = models.CharField("اسم المقرر", max_length=200)
     description = models.TextField("الوصف", blank=True)
+    updated_at = models.DateTimeField("آخر تحديث", auto_now=True, db_index=True)
 
     def __str__(self) -> str:
         return self.name
@@ -0,0 +1,35 @@
+from django.contrib import admin, messages
+from django.utils import timezone
+
+from .models import Job
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ("id", "name", "status", "attempts", "max_attempts", "run_after", "locked_by", "finished_at")
+    list_filter = ("status", "name")
+    search_fields = ("name", "locked_by", "last_error")
+    readonly_fields = (
+        "name",
+        "payload",
+        "attempts",
+        "locked_by",
+        "locked_until",
+        "last_error",
+        "created_at",
+        "finished_at",
+    )
+    ordering = ("-id",)
+    actions = ["retry_now"]
+
+    @admin.action(description="إعادة تشغيل المهام المحددة الآن")
+    def retry_now(self, request, queryset):
+        updated = queryset.exclude(status=Job.STATUS_RUNNING).update(
+            status=Job.STATUS_QUEUED,
+            attempts=0,
+            run_after=timezone.now(),
+            locked_by="",
+            locked_until=None,
+            finished_at=None,
+        )
+        self.message_user(request, f"أعيدت جدولة {updated} مهمة.", messages.SUCCESS)
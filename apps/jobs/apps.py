@@ -0,0 +1,12 @@
+from django.apps import AppConfig
+from django.utils.module_loading import autodiscover_modules
+
+
+class JobsConfig(AppConfig):
+    default_auto_field = "django.db.models.BigAutoField"
+    name = "apps.jobs"
+    verbose_name = "المهام الخلفية"
+
+    def ready(self):
+        # كل تطبيق يسجّل معالجاته في وحدة jobs.py الخاصة به.
+        autodiscover_modules("jobs")
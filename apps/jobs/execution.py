@@ -0,0 +1,33 @@
+"""The part of a job that runs on the pool.
+
+Kept free of model imports: a process pool started with ``spawn`` imports
+this module before ``django.setup()`` has run in the child.
+"""
+import traceback
+
+import django
+from django.db import close_old_connections
+
+from .registry import RetryLater, get_handler
+
+OK = "ok"
+RETRY = "retry"
+ERROR = "error"
+
+
+def init_process():
+    django.setup()
+
+
+def execute(name: str, payload: dict):
+    """Run one handler; returns ``(outcome, detail)`` and never raises."""
+    close_old_connections()
+    try:
+        get_handler(name)(**payload)
+        return OK, ""
+    except RetryLater as exc:
+        return RETRY, exc.delay
+    except Exception:
+        return ERROR, traceback.format_exc()
+    finally:
+        close_old_connections()
@@ -0,0 +1,48 @@
+import logging
+import signal
+
+from django.core.management.base import BaseCommand
+
+from apps.jobs.registry import registered
+from apps.jobs.worker import Worker
+
+
+class Command(BaseCommand):
+    help = "تشغيل عامل ينفذ المهام الخلفية المخزنة في قاعدة البيانات."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--concurrency", type=int, default=4, help="عدد المهام التي تُنفذ في الوقت نفسه.")
+        parser.add_argument(
+            "--pool",
+            choices=["thread", "process"],
+            default="thread",
+            help="process للمهام الثقيلة على المعالج (استخراج النصوص)، thread لما عداها.",
+        )
+        parser.add_argument("--poll", type=float, default=1.0, help="ثوانٍ بين فحوص الطابور عندما يكون فارغاً.")
+        parser.add_argument("--once", action="store_true", help="تنفيذ المهام الجاهزة ثم الخروج.")
+        parser.add_argument("--max-jobs", type=int, default=0, help="الخروج بعد تنفيذ هذا العدد من المهام.")
+        parser.add_argument("--worker-id", default="", help="اسم العامل في عمود locked_by.")
+
+    def handle(self, *args, **options):
+        if options["verbosity"] > 1:
+            logging.getLogger("apps.jobs").setLevel(logging.INFO)
+        worker = Worker(
+            concurrency=options["concurrency"],
+            pool=options["pool"],
+            poll=options["poll"],
+            worker_id=options["worker_id"],
+        )
+
+        def _stop(signum, frame):
+            # إيقاف لطيف: لا تُحجز مهام جديدة وتكتمل المهام الجارية.
+            self.stdout.write("إيقاف العامل بعد إنهاء المهام الجارية...")
+            worker.stop()
+
+        signal.signal(signal.SIGTERM, _stop)
+        signal.signal(signal.SIGINT, _stop)
+        self.stdout.write(
+            f"العامل {worker.worker_id}: {options['concurrency']} ({options['pool']})؛ "
+            f"المعالجات: {', '.join(registered()) or '-'}"
+        )
+        processed = worker.run(once=options["once"], max_jobs=options["max_jobs"])
+        self.stdout.write(self.style.SUCCESS(f"نُفذت {processed} مهمة."))
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.6 on 2026-10-17 03:08
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Job',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(db_index=True, max_length=100, verbose_name='المعالج')),
+                ('payload', models.JSONField(blank=True, default=dict, verbose_name='البيانات')),
+                ('status', models.CharField(choices=[('queued', 'بالانتظار'), ('running', 'قيد التنفيذ'), ('succeeded', 'نجحت'), ('failed', 'فشلت')], default='queued', max_length=16, verbose_name='الحالة')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='المحاولات')),
+                ('max_attempts', models.PositiveIntegerField(default=5, verbose_name='أقصى عدد محاولات')),
+                ('run_after', models.DateTimeField(default=django.utils.timezone.now, verbose_name='موعد التنفيذ')),
+                ('locked_by', models.CharField(blank=True, max_length=100, verbose_name='العامل')),
+                ('locked_until', models.DateTimeField(blank=True, null=True, verbose_name='نهاية الحجز')),
+                ('last_error', models.TextField(blank=True, verbose_name='آخر خطأ')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='تاريخ الإنشاء')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='تاريخ الانتهاء')),
+            ],
+            options={
+                'verbose_name': 'مهمة خلفية',
+                'verbose_name_plural': 'المهام الخلفية',
+                'ordering': ['-id'],
+                'indexes': [models.Index(fields=['status', 'run_after'], name='job_ready_idx'), models.Index(fields=['status', 'locked_until'], name='job_lease_idx')],
+            },
+        ),
+    ]
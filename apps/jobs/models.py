@@ -0,0 +1,45 @@
+from django.db import models
+from django.utils import timezone
+
+
+class Job(models.Model):
+    """One unit of background work, claimed by a worker through a lease.
+
+    A worker owns a job while ``locked_until`` is in the future; a worker
+    that dies simply lets the lease expire and another one picks the job up.
+    """
+
+    STATUS_QUEUED = "queued"
+    STATUS_RUNNING = "running"
+    STATUS_SUCCEEDED = "succeeded"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, "بالانتظار"),
+        (STATUS_RUNNING, "قيد التنفيذ"),
+        (STATUS_SUCCEEDED, "نجحت"),
+        (STATUS_FAILED, "فشلت"),
+    ]
+
+    name = models.CharField("المعالج", max_length=100, db_index=True)
+    payload = models.JSONField("البيانات", default=dict, blank=True)
+    status = models.CharField("الحالة", max_length=16, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+    attempts = models.PositiveIntegerField("المحاولات", default=0)
+    max_attempts = models.PositiveIntegerField("أقصى عدد محاولات", default=5)
+    run_after = models.DateTimeField("موعد التنفيذ", default=timezone.now)
+    locked_by = models.CharField("العامل", max_length=100, blank=True)
+    locked_until = models.DateTimeField("نهاية الحجز", null=True, blank=True)
+    last_error = models.TextField("آخر خطأ", blank=True)
+    created_at = models.DateTimeField("تاريخ الإنشاء", auto_now_add=True)
+    finished_at = models.DateTimeField("تاريخ الانتهاء", null=True, blank=True)
+
+    class Meta:
+        ordering = ["-id"]
+        indexes = [
+            models.Index(fields=["status", "run_after"], name="job_ready_idx"),
+            models.Index(fields=["status", "locked_until"], name="job_lease_idx"),
+        ]
+        verbose_name = "مهمة خلفية"
+        verbose_name_plural = "المهام الخلفية"
+
+    def __str__(self) -> str:
+        return f"{self.name} #{self.pk} ({self.status})"
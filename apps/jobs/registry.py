@@ -0,0 +1,59 @@
+"""Handler registry and ``enqueue``.
+
+Handlers live in each app's ``jobs.py`` (imported by ``JobsConfig.ready``)::
+
+    @register("submissions.index_similarity")
+    def index_similarity(attachment_id):
+        ...
+
+``enqueue`` writes a ``Job`` row on the default database. Called inside a
+transaction, the job becomes visible to workers only when that transaction
+commits, so a worker never sees a job for a row that was rolled back.
+"""
+from datetime import timedelta
+
+from django.utils import timezone
+
+_handlers = {}
+
+
+class RetryLater(Exception):
+    """Raised by a handler to be run again after ``delay`` seconds without counting as a failure."""
+
+    def __init__(self, delay: int):
+        super().__init__(f"retry in {delay}s")
+        self.delay = delay
+
+
+def register(name: str, *, max_attempts: int = 5):
+    def decorator(func):
+        if name in _handlers and _handlers[name][0] is not func:
+            raise ValueError(f"Job handler {name!r} is already registered.")
+        _handlers[name] = (func, max_attempts)
+        return func
+
+    return decorator
+
+
+def get_handler(name: str):
+    try:
+        return _handlers[name][0]
+    except KeyError:
+        raise LookupError(f"No job handler registered as {name!r}.") from None
+
+
+def registered() -> list:
+    return sorted(_handlers)
+
+
+def enqueue(name: str, payload: dict = None, *, delay: int = 0):
+    from .models import Job
+
+    if name not in _handlers:
+        raise LookupError(f"No job handler registered as {name!r}.")
+    return Job.objects.create(
+        name=name,
+        payload=payload or {},
+        max_attempts=_handlers[name][1],
+        run_after=timezone.now() + timedelta(seconds=delay),
+    )
@@ -0,0 +1,160 @@
+"""Leasing, execution and retry bookkeeping for ``Job`` rows.
+
+Claiming is a conditional ``UPDATE ... WHERE id = %s AND <still claimable>``:
+of several workers racing for the same row exactly one sees an update
+count of 1, on SQLite as well as on databases with row locks. Results are
+written back with ``locked_by = <this worker>`` in the filter, so a worker
+whose lease expired (and whose job was taken over) cannot overwrite the
+new owner's state.
+
+Handlers run on a thread or process pool. Only the main loop touches
+``Job`` rows; the pool just calls the handler and reports the outcome as
+a plain tuple, which keeps process pools free of pickling surprises.
+"""
+import logging
+import multiprocessing
+import os
+import random
+import socket
+import threading
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .execution import ERROR, OK, RETRY, execute, init_process
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+
+def _claimable(now):
+    # مهمة بالانتظار حان موعدها، أو مهمة انتهى حجز عاملها (توقف أو انقطع).
+    return Q(status=Job.STATUS_QUEUED, run_after__lte=now) | Q(status=Job.STATUS_RUNNING, locked_until__lt=now)
+
+
+def claim(worker_id: str, limit: int) -> list:
+    now = timezone.now()
+    lease_until = now + timedelta(seconds=settings.JOBS_LEASE_SECONDS)
+    candidates = (
+        Job.objects.filter(_claimable(now)).order_by("run_after", "id").values_list("pk", flat=True)[: limit * 2]
+    )
+    claimed = []
+    for pk in candidates:
+        if len(claimed) >= limit:
+            break
+        updated = Job.objects.filter(_claimable(now), pk=pk).update(
+            status=Job.STATUS_RUNNING,
+            locked_by=worker_id,
+            locked_until=lease_until,
+            attempts=F("attempts") + 1,
+        )
+        if updated:
+            claimed.append(pk)
+    return list(Job.objects.filter(pk__in=claimed, locked_by=worker_id).order_by("run_after", "id"))
+
+
+def extend_leases(worker_id: str, job_ids) -> None:
+    if not job_ids:
+        return
+    Job.objects.filter(pk__in=job_ids, locked_by=worker_id, status=Job.STATUS_RUNNING).update(
+        locked_until=timezone.now() + timedelta(seconds=settings.JOBS_LEASE_SECONDS)
+    )
+
+
+def backoff_seconds(attempts: int) -> int:
+    delay = min(settings.JOBS_RETRY_MAX_SECONDS, settings.JOBS_RETRY_BASE_SECONDS * 2 ** max(attempts - 1, 0))
+    # تذبذب عشوائي حتى لا تعود مهام فشلت معاً في اللحظة نفسها.
+    return int(delay * random.uniform(0.8, 1.2))
+
+
+def record(worker_id: str, job: Job, outcome: str, detail) -> None:
+    now = timezone.now()
+    mine = Job.objects.filter(pk=job.pk, locked_by=worker_id, status=Job.STATUS_RUNNING)
+    if outcome == OK:
+        mine.update(status=Job.STATUS_SUCCEEDED, finished_at=now, locked_until=None, last_error="")
+    elif outcome == RETRY:
+        mine.update(
+            status=Job.STATUS_QUEUED,
+            run_after=now + timedelta(seconds=detail),
+            attempts=F("attempts") - 1,
+            locked_by="",
+            locked_until=None,
+        )
+    elif job.attempts >= job.max_attempts:
+        logger.error("Job %s failed permanently after %s attempts:\n%s", job, job.attempts, detail)
+        mine.update(status=Job.STATUS_FAILED, finished_at=now, locked_until=None, last_error=detail[-4000:])
+    else:
+        delay = backoff_seconds(job.attempts)
+        logger.warning("Job %s failed (attempt %s), retrying in %ss", job, job.attempts, delay)
+        mine.update(
+            status=Job.STATUS_QUEUED,
+            run_after=now + timedelta(seconds=delay),
+            locked_by="",
+            locked_until=None,
+            last_error=detail[-4000:],
+        )
+
+
+class Worker:
+    def __init__(self, concurrency: int = 4, pool: str = "thread", poll: float = 1.0, worker_id: str = ""):
+        self.concurrency = max(concurrency, 1)
+        self.pool = pool
+        self.poll = poll
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.processed = 0
+        self._stopping = threading.Event()
+
+    def stop(self):
+        self._stopping.set()
+
+    def _executor(self):
+        if self.pool == "process":
+            # spawn لا fork: العمليات الفرعية تفتح اتصالاتها بنفسها بدل وراثة اتصال العملية الأم.
+            return ProcessPoolExecutor(
+                max_workers=self.concurrency,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=init_process,
+            )
+        return ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="job")
+
+    def run(self, once: bool = False, max_jobs: int = 0) -> int:
+        """Process jobs until stopped; with ``once`` return when nothing is ready."""
+        inflight = {}
+        heartbeat_every = settings.JOBS_LEASE_SECONDS / 3
+        last_heartbeat = timezone.now()
+        with self._executor() as executor:
+            while True:
+                room = self.concurrency - len(inflight)
+                if max_jobs:
+                    room = min(room, max_jobs - self.processed - len(inflight))
+                if room > 0 and not self._stopping.is_set():
+                    for job in claim(self.worker_id, room):
+                        if job.attempts > job.max_attempts:
+                            # حجز انتهى أكثر من الحد المسموح؛ المعالج يتوقف أو يُسقط العامل في كل مرة.
+                            record(self.worker_id, job, ERROR, "Lease expired on every attempt.")
+                            continue
+                        inflight[executor.submit(execute, job.name, job.payload)] = job
+                if not inflight:
+                    if once or self._stopping.is_set() or (max_jobs and self.processed >= max_jobs):
+                        break
+                    self._stopping.wait(self.poll)
+                    continue
+
+                done, _ = wait(inflight, timeout=self.poll, return_when=FIRST_COMPLETED)
+                for future in done:
+                    job = inflight.pop(future)
+                    try:
+                        outcome, detail = future.result()
+                    except Exception:
+                        # العملية الفرعية انهارت قبل أن تُرجع نتيجة.
+                        outcome, detail = ERROR, traceback.format_exc()
+                    record(self.worker_id, job, outcome, detail)
+                    self.processed += 1
+                if (timezone.now() - last_heartbeat).total_seconds() >= heartbeat_every:
+                    extend_leases(self.worker_id, [job.pk for job in inflight.values()])
+                    last_heartbeat = timezone.now()
+        return self.processed
@@ -4,4 +4,7 @@ from django.apps import AppConfig
 class MessagingConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "apps.messaging"
-    verbose_name = "\u0627\u0644\u062f\u0631\u062f\u0634\u0629"
\ No newline at end of file
+    verbose_name = "\u0627\u0644\u062f\u0631\u062f\u0634\u0629"
+
+    def ready(self):
+        from . import signals  # noqa
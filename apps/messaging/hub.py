@@ -0,0 +1,218 @@
+"""In-process publish/subscribe hub for chat events.
+
+Every worker process owns one ``hub``. Subscribers (the SSE endpoint)
+register on a channel such as ``conversation:12``; publishers
+(``Message`` creation) push small JSON-able dicts to a channel. A local
+Unix datagram bus fans every published event out to the other worker
+processes on the same host so a subscriber connected to worker A sees a
+message written by worker B.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import queue
+import socket
+import threading
+from pathlib import Path
+from typing import Optional
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# A datagram larger than this is sent without the message body; receivers
+# then load the message from the database instead.
+BUS_MAX_DATAGRAM = 60 * 1024
+
+
+def conversation_channel(conversation_id: int) -> str:
+    return f"conversation:{conversation_id}"
+
+
+class Subscription:
+    def __init__(self, hub: "Hub", channels: tuple[str, ...], loop: Optional[asyncio.AbstractEventLoop] = None):
+        self.hub = hub
+        self.channels = channels
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._loop = loop
+        self._ready = asyncio.Event() if loop is not None else None
+
+    def deliver(self, event: dict) -> None:
+        self._queue.put(event)
+        if self._loop is not None:
+            try:
+                self._loop.call_soon_threadsafe(self._ready.set)
+            except RuntimeError:
+                # الحلقة أُغلقت؛ سيتم إلغاء الاشتراك عند إغلاق الاستجابة.
+                pass
+
+    def get(self, timeout: float) -> Optional[dict]:
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    async def aget(self, timeout: float) -> Optional[dict]:
+        try:
+            return self._queue.get_nowait()
+        except queue.Empty:
+            pass
+        self._ready.clear()
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        try:
+            return self._queue.get_nowait()
+        except queue.Empty:
+            return None
+
+    def close(self) -> None:
+        self.hub.unsubscribe(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class SocketBus:
+    """Fan events out to sibling workers through Unix datagram sockets.
+
+    Each process binds ``<CHAT_BUS_DIR>/<pid>.sock`` and a daemon thread
+    forwards whatever arrives there to the local hub. Publishing sends one
+    datagram to every other socket in the directory; sockets left behind
+    by dead workers are removed on the first failed send.
+    """
+
+    def __init__(self, hub: "Hub", directory: Path):
+        self.hub = hub
+        self.directory = Path(directory)
+        self.path = self.directory / f"{os.getpid()}.sock"
+        self._sender: Optional[socket.socket] = None
+        self._receiver: Optional[socket.socket] = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def is_supported() -> bool:
+        return hasattr(socket, "AF_UNIX")
+
+    def _ensure_directory(self) -> None:
+        self.directory.mkdir(mode=0o700, parents=True, exist_ok=True)
+
+    def start(self) -> None:
+        with self._lock:
+            if self._receiver is not None:
+                return
+            self._ensure_directory()
+            try:
+                self.path.unlink()
+            except FileNotFoundError:
+                pass
+            receiver = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+            receiver.bind(str(self.path))
+            self._receiver = receiver
+        thread = threading.Thread(target=self._listen, name="chat-bus", daemon=True)
+        thread.start()
+
+    def _listen(self) -> None:
+        while True:
+            try:
+                data = self._receiver.recv(BUS_MAX_DATAGRAM + 1024)
+            except OSError:
+                return
+            try:
+                envelope = json.loads(data)
+                self.hub.dispatch(envelope["channel"], envelope["event"])
+            except (ValueError, KeyError, TypeError):
+                logger.warning("Discarding malformed chat bus datagram.")
+
+    def send(self, channel: str, event: dict) -> None:
+        data = json.dumps({"channel": channel, "event": event}).encode()
+        if len(data) > BUS_MAX_DATAGRAM:
+            event = {key: value for key, value in event.items() if key != "message"}
+            data = json.dumps({"channel": channel, "event": event}).encode()
+        try:
+            peers = [entry for entry in self.directory.glob("*.sock") if entry != self.path]
+        except OSError:
+            return
+        if not peers:
+            return
+        with self._lock:
+            if self._sender is None:
+                self._sender = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+                self._sender.setblocking(False)
+            sender = self._sender
+        for peer in peers:
+            try:
+                sender.sendto(data, str(peer))
+            except (ConnectionRefusedError, FileNotFoundError):
+                try:
+                    peer.unlink()
+                except OSError:
+                    pass
+            except BlockingIOError:
+                logger.warning("Chat bus peer %s is not draining; event dropped.", peer.name)
+            except OSError as exc:
+                logger.warning("Chat bus send to %s failed: %s", peer.name, exc)
+
+
+class Hub:
+    def __init__(self):
+        self._subscribers: dict[str, set[Subscription]] = {}
+        self._lock = threading.Lock()
+        self._bus: Optional[SocketBus] = None
+        self._bus_checked = False
+
+    @property
+    def bus(self) -> Optional[SocketBus]:
+        if not self._bus_checked:
+            with self._lock:
+                if not self._bus_checked:
+                    directory = getattr(settings, "CHAT_BUS_DIR", None)
+                    if directory and SocketBus.is_supported():
+                        self._bus = SocketBus(self, directory)
+                    self._bus_checked = True
+        return self._bus
+
+    def subscribe(self, *channels: str, loop: Optional[asyncio.AbstractEventLoop] = None) -> Subscription:
+        bus = self.bus
+        if bus is not None:
+            try:
+                bus.start()
+            except OSError as exc:
+                logger.warning("Chat bus unavailable, serving local events only: %s", exc)
+        subscription = Subscription(self, tuple(channels), loop=loop)
+        with self._lock:
+            for channel in channels:
+                self._subscribers.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            for channel in subscription.channels:
+                subscribers = self._subscribers.get(channel)
+                if not subscribers:
+                    continue
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[channel]
+
+    def dispatch(self, channel: str, event: dict) -> None:
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for subscription in subscribers:
+            subscription.deliver(event)
+
+    def publish(self, channel: str, event: dict) -> None:
+        self.dispatch(channel, event)
+        bus = self.bus
+        if bus is not None:
+            bus.send(channel, event)
+
+
+hub = Hub()
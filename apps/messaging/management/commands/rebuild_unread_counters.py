@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from apps.messaging.models import Conversation
+
+
+class Command(BaseCommand):
+    help = "إعادة حساب عدادات الرسائل غير المقروءة لكل محادثة من جدول الرسائل."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--conversation",
+            type=int,
+            action="append",
+            dest="conversations",
+            help="رقم محادثة محددة (يمكن تكراره). الافتراضي: كل المحادثات.",
+        )
+
+    def handle(self, *args, **options):
+        queryset = Conversation.objects.all()
+        if options["conversations"]:
+            queryset = queryset.filter(pk__in=options["conversations"])
+        updated = Conversation.rebuild_unread_counters(queryset)
+        self.stdout.write(self.style.SUCCESS(f"تمت إعادة حساب العدادات لـ {updated} محادثة."))
@@ -0,0 +1,178 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import OuterRef, Subquery
+
+from apps.messaging.models import Conversation, Message
+from apps.messaging.routers import MESSAGING_DB
+
+# المحادثات أولاً ثم الرسائل؛ قيد last_message مؤجل حتى نهاية المعاملة.
+MODELS = (Conversation, Message)
+
+
+class Command(BaseCommand):
+    help = (
+        "نسخ المحادثات والرسائل من القاعدة الافتراضية إلى قاعدة الدردشة المستقلة. "
+        "شغّل migrate --database=messaging قبلها. تُفرَّغ الجداول القديمة بعد النسخ لأن قيودها "
+        "على جدول المستخدمين تمنع حذفهم لاحقاً."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--source", default=DEFAULT_DB_ALIAS, help="القاعدة التي تحوي بيانات الدردشة الحالية.")
+        parser.add_argument("--target", default=MESSAGING_DB, help="قاعدة الدردشة الجديدة.")
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--replace",
+            action="store_true",
+            help="حذف ما في قاعدة الهدف قبل النسخ بدلاً من رفض التنفيذ.",
+        )
+        parser.add_argument(
+            "--keep-source",
+            action="store_true",
+            help="إبقاء الصفوف في قاعدة المصدر بعد النسخ.",
+        )
+
+    def handle(self, *args, **options):
+        source, target = options["source"], options["target"]
+        if source == target:
+            raise CommandError("قاعدة المصدر والهدف متطابقتان.")
+
+        source_tables = connections[source].introspection.table_names()
+        target_tables = connections[target].introspection.table_names()
+        for model in MODELS:
+            if model._meta.db_table not in source_tables:
+                self.stdout.write(f"لا يوجد جدول {model._meta.db_table} في {source}؛ لا شيء لنسخه.")
+                return
+            if model._meta.db_table not in target_tables:
+                raise CommandError(f"قاعدة {target} غير مهيأة. شغّل: python manage.py migrate --database={target}")
+
+        if not Conversation.objects.using(source).exists():
+            self.stdout.write(f"لا توجد محادثات في {source}؛ لا شيء لنسخه.")
+            return
+
+        with transaction.atomic(using=target):
+            if Conversation.objects.using(target).exists() or Message.objects.using(target).exists():
+                if not options["replace"]:
+                    raise CommandError(f"قاعدة {target} تحتوي بيانات دردشة. استخدم --replace لاستبدالها.")
+                Conversation.objects.using(target).update(last_message=None)
+                Message.objects.using(target).all().delete()
+                Conversation.objects.using(target).all().delete()
+
+            # في تثبيت قائم طُبّقت هجرات الدردشة على قاعدة الهدف فقط، فجداول المصدر قد تكون بمخطط 0001.
+            source_columns = {model: self._columns(source, model) for model in MODELS}
+            copied = {
+                model: self._copy(model, source, target, source_columns[model], options["batch_size"]) for model in MODELS
+            }
+            self._rebuild_derived(source, target, source_columns, options["batch_size"])
+            self._reset_sequences(target)
+
+        for model, count in copied.items():
+            self.stdout.write(f"{model._meta.verbose_name_plural}: {count}")
+
+        if not options["keep_source"]:
+            self._clear_source(source)
+            self.stdout.write(f"تم تفريغ جداول الدردشة في {source}.")
+        self.stdout.write(self.style.SUCCESS(f"تم نقل بيانات الدردشة من {source} إلى {target}."))
+
+    def _columns(self, alias, model) -> set:
+        connection = connections[alias]
+        with connection.cursor() as cursor:
+            description = connection.introspection.get_table_description(cursor, model._meta.db_table)
+        return {column.name for column in description}
+
+    def _copy(self, model, source, target, source_columns, batch_size) -> int:
+        # نسخ القيم كما هي عبر SQL مباشر؛ bulk_create كان سيعيد ضبط حقول auto_now_add.
+        fields = model._meta.concrete_fields
+        present = [field for field in fields if field.column in source_columns]
+        # الأعمدة المشتقة غير الموجودة في المصدر تأخذ قيمتها الافتراضية ثم يعيد _rebuild_derived حسابها.
+        defaults = {field: field.get_default() for field in fields if field.column not in source_columns}
+        columns = [field.column for field in fields]
+        connection = connections[target]
+        quote = connection.ops.quote_name
+        sql = "INSERT INTO {} ({}) VALUES ({})".format(
+            quote(model._meta.db_table),
+            ", ".join(quote(column) for column in columns),
+            ", ".join(["%s"] * len(columns)),
+        )
+        rows = (
+            model._base_manager.using(source)
+            .order_by("pk")
+            .values_list(*[field.attname for field in present])
+            .iterator(chunk_size=batch_size)
+        )
+        count = 0
+        batch = []
+        with connection.cursor() as cursor:
+            for row in rows:
+                values = {**defaults, **dict(zip(present, row))}
+                batch.append([field.get_db_prep_value(values[field], connection) for field in fields])
+                if len(batch) >= batch_size:
+                    cursor.executemany(sql, batch)
+                    count += len(batch)
+                    batch = []
+            if batch:
+                cursor.executemany(sql, batch)
+                count += len(batch)
+        return count
+
+    def _rebuild_derived(self, source, target, source_columns, batch_size) -> None:
+        """Recompute in ``target`` what migrations 0002-0004 would have backfilled in ``source``."""
+        conversations = Conversation.objects.using(target)
+        if "student_last_read_id" not in source_columns[Conversation]:
+            self._watermarks_from_flags(source, target, source_columns[Message], batch_size)
+        if "last_message_id" not in source_columns[Conversation]:
+            latest = Message.objects.using(target).filter(conversation=OuterRef("pk")).order_by("-pk")
+            conversations.update(
+                last_message=Subquery(latest.values("pk")[:1]),
+                last_message_at=Subquery(latest.values("created_at")[:1]),
+            )
+        # العدادات مشتقة من العلامات دائماً، فإعادة حسابها تصحح أي قيمة قديمة في المصدر.
+        Conversation.rebuild_unread_counters(conversations)
+
+    def _watermarks_from_flags(self, source, target, message_columns, batch_size) -> None:
+        # القاعدة نفسها في الهجرة 0003: العلامة تتوقف قبل أول رسالة لم يقرأها هذا الطرف.
+        # الأعلام حُذفت من النموذج، لذلك تُقرأ بـ SQL مباشر.
+        connection = connections[source]
+        quote = connection.ops.quote_name
+        first_unread = {
+            side: (
+                f"MIN(CASE WHEN m.sender_id <> c.{side}_id AND NOT m.is_read_by_{side} THEN m.id END)"
+                if f"is_read_by_{side}" in message_columns
+                else "NULL"
+            )
+            for side in ("student", "teacher")
+        }
+        sql = (
+            f"SELECT c.id, MAX(m.id), {first_unread['student']}, {first_unread['teacher']} "
+            f"FROM {quote(Conversation._meta.db_table)} c "
+            f"LEFT JOIN {quote(Message._meta.db_table)} m ON m.conversation_id = c.id GROUP BY c.id"
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql)
+            conversations = [
+                Conversation(
+                    pk=pk,
+                    student_last_read_id=student_first - 1 if student_first else latest or 0,
+                    teacher_last_read_id=teacher_first - 1 if teacher_first else latest or 0,
+                )
+                for pk, latest, student_first, teacher_first in cursor.fetchall()
+            ]
+        Conversation.objects.using(target).bulk_update(
+            conversations, ["student_last_read_id", "teacher_last_read_id"], batch_size=batch_size
+        )
+
+    def _clear_source(self, source) -> None:
+        # SQL مباشر لأن مخطط المصدر قد لا يطابق النموذج (لا عمود last_message قبل 0004).
+        connection = connections[source]
+        quote = connection.ops.quote_name
+        with transaction.atomic(using=source), connection.cursor() as cursor:
+            for model in reversed(MODELS):
+                cursor.execute(f"DELETE FROM {quote(model._meta.db_table)}")
+
+    def _reset_sequences(self, target) -> None:
+        connection = connections[target]
+        statements = connection.ops.sequence_reset_sql(no_style(), list(MODELS))
+        if statements:
+            with connection.cursor() as cursor:
+                for statement in statements:
+                    cursor.execute(statement)
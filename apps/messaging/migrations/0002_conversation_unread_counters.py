@@ -0,0 +1,49 @@
+# Generated by Django 5.2.6 on 2026-10-17 02:45
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def populate_unread_counters(apps, schema_editor):
+    Conversation = apps.get_model("messaging", "Conversation")
+    Message = apps.get_model("messaging", "Message")
+
+    def unread(flag, participant):
+        return Coalesce(
+            Subquery(
+                Message.objects.filter(conversation=OuterRef("pk"), **{flag: False})
+                .exclude(sender=OuterRef(participant))
+                .order_by()
+                .values("conversation")
+                .annotate(count=Count("pk"))
+                .values("count")
+            ),
+            0,
+        )
+
+    Conversation.objects.update(
+        student_unread=unread("is_read_by_student", "student"),
+        teacher_unread=unread("is_read_by_teacher", "teacher"),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('messaging', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversation',
+            name='student_unread',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='teacher_unread',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(populate_unread_counters, migrations.RunPython.noop),
+    ]
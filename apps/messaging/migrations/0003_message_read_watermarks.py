@@ -0,0 +1,78 @@
+# Generated by Django 5.2.6 on 2026-10-17 02:46
+
+from django.db import migrations, models
+from django.db.models import Count, Max, Min, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def flags_to_watermarks(apps, schema_editor):
+    Conversation = apps.get_model("messaging", "Conversation")
+    Message = apps.get_model("messaging", "Message")
+
+    for conversation in Conversation.objects.all().iterator():
+        messages = Message.objects.filter(conversation=conversation)
+        latest = messages.aggregate(latest=Max("pk"))["latest"] or 0
+        for side in ("student", "teacher"):
+            # العلامة تتوقف قبل أول رسالة لم يقرأها هذا الطرف.
+            first_unread = (
+                messages.exclude(sender_id=getattr(conversation, f"{side}_id"))
+                .filter(**{f"is_read_by_{side}": False})
+                .aggregate(first=Min("pk"))["first"]
+            )
+            watermark = first_unread - 1 if first_unread else latest
+            setattr(conversation, f"{side}_last_read_id", watermark)
+        conversation.save(update_fields=["student_last_read_id", "teacher_last_read_id"])
+
+    def unread(side):
+        return Coalesce(
+            Subquery(
+                Message.objects.filter(conversation=OuterRef("pk"), pk__gt=OuterRef(f"{side}_last_read_id"))
+                .exclude(sender=OuterRef(side))
+                .order_by()
+                .values("conversation")
+                .annotate(count=Count("pk"))
+                .values("count")
+            ),
+            0,
+        )
+
+    Conversation.objects.update(student_unread=unread("student"), teacher_unread=unread("teacher"))
+
+
+def watermarks_to_flags(apps, schema_editor):
+    Conversation = apps.get_model("messaging", "Conversation")
+    Message = apps.get_model("messaging", "Message")
+
+    for conversation in Conversation.objects.all().iterator():
+        messages = Message.objects.filter(conversation=conversation)
+        messages.filter(pk__lte=conversation.student_last_read_id).update(is_read_by_student=True)
+        messages.filter(pk__lte=conversation.teacher_last_read_id).update(is_read_by_teacher=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('messaging', '0002_conversation_unread_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversation',
+            name='student_last_read_id',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='teacher_last_read_id',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.RunPython(flags_to_watermarks, watermarks_to_flags),
+        migrations.RemoveField(
+            model_name='message',
+            name='is_read_by_student',
+        ),
+        migrations.RemoveField(
+            model_name='message',
+            name='is_read_by_teacher',
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.6 on 2026-10-17 02:47
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def populate_last_message(apps, schema_editor):
+    Conversation = apps.get_model("messaging", "Conversation")
+    Message = apps.get_model("messaging", "Message")
+    for conversation in Conversation.objects.all().iterator():
+        latest = Message.objects.filter(conversation=conversation).order_by("-pk").first()
+        if latest is None:
+            continue
+        conversation.last_message = latest
+        conversation.last_message_at = latest.created_at
+        conversation.save(update_fields=["last_message", "last_message_at"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assignments', '0003_alter_assignment_course_alter_assignment_due_date'),
+        ('messaging', '0003_message_read_watermarks'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversation',
+            name='last_message',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='messaging.message'),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='last_message_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(populate_last_message, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='conversation',
+            index=models.Index(fields=['student', '-last_message_at'], name='conv_student_activity_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='conversation',
+            index=models.Index(fields=['teacher', '-last_message_at'], name='conv_teacher_activity_idx'),
+        ),
+    ]
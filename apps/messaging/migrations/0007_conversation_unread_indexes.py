@@ -0,0 +1,24 @@
+# Generated by Django 5.2.6 on 2026-10-17 03:46
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assignments', '0005_assignment_updated_at_index'),
+        ('messaging', '0006_cross_database_relations'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='conversation',
+            index=models.Index(fields=['student', 'student_unread'], name='conv_student_unread_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='conversation',
+            index=models.Index(fields=['teacher', 'teacher_unread'], name='conv_teacher_unread_idx'),
+        ),
+    ]
@@ -1,26 +1,95 @@
-﻿from django.contrib.auth import get_user_model
+﻿from typing import Optional
+
+from django.contrib.auth import get_user_model
 from django.db import models
+from django.db.models import Case, Count, F, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce, Least
+from django.utils import timezone
 
 from apps.assignments.models import Assignment
 
 User = get_user_model()
 
 
+class ConversationQuerySet(models.QuerySet):
+    def for_user(self, user):
+        return self.filter(Q(student=user) | Q(teacher=user))
+
+    def with_unread(self, user):
+        return self.annotate(
+            unread=Case(
+                When(student=user, then=F("student_unread")),
+                default=F("teacher_unread"),
+            )
+        )
+
+    def inbox(self, user):
+        """The user's conversations, newest activity first.
+
+        Each row carries ``unread`` plus the last message. Users and
+        assignments live in the default database, so they are prefetched
+        (one query each) instead of joined.
+        """
+        return (
+            self.for_user(user)
+            .with_unread(user)
+            .select_related("last_message")
+            .prefetch_related("student", "teacher", "assignment", "last_message__sender")
+            .order_by(F("last_message_at").desc(nulls_last=True), "-created_at")
+        )
+
+
 class Conversation(models.Model):
-    student = models.ForeignKey(User, on_delete=models.CASCADE, related_name="conv_as_student")
-    teacher = models.ForeignKey(User, on_delete=models.CASCADE, related_name="conv_as_teacher")
+    # المستخدمون والواجبات في القاعدة الافتراضية؛ الحذف المتسلسل تتولاه apps.messaging.signals.
+    student = models.ForeignKey(
+        User,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name="conv_as_student",
+    )
+    teacher = models.ForeignKey(
+        User,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name="conv_as_teacher",
+    )
     assignment = models.ForeignKey(
         Assignment,
-        on_delete=models.SET_NULL,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
         null=True,
         blank=True,
         related_name="conversations",
     )
     created_at = models.DateTimeField(auto_now_add=True)
+    # عدادات غير المقروء لكل طرف؛ تزداد عند إنشاء رسالة وتُصفّر عند القراءة.
+    student_unread = models.PositiveIntegerField(default=0)
+    teacher_unread = models.PositiveIntegerField(default=0)
+    # آخر رسالة قرأها كل طرف؛ كل رسالة رقمها أكبر من العلامة تعتبر غير مقروءة.
+    student_last_read_id = models.PositiveBigIntegerField(default=0)
+    teacher_last_read_id = models.PositiveBigIntegerField(default=0)
+    # نسخة مكررة من آخر رسالة لترتيب صندوق الوارد وعرض المعاينة دون استعلامات إضافية.
+    last_message = models.ForeignKey(
+        "Message",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+",
+    )
+    last_message_at = models.DateTimeField(null=True, blank=True)
+
+    objects = ConversationQuerySet.as_manager()
 
     class Meta:
         unique_together = (("student", "teacher", "assignment"),)
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["student", "-last_message_at"], name="conv_student_activity_idx"),
+            models.Index(fields=["teacher", "-last_message_at"], name="conv_teacher_activity_idx"),
+            # يغطيان مجموع غير المقروء لكل طرف فيُحسب من الفهرس وحده.
+            models.Index(fields=["student", "student_unread"], name="conv_student_unread_idx"),
+            models.Index(fields=["teacher", "teacher_unread"], name="conv_teacher_unread_idx"),
+        ]
 
     def __str__(self) -> str:
         suffix = f" | {self.assignment.title}" if self.assignment_id else ""
@@ -29,32 +98,135 @@ class Conversation(models.Model):
     def is_participant(self, user) -> bool:
         return bool(user and user.is_authenticated and user.id in (self.student_id, self.teacher_id))
 
+    def side_for(self, user) -> Optional[str]:
+        if not user or not user.is_authenticated:
+            return None
+        if user.id == self.student_id:
+            return "student"
+        if user.id == self.teacher_id:
+            return "teacher"
+        return None
+
+    def unread_for(self, user) -> int:
+        side = self.side_for(user)
+        return getattr(self, f"{side}_unread") if side else 0
+
+    def last_read_id_for(self, user) -> int:
+        side = self.side_for(user)
+        return getattr(self, f"{side}_last_read_id") if side else 0
+
+    def _mark_read_update(self, user, upto: Optional[int]):
+        side = self.side_for(user)
+        if side is None:
+            return None, None, {}
+        watermark = f"{side}_last_read_id"
+        counter = f"{side}_unread"
+        if upto is None:
+            target = F("last_message_id")
+            updates = {watermark: target, counter: 0}
+        else:
+            # upto يأتي من العميل؛ العلامة لا تتجاوز آخر رسالة وإلا عُدّت الرسائل القادمة مقروءة.
+            target = Least(Value(upto), Coalesce(F("last_message_id"), 0))
+            outer_target = Least(Value(upto), Coalesce(OuterRef("last_message_id"), 0))
+            updates = {watermark: target, counter: _unread_after(outer_target, user.id)}
+        queryset = Conversation.objects.filter(pk=self.pk, **{f"{watermark}__lt": target})
+        return watermark, queryset, updates
+
+    def mark_read(self, user, upto: Optional[int] = None) -> bool:
+        """Advance the user's read watermark with a single conditional UPDATE.
+
+        Without ``upto`` the watermark moves to the newest message; with it,
+        to ``upto`` but never past the newest message. Returns ``True`` when
+        the watermark actually moved.
+        """
+        watermark, queryset, updates = self._mark_read_update(user, upto)
+        if queryset is None:
+            return False
+        moved = queryset.update(**updates)
+        if moved and upto is not None:
+            setattr(self, watermark, min(upto, self.last_message_id or 0))
+        return bool(moved)
+
+    async def amark_read(self, user, upto: Optional[int] = None) -> bool:
+        watermark, queryset, updates = self._mark_read_update(user, upto)
+        if queryset is None:
+            return False
+        moved = await queryset.aupdate(**updates)
+        if moved and upto is not None:
+            setattr(self, watermark, min(upto, self.last_message_id or 0))
+        return bool(moved)
+
+    @classmethod
+    def _unread_sides(cls, user):
+        # مجموع لكل طرف بدل شرط OR، فيقرأ كل منهما فهرس (الطرف، العداد) دون صفوف المحادثات.
+        return [
+            (cls.objects.filter(**{side: user}), Sum(f"{side}_unread"))
+            for side in ("student", "teacher")
+        ]
+
+    @classmethod
+    def unread_total(cls, user) -> int:
+        return sum(queryset.aggregate(total=total)["total"] or 0 for queryset, total in cls._unread_sides(user))
+
+    @classmethod
+    async def aunread_total(cls, user) -> int:
+        unread = 0
+        for queryset, total in cls._unread_sides(user):
+            unread += (await queryset.aaggregate(total=total))["total"] or 0
+        return unread
+
+    @classmethod
+    def rebuild_unread_counters(cls, queryset=None) -> int:
+        queryset = cls.objects.all() if queryset is None else queryset
+        return queryset.update(
+            student_unread=_unread_after(OuterRef("student_last_read_id"), OuterRef("student")),
+            teacher_unread=_unread_after(OuterRef("teacher_last_read_id"), OuterRef("teacher")),
+        )
+
+
+def _unread_after(watermark, reader):
+    """Count of the conversation's messages newer than ``watermark`` not sent by ``reader``."""
+    return Coalesce(
+        Subquery(
+            Message.objects.filter(conversation=OuterRef("pk"), pk__gt=watermark)
+            .exclude(sender=reader)
+            .order_by()
+            .values("conversation")
+            .annotate(count=Count("pk"))
+            .values("count")
+        ),
+        0,
+    )
+
 
 class Message(models.Model):
     conversation = models.ForeignKey(Conversation, on_delete=models.CASCADE, related_name="messages")
-    sender = models.ForeignKey(User, on_delete=models.CASCADE, related_name="messages_sent")
+    sender = models.ForeignKey(
+        User,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name="messages_sent",
+    )
     text = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
-    is_read_by_student = models.BooleanField(default=False)
-    is_read_by_teacher = models.BooleanField(default=False)
 
     class Meta:
         ordering = ["created_at"]
+        indexes = [
+            models.Index(fields=["conversation", "id"], name="message_conv_keyset_idx"),
+        ]
 
     def __str__(self) -> str:
         return f"msg#{self.pk} by {self.sender.username}"
 
-    def mark_read_for(self, user) -> None:
-        if not user or not user.is_authenticated:
-            return
-        role = getattr(getattr(user, "profile", None), "role", "student" if not user.is_staff else "teacher")
-        if role == "student" and not self.is_read_by_student:
-            self.is_read_by_student = True
-            self.save(update_fields=["is_read_by_student"])
-        elif role != "student" and not self.is_read_by_teacher:
-            self.is_read_by_teacher = True
-            self.save(update_fields=["is_read_by_teacher"])
-
-    def is_read_for(self, user) -> bool:
-        role = getattr(getattr(user, "profile", None), "role", "student" if not user.is_staff else "teacher")
-        return self.is_read_by_student if role == "student" else self.is_read_by_teacher
+    def as_payload(self, viewer=None) -> dict:
+        payload = {
+            "id": self.id,
+            "text": self.text,
+            "sender": self.sender.username,
+            "sender_id": self.sender_id,
+            "created": timezone.localtime(self.created_at).strftime("%Y-%m-%d %H:%M"),
+        }
+        if viewer is not None:
+            payload["mine"] = self.sender_id == viewer.id
+        return payload
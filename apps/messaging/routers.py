@@ -0,0 +1,46 @@
+"""Keep the chat tables in their own database.
+
+SQLite serialises every write on one file lock, so a burst of chat
+messages used to stall submission uploads and grading. ``MessagingRouter``
+sends every ``apps.messaging`` model to ``MESSAGING_DB`` and everything
+else to the default database.
+
+Relations from messaging rows to users and assignments cross the two
+databases: they are declared with ``db_constraint=False`` and
+``on_delete=DO_NOTHING``, and the deletes are mirrored by the receivers in
+``apps.messaging.signals``. Queries must not join across them, so use
+``prefetch_related`` rather than ``select_related`` for those fields.
+"""
+from django.db import DEFAULT_DB_ALIAS
+
+APP_LABEL = "messaging"
+MESSAGING_DB = "messaging"
+
+
+class MessagingRouter:
+    def _is_messaging(self, model) -> bool:
+        return model._meta.app_label == APP_LABEL
+
+    def db_for_read(self, model, **hints):
+        if self._is_messaging(model):
+            return MESSAGING_DB
+        instance = hints.get("instance")
+        if instance is not None and instance._state.db == MESSAGING_DB:
+            # ``message.sender`` وما شابه: الكائن المرتبط يعيش في القاعدة الافتراضية
+            # وليس في قاعدة الكائن الذي طلبه.
+            return DEFAULT_DB_ALIAS
+        return None
+
+    db_for_write = db_for_read
+
+    def allow_relation(self, obj1, obj2, **hints):
+        if self._is_messaging(obj1) or self._is_messaging(obj2):
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if app_label == APP_LABEL:
+            return db == MESSAGING_DB
+        if db == MESSAGING_DB:
+            return False
+        return None
@@ -0,0 +1,58 @@
+from django.contrib.auth import get_user_model
+from django.db import models, transaction
+from django.db.models import Case, F, Q, Value, When
+from django.db.models.signals import post_save, pre_delete
+from django.dispatch import receiver
+
+from apps.assignments.models import Assignment
+
+from .hub import conversation_channel, hub
+from .models import Conversation, Message
+
+
+def publish_message(message: Message) -> None:
+    conversation = message.conversation
+    event = {
+        "type": "message",
+        "conversation": conversation.id,
+        "id": message.id,
+        "message": message.as_payload(),
+    }
+    hub.publish(conversation_channel(conversation.id), event)
+
+
+@receiver(post_save, sender=Message)
+def message_created(sender, instance, created, **kwargs):
+    if not created:
+        return
+    conversation = instance.conversation
+    counter = "teacher_unread" if instance.sender_id == conversation.student_id else "student_unread"
+    # مع إرسالين متزامنين قد يصل حفظ الرسالة الأقدم أخيراً؛ لا تحل محل رسالة أحدث منها.
+    # تحديث واحد للعداد وآخر رسالة معاً، فلا يفصل بينهما mark_read يصفّر العداد.
+    newer = Q(last_message__isnull=True) | Q(last_message_id__lt=instance.pk)
+    Conversation.objects.filter(pk=conversation.pk).update(
+        last_message=Case(
+            When(newer, then=Value(instance.pk)),
+            default=F("last_message"),
+            output_field=models.BigIntegerField(),
+        ),
+        last_message_at=Case(
+            When(newer, then=Value(instance.created_at)),
+            default=F("last_message_at"),
+            output_field=models.DateTimeField(),
+        ),
+        **{counter: F(counter) + 1},
+    )
+    transaction.on_commit(lambda: publish_message(instance), using=instance._state.db)
+
+
+# الحذف المتسلسل لا يعبر بين قاعدتي البيانات، فنكرره هنا يدوياً.
+@receiver(pre_delete, sender=get_user_model())
+def user_deleted(sender, instance, **kwargs):
+    Conversation.objects.for_user(instance).delete()
+    Message.objects.filter(sender=instance).delete()
+
+
+@receiver(pre_delete, sender=Assignment)
+def assignment_deleted(sender, instance, **kwargs):
+    Conversation.objects.filter(assignment=instance).update(assignment=None)
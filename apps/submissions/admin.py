@@ -1,12 +1,12 @@
 ﻿from django.contrib import admin
 
-from .models import Submission, SubmissionAttachment
+from .models import SimilarityMatch, StoredBlob, Submission, SubmissionAttachment, ZipManifest
 
 
 class SubmissionAttachmentInline(admin.TabularInline):
     model = SubmissionAttachment
     extra = 0
-    readonly_fields = ("size_bytes", "sha256")
+    readonly_fields = ("original_name", "size_bytes", "sha256")
 
 
 @admin.register(Submission)
@@ -19,5 +19,25 @@ class SubmissionAdmin(admin.ModelAdmin):
 
 @admin.register(SubmissionAttachment)
 class SubmissionAttachmentAdmin(admin.ModelAdmin):
-    list_display = ("id", "submission", "size_bytes", "sha256")
-    search_fields = ("submission__user__username", "sha256")
+    list_display = ("id", "submission", "original_name", "size_bytes", "sha256")
+    search_fields = ("submission__user__username", "original_name", "sha256")
+
+
+@admin.register(StoredBlob)
+class StoredBlobAdmin(admin.ModelAdmin):
+    list_display = ("sha256", "size_bytes", "ref_count", "copies", "created_at")
+    search_fields = ("sha256",)
+    readonly_fields = ("sha256", "size_bytes", "ref_count", "copies", "created_at")
+
+
+@admin.register(ZipManifest)
+class ZipManifestAdmin(admin.ModelAdmin):
+    list_display = ("sha256", "entry_count", "total_size", "error", "created_at")
+    search_fields = ("sha256",)
+    readonly_fields = ("sha256", "entries", "entry_count", "total_size", "error", "created_at")
+
+
+@admin.register(SimilarityMatch)
+class SimilarityMatchAdmin(admin.ModelAdmin):
+    list_display = ("first_sha256", "second_sha256", "score", "created_at")
+    search_fields = ("first_sha256", "second_sha256")
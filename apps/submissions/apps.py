@@ -5,3 +5,6 @@ class SubmissionsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "apps.submissions"
     verbose_name = "التسليمات"
+
+    def ready(self):
+        from . import signals  # noqa
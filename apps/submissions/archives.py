@@ -0,0 +1,91 @@
+"""Listings of ``.zip`` attachments and on-demand extraction of single members.
+
+``zipfile`` only reads the end-of-archive record and the central directory
+when it opens a file, so ``read_manifest`` costs a couple of small reads
+however large the archive is. The listing is cached in ``ZipManifest`` by
+content ``sha256``; ``member_chunks`` later seeks straight to one member's
+local header and decompresses it as a stream.
+"""
+import logging
+import zipfile
+
+logger = logging.getLogger(__name__)
+
+# أرشيف بعدد مدخلات أكبر من هذا يُفهرس جزئياً؛ الصفحة لا تعرض أكثر منه على أي حال.
+MAX_ENTRIES = 5000
+READ_CHUNK = 256 * 1024
+# يحمي من أرشيف صغير يحوي ملفاً ضخماً بعد الفك (zip bomb).
+MAX_MEMBER_BYTES = 100 * 1024 * 1024
+
+
+def read_manifest(path: str) -> dict:
+    with zipfile.ZipFile(path) as archive:
+        infos = archive.infolist()
+    entries = [
+        {
+            "name": info.filename,
+            "size": info.file_size,
+            "compressed": info.compress_size,
+            "crc": f"{info.CRC:08x}",
+            "method": info.compress_type,
+            "is_dir": info.is_dir(),
+            "encrypted": bool(info.flag_bits & 0x1),
+        }
+        for info in infos[:MAX_ENTRIES]
+    ]
+    return {
+        "entries": entries,
+        "entry_count": len(infos),
+        "total_size": sum(info.file_size for info in infos),
+    }
+
+
+def manifest_for(attachment):
+    """Return the cached ``ZipManifest`` of an attachment's content, building it on first use.
+
+    Only errors in the content itself are cached. ``OSError`` (a file that
+    is missing or unreadable for now) propagates, so a later call or the
+    ``index_zip`` job's retry can still build the listing.
+    """
+    from .models import ZipManifest
+
+    manifest = ZipManifest.objects.filter(sha256=attachment.sha256).first()
+    if manifest is not None:
+        return manifest
+    try:
+        values = read_manifest(attachment.file.path)
+    except (zipfile.BadZipFile, NotImplementedError, ValueError) as exc:
+        logger.warning("Could not read ZIP directory of attachment #%s: %s", attachment.pk, exc)
+        values = {"error": str(exc)[:255]}
+    manifest, _ = ZipManifest.objects.get_or_create(sha256=attachment.sha256, defaults=values)
+    return manifest
+
+
+def member_chunks(path: str, index: int, expected_name: str):
+    """Open member ``index`` and return ``(info, chunk iterator)``.
+
+    The name is checked against the manifest so a stale index never
+    serves a different file.
+    """
+    archive = zipfile.ZipFile(path)
+    try:
+        info = archive.infolist()[index]
+        if info.filename != expected_name:
+            raise KeyError(expected_name)
+        member = archive.open(info)
+    except BaseException:
+        archive.close()
+        raise
+
+    def chunks():
+        try:
+            while True:
+                block = member.read(READ_CHUNK)
+                if not block:
+                    return
+                yield block
+        finally:
+            member.close()
+            archive.close()
+
+    return info, chunks()
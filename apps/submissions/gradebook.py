@@ -0,0 +1,140 @@
+"""Students × assignments grade matrix for one course.
+
+``build_gradebook`` reads every ``(user, assignment, grade, created_at)``
+tuple of the course in a single query and pivots it with NumPy: each row
+becomes a flat cell index ``student * n_assignments + assignment``, a
+``lexsort`` orders the tuples by cell and submission time, and the last
+tuple of every run is the cell's latest submission. Empty cells are NaN.
+
+``course_gradebook`` caches the result under a stamp of the course's
+submissions and assignments (row count, max id and max ``updated_at``), so
+any insert, delete or grade change produces a new key and reloading an
+unchanged course costs two aggregate queries.
+"""
+import hashlib
+from dataclasses import dataclass
+
+import numpy as np
+from django.core.cache import cache
+from django.db.models import Count, Max
+
+from apps.assignments.models import Assignment
+
+from .models import Submission
+
+GRADEBOOK_CACHE_SECONDS = 24 * 3600
+
+
+@dataclass
+class Gradebook:
+    stamp: str
+    user_ids: list
+    assignment_ids: list
+    # درجة آخر تسليم في كل خانة، و NaN إذا لم يُسلَّم أو لم يُقيَّم.
+    grades: np.ndarray
+    # رقم آخر تسليم في الخانة، و 0 إذا لم يُسلَّم شيء.
+    submission_ids: np.ndarray
+    attempts: np.ndarray
+
+    @property
+    def student_means(self) -> np.ndarray:
+        return _nanmean(self.grades, axis=1)
+
+    @property
+    def assignment_means(self) -> np.ndarray:
+        return _nanmean(self.grades, axis=0)
+
+
+def _nanmean(grades, axis):
+    graded = ~np.isnan(grades)
+    counts = graded.sum(axis=axis)
+    totals = np.where(graded, grades, 0.0).sum(axis=axis)
+    # صف أو عمود بلا درجات يبقى NaN بدل تحذير القسمة على صفر.
+    return np.divide(totals, counts, out=np.full(totals.shape, np.nan), where=counts > 0)
+
+
+def latest_rows(keys, created, ids) -> np.ndarray:
+    """Index of the latest row (by ``created``, then ``id``) for every distinct combination of ``keys``.
+
+    The result is ordered by the keys, first key first.
+    """
+    order = np.lexsort((ids, created, *reversed(keys)))
+    if not len(order):
+        return order
+    boundary = np.zeros(len(order), dtype=bool)
+    boundary[-1] = True
+    for key in keys:
+        ordered = key[order]
+        boundary[:-1] |= ordered[1:] != ordered[:-1]
+    return order[boundary]
+
+
+def course_stamp(course_id) -> str:
+    parts = []
+    for queryset in (
+        Submission.objects.filter(assignment__course_id=course_id),
+        Assignment.objects.filter(course_id=course_id),
+    ):
+        aggregate = queryset.aggregate(count=Count("id"), max_id=Max("id"), updated=Max("updated_at"))
+        updated = aggregate["updated"]
+        parts.append(f"{aggregate['count']}-{aggregate['max_id'] or 0}-{updated.timestamp() if updated else 0}")
+    return hashlib.sha1(f"{course_id}|{'|'.join(parts)}".encode()).hexdigest()
+
+
+def build_gradebook(course_id, stamp: str = "") -> Gradebook:
+    assignment_ids = list(
+        Assignment.objects.filter(course_id=course_id).order_by("due_date", "id").values_list("id", flat=True)
+    )
+    rows = list(
+        Submission.objects.filter(assignment__course_id=course_id).values_list(
+            "user_id", "assignment_id", "grade", "created_at", "id"
+        )
+    )
+    count = len(rows)
+    users = np.fromiter((row[0] for row in rows), dtype=np.int64, count=count)
+    assignments = np.fromiter((row[1] for row in rows), dtype=np.int64, count=count)
+    grades = np.fromiter((np.nan if row[2] is None else row[2] for row in rows), dtype=np.float64, count=count)
+    created = np.fromiter((row[3].timestamp() for row in rows), dtype=np.float64, count=count)
+    ids = np.fromiter((row[4] for row in rows), dtype=np.int64, count=count)
+
+    column_ids = np.asarray(assignment_ids, dtype=np.int64)
+    # ترتيب الأعمدة حسب موعد التسليم؛ searchsorted يحتاج نسخة مرتبة بالرقم مع موضع كل رقم.
+    by_id = np.argsort(column_ids)
+    sorted_ids = column_ids[by_id]
+    positions = np.minimum(np.searchsorted(sorted_ids, assignments), max(len(sorted_ids) - 1, 0))
+    # واجب أُضيف بين الاستعلامين لا عمود له بعد؛ تسليماته تظهر مع الختم التالي.
+    known = sorted_ids[positions] == assignments if len(sorted_ids) else np.zeros(count, dtype=bool)
+    users, assignments, grades, created, ids = users[known], assignments[known], grades[known], created[known], ids[known]
+    columns_index = by_id[positions[known]]
+    count = len(ids)
+
+    user_ids, rows_index = np.unique(users, return_inverse=True)
+    n_rows, n_columns = len(user_ids), len(column_ids)
+    cells = rows_index * n_columns + columns_index
+
+    matrix = np.full(n_rows * n_columns, np.nan)
+    latest_ids = np.zeros(n_rows * n_columns, dtype=np.int64)
+    if count:
+        last = latest_rows((cells,), created, ids)
+        matrix[cells[last]] = grades[last]
+        latest_ids[cells[last]] = ids[last]
+    attempts = np.bincount(cells, minlength=n_rows * n_columns)
+    return Gradebook(
+        stamp=stamp,
+        user_ids=user_ids.tolist(),
+        assignment_ids=assignment_ids,
+        grades=matrix.reshape(n_rows, n_columns),
+        submission_ids=latest_ids.reshape(n_rows, n_columns),
+        attempts=attempts.reshape(n_rows, n_columns),
+    )
+
+
+def course_gradebook(course_id, stamp: str = "") -> Gradebook:
+    """Return the course's ``Gradebook``, rebuilding it only when its stamp changed."""
+    stamp = stamp or course_stamp(course_id)
+    key = f"gradebook:{course_id}:{stamp}"
+    gradebook = cache.get(key)
+    if gradebook is None:
+        gradebook = build_gradebook(course_id, stamp)
+        cache.set(key, gradebook, GRADEBOOK_CACHE_SECONDS)
+    return gradebook
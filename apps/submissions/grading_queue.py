@@ -0,0 +1,101 @@
+"""Leases that spread ungraded submissions over several graders.
+
+The pattern is the job worker's: a candidate is taken with a conditional
+``UPDATE ... WHERE id = %s AND <still claimable>``, so of two graders
+racing for the same submission exactly one sees an update count of 1.
+A lease lasts ``GRADING_LEASE_SECONDS``; the grading page renews it while
+it is open, and a closed tab frees its submission once the lease runs out.
+
+While working through the queue a grader holds two leases: the
+submission on screen and the next one, whose files the page prefetches.
+``claim_next`` hands out a lease the grader already holds before taking a
+new one, which is how the prefetched submission becomes the current one.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Submission
+
+# عدد المرشحين في كل جولة؛ من يخسر سباقاً على تسليم يجرب التالي دون استعلام جديد.
+CLAIM_CANDIDATES = 10
+CLAIM_ROUNDS = 5
+
+
+def _claimable(now, user):
+    # تسليم بلا درجة، غير محجوز أو انتهى حجزه أو محجوز لهذا المعلم نفسه.
+    return Q(grade__isnull=True) & (Q(grading_until__isnull=True) | Q(grading_until__lt=now) | Q(grading_by=user))
+
+
+def _lease_until(now):
+    return now + timedelta(seconds=settings.GRADING_LEASE_SECONDS)
+
+
+def scope_from(params) -> dict:
+    """The ``assignment``/``course`` filter of a queue request, with invalid values dropped."""
+    scope = {}
+    for key in ("assignment", "course"):
+        try:
+            scope[key] = int(params.get(key, ""))
+        except ValueError:
+            continue
+    return scope
+
+
+def _scope_q(scope) -> Q:
+    query = Q()
+    if "assignment" in scope:
+        query &= Q(assignment_id=scope["assignment"])
+    if "course" in scope:
+        query &= Q(assignment__course_id=scope["course"])
+    return query
+
+
+def claim(user, submission_id) -> bool:
+    """Take or renew the lease on one submission; False if it is graded or someone else holds it."""
+    now = timezone.now()
+    updated = Submission.objects.filter(_claimable(now, user), pk=submission_id).update(
+        grading_by=user,
+        grading_until=_lease_until(now),
+    )
+    return bool(updated)
+
+
+def claim_next(user, scope=None, exclude=()):
+    """Lease the oldest ungraded submission in ``scope`` and return its id, or None."""
+    now = timezone.now()
+    queue = Submission.objects.filter(_scope_q(scope or {}), grade__isnull=True).exclude(pk__in=list(exclude))
+    held = (
+        queue.filter(grading_by=user, grading_until__gte=now).order_by("created_at", "id").values_list("pk", flat=True).first()
+    )
+    if held is not None and claim(user, held):
+        return held
+    for _ in range(CLAIM_ROUNDS):
+        candidates = list(
+            queue.filter(_claimable(now, user)).order_by("created_at", "id").values_list("pk", flat=True)[:CLAIM_CANDIDATES]
+        )
+        if not candidates:
+            return None
+        for pk in candidates:
+            if claim(user, pk):
+                return pk
+        now = timezone.now()
+    return None
+
+
+def extend(user, submission_ids):
+    """Renew the caller's leases; returns the new expiry."""
+    now = timezone.now()
+    until = _lease_until(now)
+    Submission.objects.filter(pk__in=list(submission_ids), grading_by=user, grade__isnull=True).update(grading_until=until)
+    return until
+
+
+def release(user, submission_ids=None) -> int:
+    """Give back the caller's leases, all of them when ``submission_ids`` is None."""
+    leases = Submission.objects.filter(grading_by=user)
+    if submission_ids is not None:
+        leases = leases.filter(pk__in=list(submission_ids))
+    return leases.update(grading_by=None, grading_until=None)
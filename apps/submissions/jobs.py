@@ -0,0 +1,56 @@
+"""Background handlers for submission attachments and upload sessions."""
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from apps.jobs.registry import RetryLater, register
+
+from .archives import manifest_for
+from .models import StoredBlob, SubmissionAttachment, UploadSession
+from .previews import can_preview, render_previews
+from .similarity import index_attachment
+
+
+@register("submissions.index_similarity", max_attempts=3)
+def index_similarity(attachment_id):
+    attachment = SubmissionAttachment.objects.filter(pk=attachment_id).first()
+    if attachment is not None:
+        index_attachment(attachment)
+
+
+@register("submissions.render_preview", max_attempts=3)
+def render_preview(sha256):
+    if StoredBlob.objects.filter(sha256=sha256, has_preview=True).exists():
+        return
+    for attachment in SubmissionAttachment.objects.filter(sha256=sha256):
+        if not can_preview(attachment.display_name):
+            continue
+        try:
+            path = attachment.file.path
+        except (NotImplementedError, ValueError):
+            continue
+        if render_previews(path, attachment.display_name, sha256):
+            StoredBlob.objects.filter(sha256=sha256).update(has_preview=True)
+        return
+
+
+@register("submissions.index_zip", max_attempts=3)
+def index_zip(sha256):
+    attachment = SubmissionAttachment.objects.filter(sha256=sha256).first()
+    if attachment is not None and attachment.is_zip:
+        manifest_for(attachment)
+
+
+@register("submissions.expire_upload_session")
+def expire_upload_session(session_id):
+    session = UploadSession.objects.filter(pk=session_id).first()
+    if session is None:
+        return
+    if session.status == UploadSession.STATUS_OPEN:
+        expires = session.updated_at + timedelta(hours=settings.SUBMISSION_UPLOAD_SESSION_MAX_AGE_HOURS)
+        remaining = (expires - timezone.now()).total_seconds()
+        if remaining > 0:
+            # ما زالت المقاطع تصل؛ نعيد الفحص عند انتهاء المهلة الجديدة.
+            raise RetryLater(int(remaining) + 1)
+    session.discard()
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from apps.jobs.registry import enqueue
+from apps.submissions.models import StoredBlob, SubmissionAttachment
+from apps.submissions.previews import can_preview
+
+
+class Command(BaseCommand):
+    help = "جدولة توليد المعاينات المصغرة للصور وملفات PDF المرفوعة قبل تفعيلها."
+
+    def handle(self, *args, **options):
+        missing = set(StoredBlob.objects.filter(has_preview=False).values_list("sha256", flat=True))
+        queued = set()
+        for sha256, name, path in SubmissionAttachment.objects.filter(sha256__in=missing).values_list(
+            "sha256", "original_name", "file"
+        ):
+            if sha256 not in queued and can_preview(name or path):
+                enqueue("submissions.render_preview", {"sha256": sha256})
+                queued.add(sha256)
+        self.stdout.write(self.style.SUCCESS(f"جُدولت {len(queued)} معاينة؛ شغّل run_worker لتوليدها."))
@@ -0,0 +1,62 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from apps.submissions.models import LSHBucket, SimilarityMatch, SubmissionAttachment, TextSignature
+from apps.submissions.similarity import compute_signature, find_matches, is_indexable, store_signature
+
+
+def _sign(job):
+    sha256, path, name = job
+    signature, shingle_count = compute_signature(path, name)
+    return sha256, signature, shingle_count
+
+
+class Command(BaseCommand):
+    help = "حساب بصمات MinHash للمرفقات غير المفهرسة على عدة عمليات ثم البحث عن التشابه بينها."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="عدد العمليات.")
+        parser.add_argument("--chunksize", type=int, default=8, help="عدد الملفات التي تُرسل لكل عملية دفعة واحدة.")
+        parser.add_argument("--rebuild", action="store_true", help="حذف الفهرس الحالي وإعادة بنائه بالكامل.")
+
+    def handle(self, *args, **options):
+        if options["rebuild"]:
+            SimilarityMatch.objects.all().delete()
+            LSHBucket.objects.all().delete()
+            TextSignature.objects.all().delete()
+
+        indexed = set(TextSignature.objects.values_list("sha256", flat=True))
+        jobs = {}
+        for attachment in SubmissionAttachment.objects.exclude(sha256="").only("sha256", "file", "original_name"):
+            if attachment.sha256 in indexed or attachment.sha256 in jobs:
+                continue
+            if not is_indexable(attachment.display_name):
+                continue
+            try:
+                path = attachment.file.path
+            except (NotImplementedError, ValueError):
+                continue
+            if os.path.exists(path):
+                jobs[attachment.sha256] = (attachment.sha256, path, attachment.display_name)
+        if not jobs:
+            self.stdout.write("لا توجد مرفقات جديدة للفهرسة.")
+            return
+
+        self.stdout.write(f"فهرسة {len(jobs)} ملف على {options['workers']} عملية...")
+        signed = []
+        # العمليات تحسب فقط؛ كل الكتابة في قاعدة البيانات تتم هنا في العملية الرئيسية.
+        with ProcessPoolExecutor(max_workers=options["workers"]) as pool:
+            for sha256, signature, shingle_count in pool.map(_sign, jobs.values(), chunksize=options["chunksize"]):
+                if store_signature(sha256, signature, shingle_count):
+                    signed.append(sha256)
+
+        for sha256 in signed:
+            find_matches(sha256)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"فُهرس {len(signed)} ملف نصي من {len(jobs)}؛ "
+                f"عدد التطابقات التقريبية في الفهرس {SimilarityMatch.objects.count()}."
+            )
+        )
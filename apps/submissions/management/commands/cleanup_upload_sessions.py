@@ -0,0 +1,40 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+
+from apps.submissions.models import UploadSession
+
+
+class Command(BaseCommand):
+    help = (
+        "حذف جلسات الرفع المتروكة والمكتملة مع ملفاتها الجزئية. "
+        "العامل يفعل ذلك تلقائياً؛ الأمر للجلسات القديمة أو عند توقف العامل."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--max-age-hours",
+            type=int,
+            default=settings.SUBMISSION_UPLOAD_SESSION_MAX_AGE_HOURS,
+            help="تُحذف الجلسة المفتوحة التي لم يصلها مقطع منذ هذا العدد من الساعات.",
+        )
+        parser.add_argument("--dry-run", action="store_true", help="عرض ما سيُحذف دون حذفه.")
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(hours=options["max_age_hours"])
+        expired = Q(status=UploadSession.STATUS_OPEN, updated_at__lt=cutoff) | Q(status=UploadSession.STATUS_FINALIZED)
+        removed = 0
+        for session in UploadSession.objects.filter(expired).iterator():
+            if options["dry_run"]:
+                self.stdout.write(f"ستُحذف {session}")
+                removed += 1
+                continue
+            # الشرط يعاد فحصه: مقطع وصل الآن يحدّث updated_at فتبقى الجلسة.
+            if UploadSession.objects.filter(expired, pk=session.pk).exists():
+                session.discard()
+                removed += 1
+        verb = "ستُحذف" if options["dry_run"] else "حُذفت"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {removed} جلسة رفع."))
@@ -0,0 +1,101 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.submissions.models import StoredBlob, SubmissionAttachment
+from apps.submissions.previews import delete_previews
+from apps.submissions.storage import BLOB_ROOT, blob_storage
+
+
+class Command(BaseCommand):
+    help = "حذف الملفات المخزنة التي لم يعد أي مرفق يشير إليها، والملفات اليتيمة في مجلد blobs."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="عرض ما سيُحذف دون حذفه.")
+        parser.add_argument(
+            "--grace",
+            type=int,
+            default=3600,
+            help="لا يُحذف ملف عُدِّل خلال هذا العدد من الثواني (رفع لم تُحفظ معاملته بعد).",
+        )
+        parser.add_argument(
+            "--recount",
+            action="store_true",
+            help="إعادة حساب العدادات من جدول المرفقات قبل الحذف.",
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options["dry_run"]
+        cutoff = time.time() - options["grace"]
+        if options["recount"]:
+            total = StoredBlob.rebuild_ref_counts()
+            self.stdout.write(f"أعيد حساب العدادات لـ {total} ملف مستخدم.")
+
+        removed = freed = 0
+        # صف له نسخ قديمة خارج blobs/ يبقى لتقرير التكرار، وmigrate_to_cas يعيد استخدام ملفه لاحقاً.
+        for blob in StoredBlob.objects.filter(ref_count__lte=0, copies__lte=0).iterator():
+            path = blob_storage.path(blob.name)
+            if not self._expired(path, cutoff):
+                continue
+            if dry_run:
+                self.stdout.write(f"سيُحذف {blob.name}")
+                removed += 1
+                freed += blob.size_bytes
+                continue
+            # الشرط يعاد فحصه عند الحذف: رفع جديد بنفس البصمة يرفع العداد فيُلغى الحذف.
+            deleted, _ = StoredBlob.objects.filter(pk=blob.pk, ref_count__lte=0, copies__lte=0).delete()
+            if deleted:
+                freed += self._remove(path)
+                removed += 1
+                if blob.has_preview:
+                    delete_previews(blob.sha256)
+
+        orphans, orphan_bytes = self._sweep_orphans(cutoff, dry_run)
+        verb = "سيُحذف" if dry_run else "حُذف"
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{verb} {removed} ملف بلا مراجع و{orphans} ملف يتيم؛ "
+                f"المساحة المحررة {(freed + orphan_bytes) / (1024 * 1024):.1f}MB."
+            )
+        )
+
+    def _expired(self, path, cutoff) -> bool:
+        try:
+            return os.stat(path).st_mtime < cutoff
+        except FileNotFoundError:
+            return True
+
+    def _remove(self, path) -> int:
+        try:
+            size = os.stat(path).st_size
+            os.remove(path)
+        except FileNotFoundError:
+            return 0
+        return size
+
+    def _sweep_orphans(self, cutoff, dry_run):
+        """Remove files under ``blobs/`` with no ``StoredBlob`` row and leftover temp files."""
+        root = blob_storage.path(BLOB_ROOT)
+        count = freed = 0
+        for directory, subdirs, filenames in os.walk(root, topdown=False):
+            known = set(StoredBlob.objects.filter(sha256__in=filenames).values_list("sha256", flat=True))
+            known.update(
+                SubmissionAttachment.objects.filter(sha256__in=filenames).values_list("sha256", flat=True)
+            )
+            for filename in filenames:
+                path = os.path.join(directory, filename)
+                if filename in known or not self._expired(path, cutoff):
+                    continue
+                count += 1
+                if dry_run:
+                    self.stdout.write(f"سيُحذف الملف اليتيم {os.path.relpath(path, root)}")
+                    freed += os.stat(path).st_size
+                else:
+                    freed += self._remove(path)
+            if not dry_run and directory != root:
+                try:
+                    os.rmdir(directory)
+                except OSError:
+                    pass
+        return count, freed
@@ -0,0 +1,88 @@
+import hashlib
+import os
+import shutil
+
+from django.core.management.base import BaseCommand
+
+from apps.submissions.models import StoredBlob, SubmissionAttachment
+from apps.submissions.storage import BLOB_ROOT, blob_name, blob_storage
+
+
+def _hash_path(path):
+    hasher = hashlib.sha256()
+    size = 0
+    with open(path, "rb") as handle:
+        for chunk in iter(lambda: handle.read(1024 * 1024), b""):
+            hasher.update(chunk)
+            size += len(chunk)
+    return hasher.hexdigest(), size
+
+
+class Command(BaseCommand):
+    help = (
+        "نقل مرفقات التسليمات القديمة من submission_files/ إلى التخزين حسب المحتوى "
+        "(blobs/ab/cd/<sha256>) ثم إعادة حساب عدادات المراجع."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="عرض ما سيُنقل دون تعديل شيء.")
+        parser.add_argument(
+            "--keep-originals",
+            action="store_true",
+            help="إبقاء الملفات القديمة بعد نقلها.",
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options["dry_run"]
+        moved = deduplicated = missing = 0
+        queryset = SubmissionAttachment.objects.exclude(file__startswith=f"{BLOB_ROOT}/").exclude(file="")
+        for attachment in queryset.iterator():
+            old_name = attachment.file.name
+            old_path = blob_storage.path(old_name)
+            if not os.path.exists(old_path):
+                self.stderr.write(f"الملف {old_name} غير موجود؛ تم تجاوز المرفق #{attachment.pk}.")
+                missing += 1
+                continue
+
+            sha256, size = _hash_path(old_path)
+            new_name = blob_name(sha256)
+            new_path = blob_storage.path(new_name)
+            exists = os.path.exists(new_path)
+            if dry_run:
+                self.stdout.write(f"{old_name} -> {new_name}{' (مكرر)' if exists else ''}")
+                deduplicated += exists
+                moved += not exists
+                continue
+
+            if exists:
+                deduplicated += 1
+            else:
+                self._place(old_path, new_path)
+                moved += 1
+            # نحدّث الصف قبل حذف الملف القديم حتى لا يبقى مرفق يشير إلى ملف غير موجود.
+            SubmissionAttachment.objects.filter(pk=attachment.pk).update(
+                file=new_name,
+                sha256=sha256,
+                size_bytes=size,
+                original_name=attachment.original_name or os.path.basename(old_name)[:255],
+            )
+            if not options["keep_originals"]:
+                os.remove(old_path)
+
+        if not dry_run:
+            StoredBlob.rebuild_ref_counts()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"نُقل {moved} ملف، ودُمج {deduplicated} ملف مكرر، وتعذر العثور على {missing}."
+            )
+        )
+
+    def _place(self, old_path, new_path):
+        os.makedirs(os.path.dirname(new_path), exist_ok=True)
+        try:
+            # رابط صلب: لا نسخ للبيانات، والملف القديم يبقى صالحاً حتى يُحدَّث الصف.
+            os.link(old_path, new_path)
+        except OSError:
+            temp_path = f"{new_path}.tmp"
+            shutil.copyfile(old_path, temp_path)
+            os.replace(temp_path, new_path)
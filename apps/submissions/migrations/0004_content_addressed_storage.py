@@ -0,0 +1,48 @@
+# Generated by Django 5.2.6 on 2026-10-17 02:58
+
+import os
+
+import apps.submissions.models
+import apps.submissions.storage
+from django.db import migrations, models
+
+
+def fill_original_names(apps, schema_editor):
+    SubmissionAttachment = apps.get_model("submissions", "SubmissionAttachment")
+    for attachment in SubmissionAttachment.objects.filter(original_name="").iterator():
+        attachment.original_name = os.path.basename(attachment.file.name)[:255]
+        attachment.save(update_fields=["original_name"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('submissions', '0003_alter_submissionattachment_options_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoredBlob',
+            fields=[
+                ('sha256', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('size_bytes', models.BigIntegerField(default=0)),
+                ('ref_count', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'ملف مخزن',
+                'verbose_name_plural': 'ملفات مخزنة',
+            },
+        ),
+        migrations.AddField(
+            model_name='submissionattachment',
+            name='original_name',
+            field=models.CharField(blank=True, max_length=255, verbose_name='اسم الملف'),
+        ),
+        migrations.AlterField(
+            model_name='submissionattachment',
+            name='file',
+            field=models.FileField(max_length=255, storage=apps.submissions.storage.get_blob_storage, upload_to=apps.submissions.models.attachment_upload_to),
+        ),
+        migrations.RunPython(fill_original_names, migrations.RunPython.noop),
+    ]
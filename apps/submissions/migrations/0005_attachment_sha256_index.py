@@ -0,0 +1,36 @@
+# Generated by Django 5.2.6 on 2026-10-17 03:00
+
+from django.db import migrations, models
+from django.db.models import Count, Max
+
+
+def count_duplicates(apps, schema_editor):
+    SubmissionAttachment = apps.get_model("submissions", "SubmissionAttachment")
+    StoredBlob = apps.get_model("submissions", "StoredBlob")
+    rows = (
+        SubmissionAttachment.objects.exclude(sha256="")
+        .values("sha256")
+        .annotate(refs=Count("id"), size=Max("size_bytes"))
+        .order_by()
+    )
+    for row in rows:
+        StoredBlob.objects.update_or_create(
+            sha256=row["sha256"],
+            defaults={"ref_count": row["refs"], "size_bytes": row["size"]},
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('submissions', '0004_content_addressed_storage'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='submissionattachment',
+            name='sha256',
+            field=models.CharField(blank=True, db_index=True, max_length=64),
+        ),
+        migrations.RunPython(count_duplicates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.6 on 2026-10-17 03:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('submissions', '0005_attachment_sha256_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TextSignature',
+            fields=[
+                ('sha256', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('minhash', models.BinaryField(blank=True)),
+                ('shingle_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'بصمة نصية',
+                'verbose_name_plural': 'بصمات نصية',
+            },
+        ),
+        migrations.CreateModel(
+            name='LSHBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sha256', models.CharField(db_index=True, max_length=64)),
+                ('band', models.PositiveSmallIntegerField()),
+                ('bucket', models.BigIntegerField()),
+            ],
+            options={
+                'indexes': [models.Index(fields=['band', 'bucket'], name='lsh_band_bucket_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='SimilarityMatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('first_sha256', models.CharField(max_length=64)),
+                ('second_sha256', models.CharField(db_index=True, max_length=64)),
+                ('score', models.FloatField(verbose_name='نسبة التشابه')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'تشابه نصي',
+                'verbose_name_plural': 'تشابهات نصية',
+                'ordering': ['-score'],
+                'unique_together': {('first_sha256', 'second_sha256')},
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-17 03:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('submissions', '0007_upload_sessions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='storedblob',
+            name='has_preview',
+            field=models.BooleanField(default=False, verbose_name='معاينة مصغرة'),
+        ),
+    ]
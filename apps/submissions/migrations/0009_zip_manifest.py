@@ -0,0 +1,28 @@
+# Generated by Django 5.2.6 on 2026-10-17 03:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('submissions', '0008_storedblob_has_preview'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ZipManifest',
+            fields=[
+                ('sha256', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('entries', models.JSONField(blank=True, default=list)),
+                ('entry_count', models.PositiveIntegerField(default=0)),
+                ('total_size', models.BigIntegerField(default=0, verbose_name='الحجم بعد الفك')),
+                ('error', models.CharField(blank=True, max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'فهرس أرشيف',
+                'verbose_name_plural': 'فهارس الأرشيفات',
+            },
+        ),
+    ]
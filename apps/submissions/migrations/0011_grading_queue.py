@@ -0,0 +1,31 @@
+# Generated by Django 5.2.6 on 2026-10-17 03:26
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assignments', '0004_assignment_updated_at'),
+        ('submissions', '0010_submission_updated_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='submission',
+            name='grading_by',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='grading_leases', to=settings.AUTH_USER_MODEL, verbose_name='قيد التقييم لدى'),
+        ),
+        migrations.AddField(
+            model_name='submission',
+            name='grading_until',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='ينتهي الحجز'),
+        ),
+        migrations.AddIndex(
+            model_name='submission',
+            index=models.Index(condition=models.Q(('grade__isnull', True)), fields=['created_at'], name='submission_ungraded_idx'),
+        ),
+    ]
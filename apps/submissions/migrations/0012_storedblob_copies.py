@@ -0,0 +1,34 @@
+# Generated by Django 5.2.6 on 2026-10-17 03:37
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def split_counters(apps, schema_editor):
+    # 0005 عدّ المرفقات القديمة في ref_count؛ تنتقل تلك الأعداد إلى copies ويبقى ref_count لملفات blobs/ فقط.
+    SubmissionAttachment = apps.get_model("submissions", "SubmissionAttachment")
+    StoredBlob = apps.get_model("submissions", "StoredBlob")
+    rows = (
+        SubmissionAttachment.objects.exclude(sha256="")
+        .values("sha256")
+        .annotate(refs=Count("id", filter=Q(file__startswith="blobs/")), copies=Count("id"))
+        .order_by()
+    )
+    for row in rows:
+        StoredBlob.objects.filter(sha256=row["sha256"]).update(ref_count=row["refs"], copies=row["copies"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('submissions', '0011_grading_queue'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='storedblob',
+            name='copies',
+            field=models.IntegerField(default=0, verbose_name='عدد النسخ'),
+        ),
+        migrations.RunPython(split_counters, migrations.RunPython.noop),
+    ]
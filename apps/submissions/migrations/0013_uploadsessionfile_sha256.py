@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-17 03:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('submissions', '0012_storedblob_copies'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='uploadsessionfile',
+            name='sha256',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+    ]
@@ -1,11 +1,18 @@
 ﻿import hashlib
 import os
+import shutil
+import uuid
+from pathlib import Path
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.db import models
+from django.db.models import Count, Max, Q
 
 from apps.assignments.models import Assignment
 
+from .storage import BLOB_ROOT, blob_name, get_blob_storage
+
 User = get_user_model()
 
 ALLOWED_EXTS = {".pdf", ".doc", ".docx", ".txt", ".png", ".jpg", ".jpeg", ".zip"}
@@ -36,6 +43,17 @@ class Submission(models.Model):
     grade = models.IntegerField("التقدير", blank=True, null=True)
     feedback = models.TextField("ملاحظات", blank=True)
     created_at = models.DateTimeField("تاريخ الإرسال", auto_now_add=True)
+    updated_at = models.DateTimeField("آخر تحديث", auto_now=True)
+    # حجز قائمة التقييم: المعلم الذي يقيّم التسليم الآن وحتى متى.
+    grading_by = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="grading_leases",
+        verbose_name="قيد التقييم لدى",
+    )
+    grading_until = models.DateTimeField("ينتهي الحجز", null=True, blank=True)
 
     def __str__(self) -> str:
         return f"Submission #{self.pk} by {self.user.username} for {self.assignment.title}"
@@ -44,29 +62,54 @@ class Submission(models.Model):
         verbose_name = "تسليم"
         verbose_name_plural = "تسليمات"
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["created_at"], condition=Q(grade__isnull=True), name="submission_ungraded_idx"),
+        ]
+
+
+def attachment_upload_to(instance, filename):
+    # الاسم هو بصمة المحتوى؛ save() يحسبها قبل أن يصل الحفظ إلى هنا.
+    return blob_name(instance.sha256)
 
 
 class SubmissionAttachment(models.Model):
     submission = models.ForeignKey(Submission, on_delete=models.CASCADE, related_name="attachments")
-    file = models.FileField(upload_to="submission_files/")
+    file = models.FileField(upload_to=attachment_upload_to, storage=get_blob_storage, max_length=255)
+    original_name = models.CharField("اسم الملف", max_length=255, blank=True)
     size_bytes = models.BigIntegerField(default=0)
-    sha256 = models.CharField(max_length=64, blank=True)
+    sha256 = models.CharField(max_length=64, blank=True, db_index=True)
 
     def clean(self):
         from django.core.exceptions import ValidationError
 
         if self.file and self.file.size > MAX_BYTES:
             raise ValidationError("حجم الملف يتجاوز 10MB.")
-        ext = os.path.splitext(self.file.name)[1].lower()
+        # بعد الحفظ يصبح file.name بصمة المحتوى بلا امتداد؛ الامتداد يؤخذ من اسم الملف الأصلي.
+        ext = os.path.splitext(self.display_name)[1].lower()
         if ext not in ALLOWED_EXTS:
             raise ValidationError("نوع الملف غير مسموح. المسموح: pdf/doc/docx/txt/png/jpg/jpeg/zip")
 
+    @property
+    def display_name(self) -> str:
+        return self.original_name or os.path.basename(self.file.name)
+
+    @property
+    def is_zip(self) -> bool:
+        return os.path.splitext(self.display_name)[1].lower() == ".zip"
+
     def save(self, *args, **kwargs):
+        if self.file and not self.file._committed and not self.original_name:
+            self.original_name = os.path.basename(self.file.name)[:255]
         if self.file and not self.sha256:
             self.size_bytes = self.file.size
-            self.file.seek(0)
-            self.sha256 = _sha256_file(self.file)
-            self.file.seek(0)
+            # HashingUploadHandler يحسب البصمة أثناء استقبال الطلب؛ لا نعيد قراءة الملف.
+            precomputed = getattr(self.file.file, "sha256", "") if not self.file._committed else ""
+            if precomputed:
+                self.sha256 = precomputed
+            else:
+                self.file.seek(0)
+                self.sha256 = _sha256_file(self.file)
+                self.file.seek(0)
         super().save(*args, **kwargs)
 
     def __str__(self) -> str:
@@ -76,3 +119,189 @@ class SubmissionAttachment(models.Model):
         ordering = ["-id"]
         verbose_name = "ملف مرفق"
         verbose_name_plural = "ملفات مرفقة"
+
+
+class StoredBlob(models.Model):
+    """One distinct file content and how many attachments carry it.
+
+    ``ref_count`` counts the attachments stored in the blob itself, and
+    ``gc_blobs`` removes blobs whose count reaches zero. ``copies`` counts
+    every attachment with this content, legacy files outside ``blobs/``
+    included; above one means the same bytes were submitted more than once.
+    """
+
+    sha256 = models.CharField(max_length=64, primary_key=True)
+    size_bytes = models.BigIntegerField(default=0)
+    ref_count = models.IntegerField(default=0)
+    copies = models.IntegerField("عدد النسخ", default=0)
+    has_preview = models.BooleanField("معاينة مصغرة", default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self) -> str:
+        return f"{self.sha256[:12]} ×{self.ref_count}"
+
+    @property
+    def name(self) -> str:
+        return blob_name(self.sha256)
+
+    @classmethod
+    def rebuild_ref_counts(cls) -> int:
+        """Recount references and copies from the attachment table; returns the number of blobs."""
+        counts = {
+            row["sha256"]: row
+            for row in SubmissionAttachment.objects.exclude(sha256="")
+            .values("sha256")
+            .annotate(
+                refs=Count("id", filter=Q(file__startswith=f"{BLOB_ROOT}/")),
+                copies=Count("id"),
+                size=Max("size_bytes"),
+            )
+            .order_by()
+        }
+        cls.objects.exclude(sha256__in=counts).update(ref_count=0, copies=0)
+        existing = set(cls.objects.filter(sha256__in=counts).values_list("sha256", flat=True))
+        cls.objects.bulk_create(
+            [
+                cls(sha256=sha, size_bytes=row["size"], ref_count=row["refs"], copies=row["copies"])
+                for sha, row in counts.items()
+                if sha not in existing
+            ]
+        )
+        for sha in existing:
+            cls.objects.filter(sha256=sha).update(ref_count=counts[sha]["refs"], copies=counts[sha]["copies"])
+        return len(counts)
+
+    class Meta:
+        verbose_name = "ملف مخزن"
+        verbose_name_plural = "ملفات مخزنة"
+
+
+class TextSignature(models.Model):
+    """MinHash signature of one file content; empty when it has no extractable text."""
+
+    sha256 = models.CharField(max_length=64, primary_key=True)
+    minhash = models.BinaryField(blank=True)
+    shingle_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self) -> str:
+        return f"{self.sha256[:12]} ({self.shingle_count} shingles)"
+
+    class Meta:
+        verbose_name = "بصمة نصية"
+        verbose_name_plural = "بصمات نصية"
+
+
+class ZipManifest(models.Model):
+    """Central-directory listing of one ZIP content, read without extracting anything."""
+
+    sha256 = models.CharField(max_length=64, primary_key=True)
+    entries = models.JSONField(default=list, blank=True)
+    entry_count = models.PositiveIntegerField(default=0)
+    total_size = models.BigIntegerField("الحجم بعد الفك", default=0)
+    error = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self) -> str:
+        return f"{self.sha256[:12]} ({self.entry_count} entries)"
+
+    class Meta:
+        verbose_name = "فهرس أرشيف"
+        verbose_name_plural = "فهارس الأرشيفات"
+
+
+class LSHBucket(models.Model):
+    sha256 = models.CharField(max_length=64, db_index=True)
+    band = models.PositiveSmallIntegerField()
+    bucket = models.BigIntegerField()
+
+    class Meta:
+        indexes = [models.Index(fields=["band", "bucket"], name="lsh_band_bucket_idx")]
+
+
+class SimilarityMatch(models.Model):
+    """Estimated Jaccard similarity of two contents; ``first_sha256`` sorts before ``second_sha256``."""
+
+    first_sha256 = models.CharField(max_length=64)
+    second_sha256 = models.CharField(max_length=64, db_index=True)
+    score = models.FloatField("نسبة التشابه")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self) -> str:
+        return f"{self.first_sha256[:8]} ~ {self.second_sha256[:8]}: {self.score:.2f}"
+
+    class Meta:
+        unique_together = (("first_sha256", "second_sha256"),)
+        ordering = ["-score"]
+        verbose_name = "تشابه نصي"
+        verbose_name_plural = "تشابهات نصية"
+
+
+class UploadSession(models.Model):
+    """A resumable, chunked submission upload that becomes a ``Submission`` at finalize."""
+
+    STATUS_OPEN = "open"
+    STATUS_FINALIZED = "finalized"
+    STATUS_CHOICES = [
+        (STATUS_OPEN, "قيد الرفع"),
+        (STATUS_FINALIZED, "مكتمل"),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="upload_sessions")
+    assignment = models.ForeignKey(Assignment, on_delete=models.CASCADE, related_name="upload_sessions")
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=STATUS_OPEN)
+    submission = models.OneToOneField(
+        Submission,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="upload_session",
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["status", "updated_at"], name="upload_session_stale_idx")]
+        verbose_name = "جلسة رفع"
+        verbose_name_plural = "جلسات رفع"
+
+    def __str__(self) -> str:
+        return f"UploadSession {self.pk} ({self.status})"
+
+    @property
+    def directory(self):
+        return Path(settings.SUBMISSION_UPLOAD_TEMP_DIR) / "sessions" / str(self.pk)
+
+    def discard(self) -> None:
+        """Delete the session, its file rows and whatever chunks reached the disk."""
+        directory = self.directory
+        self.delete()
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+class UploadSessionFile(models.Model):
+    session = models.ForeignKey(UploadSession, on_delete=models.CASCADE, related_name="files")
+    index = models.PositiveSmallIntegerField()
+    name = models.CharField(max_length=255)
+    size = models.BigIntegerField()
+    received = models.BigIntegerField(default=0)
+    # بصمة الملف كاملاً إن حسبتها العملية التي استقبلت مقاطعه؛ فارغة يعني أن الإنهاء يحسبها من الملف.
+    sha256 = models.CharField(max_length=64, blank=True)
+
+    class Meta:
+        unique_together = (("session", "index"),)
+        ordering = ["index"]
+        verbose_name = "ملف جلسة رفع"
+        verbose_name_plural = "ملفات جلسات رفع"
+
+    @property
+    def part_path(self):
+        return self.session.directory / f"{self.index}.part"
+
+    @property
+    def complete(self) -> bool:
+        return self.received == self.size
+
+    def as_payload(self) -> dict:
+        return {"index": self.index, "name": self.name, "size": self.size, "received": self.received}
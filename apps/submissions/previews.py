@@ -0,0 +1,112 @@
+"""Downscaled JPEG previews of image and PDF attachments.
+
+Previews are keyed by the content ``sha256`` like the blobs themselves,
+so a file submitted by thirty students is rendered once. They live next
+to the blobs under ``previews/ab/cd/<sha256>-<size>.jpg`` and
+``StoredBlob.has_preview`` records that they exist.
+
+Pillow is optional: without it nothing is rendered and the pages keep
+showing plain download links. A PDF is rendered with ``pdftoppm`` when
+poppler is installed; otherwise the largest image on its first page
+(what a scanned hand-in consists of) is used.
+"""
+import io
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+
+from django.core.files.base import ContentFile
+
+from .storage import blob_storage
+
+logger = logging.getLogger(__name__)
+
+PREVIEW_ROOT = "previews"
+THUMB_SIZE = 320
+PAGE_SIZE = 1024
+PREVIEW_SIZES = (THUMB_SIZE, PAGE_SIZE)
+IMAGE_EXTS = {".png", ".jpg", ".jpeg"}
+PDF_EXTS = {".pdf"}
+JPEG_QUALITY = 80
+
+
+def preview_name(sha256: str, size: int) -> str:
+    return f"{PREVIEW_ROOT}/{sha256[:2]}/{sha256[2:4]}/{sha256}-{size}.jpg"
+
+
+def can_preview(name: str) -> bool:
+    return os.path.splitext(name)[1].lower() in IMAGE_EXTS | PDF_EXTS
+
+
+def _open_image(path, name):
+    from PIL import Image
+
+    ext = os.path.splitext(name)[1].lower()
+    if ext in IMAGE_EXTS:
+        image = Image.open(path)
+        # يطلب من مفكك JPEG صورة مصغرة مباشرة بدل فك الصورة كاملة ثم تصغيرها.
+        image.draft("RGB", (PAGE_SIZE, PAGE_SIZE))
+        return image
+    if shutil.which("pdftoppm"):
+        return _render_pdf_page(path)
+    return _first_pdf_image(path)
+
+
+def _render_pdf_page(path):
+    from PIL import Image
+
+    with tempfile.TemporaryDirectory() as directory:
+        target = os.path.join(directory, "page")
+        subprocess.run(
+            ["pdftoppm", "-f", "1", "-l", "1", "-singlefile", "-scale-to", str(PAGE_SIZE), "-jpeg", path, target],
+            check=True,
+            capture_output=True,
+            timeout=60,
+        )
+        with Image.open(target + ".jpg") as page:
+            page.load()
+            return page.copy()
+
+
+def _first_pdf_image(path):
+    from PIL import Image
+    from pypdf import PdfReader
+
+    page = PdfReader(path).pages[0]
+    images = list(page.images)
+    if not images:
+        return None
+    largest = max(images, key=lambda image: len(image.data))
+    return Image.open(io.BytesIO(largest.data))
+
+
+def render_previews(path: str, name: str, sha256: str) -> bool:
+    """Write every preview size for one blob; returns False when nothing could be rendered."""
+    try:
+        from PIL import Image, ImageOps
+    except ImportError:
+        logger.info("Pillow is not installed; previews are skipped.")
+        return False
+    try:
+        image = _open_image(path, name)
+        if image is None:
+            return False
+        with image:
+            image = ImageOps.exif_transpose(image).convert("RGB")
+            for size in sorted(PREVIEW_SIZES, reverse=True):
+                # من الأكبر للأصغر: كل تصغير يبدأ من الناتج السابق لا من الأصل.
+                image.thumbnail((size, size), Image.Resampling.LANCZOS)
+                buffer = io.BytesIO()
+                image.save(buffer, "JPEG", quality=JPEG_QUALITY, optimize=True, progressive=True)
+                blob_storage.save(preview_name(sha256, size), ContentFile(buffer.getvalue()))
+    except Exception as exc:  # Pillow و pypdf يرميان أنواعاً كثيرة من الأخطاء للملفات التالفة.
+        logger.warning("Preview rendering failed for %s: %s", name, exc)
+        return False
+    return True
+
+
+def delete_previews(sha256: str) -> None:
+    for size in PREVIEW_SIZES:
+        blob_storage.delete(preview_name(sha256, size))
@@ -0,0 +1,55 @@
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.jobs.registry import enqueue
+
+from .models import StoredBlob, SubmissionAttachment
+from .previews import can_preview
+from .similarity import is_indexable
+from .storage import blob_name
+
+
+def _counted(attachment) -> bool:
+    # المرفقات القديمة خارج blobs/ تُعدّ في copies حتى تظهر نسخها المكررة قبل ترحيلها.
+    return bool(attachment.sha256)
+
+
+def _references(attachment) -> int:
+    # ref_count يعدّ فقط ما يشير إلى ملف blob نفسه، فهو وحده ما يعتمد عليه gc_blobs.
+    return int(attachment.file.name == blob_name(attachment.sha256))
+
+
+@receiver(post_save, sender=SubmissionAttachment)
+def attachment_saved(sender, instance, created, **kwargs):
+    if not created or not _counted(instance):
+        return
+    if is_indexable(instance.display_name):
+        # المهمة تُكتب في معاملة الرفع نفسها فلا يراها العامل إلا بعد حفظ المرفق.
+        enqueue("submissions.index_similarity", {"attachment_id": instance.pk})
+    references = _references(instance)
+    _, inserted = StoredBlob.objects.get_or_create(
+        sha256=instance.sha256,
+        defaults={"size_bytes": instance.size_bytes, "ref_count": references, "copies": 1},
+    )
+    if not inserted:
+        StoredBlob.objects.filter(pk=instance.sha256).update(
+            ref_count=F("ref_count") + references,
+            copies=F("copies") + 1,
+        )
+    elif can_preview(instance.display_name):
+        # المعاينة تخص المحتوى؛ تُولَّد مرة واحدة عند أول رفع لهذه البصمة.
+        enqueue("submissions.render_preview", {"sha256": instance.sha256})
+    elif instance.is_zip:
+        enqueue("submissions.index_zip", {"sha256": instance.sha256})
+
+
+@receiver(post_delete, sender=SubmissionAttachment)
+def attachment_deleted(sender, instance, **kwargs):
+    # الملف نفسه لا يُحذف هنا؛ gc_blobs يزيل ما وصل عدّاده إلى الصفر.
+    if _counted(instance):
+        StoredBlob.objects.filter(pk=instance.sha256).update(
+            ref_count=F("ref_count") - _references(instance),
+            copies=F("copies") - 1,
+        )
+
@@ -0,0 +1,258 @@
+"""Near-duplicate detection for submission text with MinHash and LSH.
+
+Pipeline for one attachment:
+
+1. ``extract_text`` pulls plain text out of txt/docx/pdf files.
+2. ``shingle_hashes`` turns the text into hashed word 3-grams.
+3. ``minhash`` reduces the shingle set to ``NUM_PERM`` minimum hashes under
+   universal hash functions ``(a*x + b) mod HASH_PRIME``; the fraction
+   of equal positions between two signatures estimates their Jaccard
+   similarity.
+4. The signature is cut into ``BANDS`` bands of ``ROWS`` values. Each band
+   is hashed into an ``LSHBucket`` row; only attachments that share at
+   least one bucket are compared, so an upload costs a handful of indexed
+   lookups instead of a scan over every earlier submission.
+
+Signatures and buckets are keyed by the content ``sha256``: identical
+files are processed once. The pure functions here do not touch the
+database so ``backfill_similarity`` can run them on a process pool.
+"""
+import hashlib
+import logging
+import os
+import re
+import zipfile
+import zlib
+from xml.etree import ElementTree
+
+import numpy as np
+from django.db import models, transaction
+
+logger = logging.getLogger(__name__)
+
+NUM_PERM = 128
+BANDS = 32
+ROWS = NUM_PERM // BANDS
+SHINGLE_SIZE = 3
+# أصغر عدد أولي بعد 2^32، فتبقى قيم التجزئة ضمن 64 بت دون فيض.
+HASH_PRIME = np.uint64(4294967311)
+SEED = 1
+# أقل تشابه مقدّر يُحفظ كتطابق ويُعرض في صفحة التقييم.
+MATCH_THRESHOLD = 0.5
+# عدد الـ shingles التي تُعالج معاً؛ يحد من ذاكرة المصفوفة NUM_PERM × CHUNK.
+CHUNK = 4096
+TEXT_EXTS = {".txt", ".docx", ".pdf"}
+# أكبر حجم لـ word/document.xml بعد الفك؛ ملف docx صغير قد يخفي مستنداً ضخماً (zip bomb).
+MAX_DOCX_XML_BYTES = 50 * 1024 * 1024
+
+_rng = np.random.default_rng(SEED)
+# a < 2^31 و x < 2^32 و b < 2^31: الناتج a*x + b أصغر من 2^64.
+_A = _rng.integers(1, 2**31, size=NUM_PERM, dtype=np.uint64).reshape(-1, 1)
+_B = _rng.integers(0, 2**31, size=NUM_PERM, dtype=np.uint64).reshape(-1, 1)
+_SHINGLE_WEIGHTS = np.array([(1000003**i) % 2**32 for i in range(SHINGLE_SIZE)], dtype=np.uint64)
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+_DOCX_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+
+def extract_text(path: str, name: str) -> str:
+    ext = os.path.splitext(name)[1].lower()
+    try:
+        if ext == ".txt":
+            with open(path, "rb") as handle:
+                return handle.read().decode("utf-8", errors="replace")
+        if ext == ".docx":
+            return _docx_text(path)
+        if ext == ".pdf":
+            return _pdf_text(path)
+    except (OSError, ValueError, KeyError, zipfile.BadZipFile, ElementTree.ParseError) as exc:
+        logger.warning("Text extraction failed for %s: %s", name, exc)
+    return ""
+
+
+def _docx_text(path: str) -> str:
+    with zipfile.ZipFile(path) as archive:
+        # KeyError إن لم يكن في الملف word/document.xml.
+        info = archive.getinfo("word/document.xml")
+        if info.file_size > MAX_DOCX_XML_BYTES:
+            raise ValueError(f"word/document.xml is {info.file_size} bytes after decompression")
+        with archive.open(info) as member:
+            # ZipExtFile لا يتجاوز file_size المعلن، والقراءة المحدودة تحمي إن كان الرأس كاذباً.
+            xml = member.read(MAX_DOCX_XML_BYTES + 1)
+    if len(xml) > MAX_DOCX_XML_BYTES:
+        raise ValueError("word/document.xml is too large")
+    root = ElementTree.fromstring(xml)
+    paragraphs = []
+    for paragraph in root.iter(f"{_DOCX_NS}p"):
+        paragraphs.append("".join(node.text or "" for node in paragraph.iter(f"{_DOCX_NS}t")))
+    return "\n".join(paragraphs)
+
+
+def _pdf_text(path: str) -> str:
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        logger.info("pypdf is not installed; PDF attachments are skipped.")
+        return ""
+    try:
+        reader = PdfReader(path)
+        return "\n".join(page.extract_text() or "" for page in reader.pages)
+    except Exception as exc:  # pypdf يرمي أنواعاً كثيرة من الأخطاء للملفات التالفة.
+        logger.warning("PDF extraction failed for %s: %s", path, exc)
+        return ""
+
+
+def shingle_hashes(text: str) -> np.ndarray:
+    """32-bit hashes of the distinct word ``SHINGLE_SIZE``-grams in ``text``."""
+    words = _WORD_RE.findall(text.lower())
+    if not words:
+        return np.empty(0, dtype=np.uint64)
+    tokens = np.fromiter((zlib.crc32(word.encode()) for word in words), dtype=np.uint64, count=len(words))
+    if len(tokens) < SHINGLE_SIZE:
+        return np.unique(tokens)
+    windows = np.lib.stride_tricks.sliding_window_view(tokens, SHINGLE_SIZE)
+    # كل الحدود أقل من 2^32 × 2^32؛ الجمع قد يلتف حول 2^64 وهذا مقبول لدالة تجزئة.
+    combined = (windows * _SHINGLE_WEIGHTS).sum(axis=1, dtype=np.uint64) & np.uint64(0xFFFFFFFF)
+    return np.unique(combined)
+
+
+def minhash(shingles: np.ndarray) -> np.ndarray:
+    signature = np.full(NUM_PERM, np.iinfo(np.uint64).max, dtype=np.uint64)
+    for start in range(0, len(shingles), CHUNK):
+        block = shingles[start:start + CHUNK].reshape(1, -1)
+        hashed = (_A * block + _B) % HASH_PRIME
+        np.minimum(signature, hashed.min(axis=1), out=signature)
+    return signature
+
+
+def band_hashes(signature: np.ndarray) -> list:
+    """One signed 64-bit bucket key per band."""
+    keys = []
+    for band in signature.reshape(BANDS, ROWS):
+        digest = hashlib.blake2b(band.tobytes(), digest_size=8).digest()
+        keys.append(int.from_bytes(digest, "big", signed=True))
+    return keys
+
+
+def estimate_similarity(first: np.ndarray, second: np.ndarray) -> float:
+    return float(np.count_nonzero(first == second)) / NUM_PERM
+
+
+def signature_from_bytes(data: bytes) -> np.ndarray:
+    return np.frombuffer(bytes(data), dtype=np.uint64)
+
+
+def compute_signature(path: str, name: str):
+    """Return ``(signature, shingle_count)`` or ``(None, 0)`` when there is no usable text."""
+    shingles = shingle_hashes(extract_text(path, name))
+    if not len(shingles):
+        return None, 0
+    return minhash(shingles), len(shingles)
+
+
+def is_indexable(name: str) -> bool:
+    return os.path.splitext(name)[1].lower() in TEXT_EXTS
+
+
+def store_signature(sha256: str, signature, shingle_count: int) -> bool:
+    """Save a signature and its LSH buckets; returns False when there was nothing to index."""
+    from .models import LSHBucket, TextSignature
+
+    with transaction.atomic():
+        _, created = TextSignature.objects.get_or_create(
+            sha256=sha256,
+            defaults={
+                "minhash": signature.tobytes() if signature is not None else b"",
+                "shingle_count": shingle_count,
+            },
+        )
+        if created and signature is not None:
+            LSHBucket.objects.bulk_create(
+                [
+                    LSHBucket(sha256=sha256, band=band, bucket=key)
+                    for band, key in enumerate(band_hashes(signature))
+                ]
+            )
+    return signature is not None
+
+
+def find_matches(sha256: str) -> int:
+    """Compare ``sha256`` with every signature sharing an LSH bucket and save the close ones."""
+    from .models import LSHBucket, SimilarityMatch, TextSignature
+
+    own = TextSignature.objects.filter(sha256=sha256, shingle_count__gt=0).first()
+    if own is None:
+        return 0
+    signature = signature_from_bytes(own.minhash)
+    same_bucket = models.Q()
+    for band, bucket in LSHBucket.objects.filter(sha256=sha256).values_list("band", "bucket"):
+        same_bucket |= models.Q(band=band, bucket=bucket)
+    candidates = set(
+        LSHBucket.objects.filter(same_bucket).exclude(sha256=sha256).values_list("sha256", flat=True)
+    )
+    if not candidates:
+        return 0
+
+    matches = []
+    for other in TextSignature.objects.filter(sha256__in=candidates, shingle_count__gt=0):
+        score = estimate_similarity(signature, signature_from_bytes(other.minhash))
+        if score >= MATCH_THRESHOLD:
+            first, second = sorted((sha256, other.sha256))
+            matches.append(SimilarityMatch(first_sha256=first, second_sha256=second, score=score))
+    SimilarityMatch.objects.bulk_create(
+        matches,
+        update_conflicts=True,
+        unique_fields=["first_sha256", "second_sha256"],
+        update_fields=["score"],
+    )
+    return len(matches)
+
+
+def similar_attachments(submission, limit: int = 10) -> list:
+    """Attachments of other submissions whose content resembles ``submission``'s.
+
+    Returns ``(own_attachment, other_attachment, score)`` tuples, best first.
+    """
+    from .models import SimilarityMatch, SubmissionAttachment
+
+    own = {attachment.sha256: attachment for attachment in submission.attachments.all() if attachment.sha256}
+    if not own:
+        return []
+    pairs = SimilarityMatch.objects.filter(
+        models.Q(first_sha256__in=own) | models.Q(second_sha256__in=own)
+    ).order_by("-score")
+    scores = {}
+    for match in pairs:
+        mine, other = (
+            (match.first_sha256, match.second_sha256)
+            if match.first_sha256 in own
+            else (match.second_sha256, match.first_sha256)
+        )
+        scores.setdefault(other, (mine, match.score))
+    if not scores:
+        return []
+    others = (
+        SubmissionAttachment.objects.filter(sha256__in=scores)
+        .exclude(submission=submission)
+        .select_related("submission__user", "submission__assignment")
+    )
+    results = [(own[scores[other.sha256][0]], other, scores[other.sha256][1]) for other in others]
+    results.sort(key=lambda row: row[2], reverse=True)
+    return results[:limit]
+
+
+def index_attachment(attachment) -> None:
+    """Extract, sign, bucket and match one attachment's content."""
+    from .models import TextSignature
+
+    if not attachment.sha256 or not is_indexable(attachment.display_name):
+        return
+    if TextSignature.objects.filter(sha256=attachment.sha256).exists():
+        return
+    try:
+        path = attachment.file.path
+    except (NotImplementedError, ValueError):
+        return
+    signature, shingle_count = compute_signature(path, attachment.display_name)
+    if store_signature(attachment.sha256, signature, shingle_count):
+        find_matches(attachment.sha256)
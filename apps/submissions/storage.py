@@ -0,0 +1,74 @@
+"""Content-addressed storage for submission attachments.
+
+A blob is stored once under ``blobs/ab/cd/<sha256>`` no matter how many
+attachments point at it; the two fan-out levels keep every directory
+small. The attachment keeps the student's file name in ``original_name``
+and ``StoredBlob`` counts the references so ``gc_blobs`` knows when a blob
+can go.
+"""
+import os
+import shutil
+import tempfile
+
+from django.core.files.move import file_move_safe
+from django.core.files.storage import FileSystemStorage
+
+BLOB_ROOT = "blobs"
+
+
+def blob_name(sha256: str) -> str:
+    return f"{BLOB_ROOT}/{sha256[:2]}/{sha256[2:4]}/{sha256}"
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """``FileSystemStorage`` where a name is the content's hash.
+
+    Saving a name that already exists keeps the stored copy (same name,
+    same bytes) and only refreshes its mtime, which ``gc_blobs`` uses as a
+    grace period for uploads whose database row is not committed yet.
+    New blobs are written beside their final path and ``os.replace``-d
+    into place, so readers never see a partial file.
+    """
+
+    def get_available_name(self, name, max_length=None):
+        return name
+
+    def _save(self, name, content):
+        full_path = self.path(name)
+        if os.path.exists(full_path):
+            os.utime(full_path)
+            return name
+
+        directory = os.path.dirname(full_path)
+        os.makedirs(directory, exist_ok=True)
+        if hasattr(content, "temporary_file_path"):
+            # ملف الرفع المؤقت على نفس نظام الملفات؛ النقل هنا إعادة تسمية فقط.
+            file_move_safe(content.temporary_file_path(), full_path, allow_overwrite=True)
+        else:
+            fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+            try:
+                with os.fdopen(fd, "wb") as destination:
+                    if hasattr(content, "chunks"):
+                        for chunk in content.chunks():
+                            destination.write(chunk)
+                    else:
+                        content.seek(0)
+                        shutil.copyfileobj(content, destination)
+                os.replace(temp_path, full_path)
+            except BaseException:
+                try:
+                    os.remove(temp_path)
+                except FileNotFoundError:
+                    pass
+                raise
+        if self.file_permissions_mode is not None:
+            os.chmod(full_path, self.file_permissions_mode)
+        return name
+
+
+# يتبع MEDIA_ROOT و MEDIA_URL، فالمسارات القديمة مثل submission_files/... تبقى صالحة حتى تُرحَّل.
+blob_storage = ContentAddressedStorage()
+
+
+def get_blob_storage():
+    return blob_storage
@@ -0,0 +1,46 @@
+import shutil
+import tempfile
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from apps.assignments.models import Assignment
+from apps.courses.models import Course
+
+from .models import Submission, SubmissionAttachment
+from .storage import blob_name
+
+
+class AttachmentCleanTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        student = get_user_model().objects.create_user("student", password="x")
+        course = Course.objects.create(name="Course")
+        assignment = Assignment.objects.create(
+            course=course, title="Assignment", due_date=timezone.now() + timedelta(days=1)
+        )
+        self.submission = Submission.objects.create(assignment=assignment, user=student)
+
+    def _attachment(self, name, content=b"report"):
+        attachment = SubmissionAttachment(submission=self.submission, file=ContentFile(content, name=name))
+        attachment.save()
+        return attachment
+
+    def test_stored_attachment_passes_full_clean(self):
+        attachment = self._attachment("report.pdf")
+        self.assertEqual(attachment.file.name, blob_name(attachment.sha256))
+        attachment.full_clean()
+
+    def test_stored_attachment_keeps_extension_check(self):
+        attachment = self._attachment("script.exe")
+        with self.assertRaises(ValidationError):
+            attachment.full_clean()
@@ -0,0 +1,76 @@
+"""Upload handler that hashes and sizes submission files while they stream in.
+
+The default handlers buffer the file in memory or a temp directory, then
+``SubmissionAttachment.save`` reads it again for the SHA-256 and the
+storage copies it a third time into ``media/``. ``HashingUploadHandler``
+does the hashing in the same pass that receives the request body and
+spools into ``SUBMISSION_UPLOAD_TEMP_DIR``, which sits inside
+``MEDIA_ROOT`` so ``FileSystemStorage`` moves the finished file into place
+with a rename instead of a copy.
+"""
+import hashlib
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.files.base import File
+from django.core.files.uploadedfile import TemporaryUploadedFile, UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler
+
+from .models import MAX_BYTES
+
+
+class HashedUploadedFile(TemporaryUploadedFile):
+    """A ``TemporaryUploadedFile`` that already knows its SHA-256."""
+
+    def __init__(self, name, content_type, size, charset, content_type_extra=None):
+        directory = settings.SUBMISSION_UPLOAD_TEMP_DIR
+        os.makedirs(directory, exist_ok=True)
+        _, ext = os.path.splitext(name)
+        file = tempfile.NamedTemporaryFile(suffix=".upload" + ext, dir=directory)
+        UploadedFile.__init__(self, file, name, content_type, size, charset, content_type_extra)
+        self.sha256 = ""
+
+
+class StagedFile(File):
+    """A fully received file on local disk, e.g. the assembled chunks of an ``UploadSession``.
+
+    Like ``HashedUploadedFile`` it exposes ``temporary_file_path`` so the
+    storage renames it into place, and carries its precomputed ``sha256``.
+    """
+
+    def __init__(self, path, name, sha256):
+        super().__init__(open(path, "rb"), name=name)
+        self.path = str(path)
+        self.sha256 = sha256
+        self.size = os.path.getsize(path)
+
+    def temporary_file_path(self):
+        return self.path
+
+
+class HashingUploadHandler(FileUploadHandler):
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.file = HashedUploadedFile(self.file_name, self.content_type, 0, self.charset, self.content_type_extra)
+        self.hasher = hashlib.sha256()
+        self.received = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        # الملف المرفوض بسبب الحجم لا داعي لكتابته أو حساب بصمته؛ نكتفي بعدّ بايتاته.
+        if self.received <= MAX_BYTES:
+            self.hasher.update(raw_data)
+            self.file.write(raw_data)
+        return None
+
+    def file_complete(self, file_size):
+        self.file.seek(0)
+        self.file.size = self.received
+        if self.received <= MAX_BYTES:
+            self.file.sha256 = self.hasher.hexdigest()
+        return self.file
+
+    def upload_interrupted(self):
+        if hasattr(self, "file"):
+            self.file.close()
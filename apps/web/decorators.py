@@ -1,5 +1,6 @@
 from functools import wraps
 
+from asgiref.sync import iscoroutinefunction, sync_to_async
 from django.contrib import messages
 from django.contrib.auth import REDIRECT_FIELD_NAME
 from django.core.exceptions import PermissionDenied
@@ -48,17 +49,34 @@ def admin_gate_required(view_func):
     return _wrapped
 
 
+def _activation_redirect(request):
+    profile = getattr(request.user, "profile", None)
+    if profile and profile.role == "student" and not is_student_activated(request.user):
+        request.session["activation_redirect"] = request.get_full_path()
+        messages.warning(
+            request,
+            "يجب تفعيل الحساب برمز دعوة قبل المتابعة.",
+        )
+        return redirect("web:invite_accept")
+    return None
+
+
 def student_verified_required(view_func):
+    if iscoroutinefunction(view_func):
+        @wraps(view_func)
+        async def _async_wrapped(request, *args, **kwargs):
+            response = await sync_to_async(_activation_redirect)(request)
+            if response is not None:
+                return response
+            return await view_func(request, *args, **kwargs)
+
+        return _async_wrapped
+
     @wraps(view_func)
     def _wrapped(request, *args, **kwargs):
-        profile = getattr(request.user, "profile", None)
-        if profile and profile.role == "student" and not is_student_activated(request.user):
-            request.session["activation_redirect"] = request.get_full_path()
-            messages.warning(
-                request,
-                "يجب تفعيل الحساب برمز دعوة قبل المتابعة.",
-            )
-            return redirect("web:invite_accept")
+        response = _activation_redirect(request)
+        if response is not None:
+            return response
         return view_func(request, *args, **kwargs)
 
     return _wrapped
@@ -45,6 +45,15 @@ class MultiFileInput(ClearableFileInput):
         return []
 
 
+class MultipleFileField(forms.FileField):
+    """``FileField`` that accepts the list ``MultiFileInput`` returns."""
+
+    def clean(self, data, initial=None):
+        if isinstance(data, (list, tuple)):
+            return [super(MultipleFileField, self).clean(item, initial) for item in data]
+        return super().clean(data, initial)
+
+
 class SystemSettingForm(forms.ModelForm):
     admin_password = forms.CharField(
         label="كلمة مرور المشرف",
@@ -145,7 +154,7 @@ else:  # pragma: no cover
 
 
 class SubmissionUploadForm(forms.Form):
-    files = forms.FileField(
+    files = MultipleFileField(
         label="الملفات",
         required=False,
         widget=MultiFileInput(),
@@ -0,0 +1,134 @@
+"""Write CSV and XLSX sheets as a stream of byte chunks.
+
+Both writers take a header and an iterable of rows and yield bytes as
+the rows arrive, so a view can hand them a database iterator and start
+responding before the last row is read. Rows are buffered in batches of
+``ROWS_PER_CHUNK`` to avoid one tiny write per row.
+
+An XLSX file is a ZIP of a few fixed XML parts plus one worksheet; the
+worksheet is written row by row with inline strings (no shared-strings
+table to build up front) and the ZIP is produced by ``zipstream``.
+"""
+import csv
+import io
+import re
+from xml.sax.saxutils import escape
+
+from .zipstream import ZipMember, stream_zip
+
+ROWS_PER_CHUNK = 500
+# BOM حتى يعرض Excel الأسماء العربية بشكل صحيح.
+CSV_BOM = b"\xef\xbb\xbf"
+# محارف تحكم لا يقبلها XML 1.0 حتى لو كانت مهربة.
+_XML_ILLEGAL = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")
+# نص يبدأ بهذه المحارف ينفذه Excel كصيغة عند فتح ملف CSV.
+_FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    "</Types>"
+)
+_ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/>'
+    "</Relationships>"
+)
+_WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets><sheet name="{name}" sheetId="1" r:id="rId1"/></sheets>'
+    "</workbook>"
+)
+_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet1.xml"/>'
+    "</Relationships>"
+)
+_SHEET_HEAD = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<sheetViews><sheetView rightToLeft="1" workbookViewId="0"/></sheetViews>'
+    "<sheetData>"
+)
+_SHEET_TAIL = "</sheetData></worksheet>"
+
+
+def _batches(header, rows, encode_row):
+    batch = [encode_row(header)]
+    for row in rows:
+        batch.append(encode_row(row))
+        if len(batch) >= ROWS_PER_CHUNK:
+            yield "".join(batch).encode("utf-8")
+            batch = []
+    if batch:
+        yield "".join(batch).encode("utf-8")
+
+
+def csv_line(row) -> bytes:
+    return _csv_text(row).encode("utf-8")
+
+
+def _csv_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, str) and value.startswith(_FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def _csv_text(row) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(_csv_value(value) for value in row)
+    return buffer.getvalue()
+
+
+def stream_csv(header, rows):
+    yield CSV_BOM
+    yield from _batches(header, rows, _csv_text)
+
+
+def _xlsx_cell(value) -> str:
+    if value is None or value == "":
+        return "<c/>"
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return f"<c><v>{value}</v></c>"
+    text = escape(_XML_ILLEGAL.sub("", str(value)))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+def _xlsx_row(row) -> str:
+    return "<row>" + "".join(_xlsx_cell(value) for value in row) + "</row>"
+
+
+def _sheet_chunks(header, rows):
+    yield _SHEET_HEAD.encode("utf-8")
+    yield from _batches(header, rows, _xlsx_row)
+    yield _SHEET_TAIL.encode("utf-8")
+
+
+def stream_xlsx(header, rows, sheet_name: str = "Sheet1"):
+    # اسم الورقة في Excel لا يتجاوز 31 حرفاً ولا يقبل بعض الرموز.
+    sheet_name = escape(re.sub(r"[\[\]:*?/\\]", " ", sheet_name)[:31] or "Sheet1", {'"': "&quot;"})
+    parts = [
+        ("[Content_Types].xml", _CONTENT_TYPES),
+        ("_rels/.rels", _ROOT_RELS),
+        ("xl/workbook.xml", _WORKBOOK.format(name=sheet_name)),
+        ("xl/_rels/workbook.xml.rels", _WORKBOOK_RELS),
+    ]
+    members = [ZipMember(name=name, chunks=[text.encode("utf-8")], size=len(text.encode("utf-8"))) for name, text in parts]
+    members.append(ZipMember(name="xl/worksheets/sheet1.xml", chunks=_sheet_chunks(header, rows)))
+    return stream_zip(members)
@@ -1,5 +1,7 @@
-﻿from django.urls import path
+﻿from django.conf import settings
+from django.urls import path
 
+from . import views_async
 from .views import (
     admin_access_view,
     admin_panel,
@@ -9,9 +11,13 @@ from .views import (
     assignments_list,
     chat_list,
     chat_mark_read,
+    chat_messages_history,
     chat_messages_poll,
     chat_room,
+    chat_send,
     chat_start,
+    chat_stream,
+    chat_sync,
     chat_unread_count,
     course_create,
     courses_list,
@@ -22,25 +28,74 @@ from .views import (
     student_home,
     submission_create,
     submissions_list,
+    teacher_duplicates,
     teacher_home,
     teacher_submissions,
 )
+from .views_exports import assignment_grades_export, course_grades_export
+from .views_files import (
+    assignment_attachment_download,
+    assignment_submissions_zip,
+    attachment_download,
+    attachment_preview,
+    attachment_zip_contents,
+    attachment_zip_member,
+    submission_file_download,
+)
+from .views_gradebook import course_analytics, course_gradebook_json, course_gradebook_view
+from .views_grading import (
+    bulk_grade,
+    bulk_grade_api,
+    grading_queue,
+    grading_queue_extend,
+    grading_queue_skip,
+    grading_queue_stop,
+)
 from .views_profile import profile_view
+from .views_uploads import upload_chunk, upload_finalize, upload_init, upload_status
 
 app_name = "web"
 
+if settings.CHAT_ASYNC_VIEWS:
+    chat_unread_count = views_async.chat_unread_count
+    chat_messages_poll = views_async.chat_messages_poll
+    chat_mark_read = views_async.chat_mark_read
+
 urlpatterns = [
     path("", home, name="home"),
     path("student/", student_home, name="student_home"),
     path("courses/", courses_list, name="courses_list"),
     path("assignments/", assignments_list, name="assignments_list"),
     path("assignments/<int:pk>/", assignment_detail, name="assignment_detail"),
+    path("assignments/<int:pk>/attachment/", assignment_attachment_download, name="assignment_attachment_download"),
     path("submissions/", submissions_list, name="submissions_list"),
     path("submissions/new/<int:assignment_id>/", submission_create, name="submission_create"),
+    path("submissions/<int:pk>/file/", submission_file_download, name="submission_file_download"),
+    path("submissions/attachments/<int:pk>/", attachment_download, name="attachment_download"),
+    path("submissions/attachments/<int:pk>/preview/<int:size>/", attachment_preview, name="attachment_preview"),
+    path("submissions/attachments/<int:pk>/contents/", attachment_zip_contents, name="attachment_zip_contents"),
+    path("submissions/attachments/<int:pk>/contents/<int:index>/", attachment_zip_member, name="attachment_zip_member"),
+    path("submissions/upload/<int:assignment_id>/", upload_init, name="upload_init"),
+    path("submissions/upload/session/<uuid:session_id>/", upload_status, name="upload_status"),
+    path("submissions/upload/session/<uuid:session_id>/<int:index>/", upload_chunk, name="upload_chunk"),
+    path("submissions/upload/session/<uuid:session_id>/finalize/", upload_finalize, name="upload_finalize"),
     path("teacher/", teacher_home, name="teacher_home"),
     path("teacher/courses/new/", course_create, name="course_create"),
     path("teacher/assignments/new/", assignment_create, name="assignment_create"),
     path("teacher/submissions/", teacher_submissions, name="teacher_submissions"),
+    path("teacher/submissions/grades/", bulk_grade_api, name="bulk_grade_api"),
+    path("teacher/queue/", grading_queue, name="grading_queue"),
+    path("teacher/queue/<int:pk>/skip/", grading_queue_skip, name="grading_queue_skip"),
+    path("teacher/queue/stop/", grading_queue_stop, name="grading_queue_stop"),
+    path("teacher/queue/extend/", grading_queue_extend, name="grading_queue_extend"),
+    path("teacher/submissions/duplicates/", teacher_duplicates, name="teacher_duplicates"),
+    path("teacher/assignments/<int:pk>/submissions.zip", assignment_submissions_zip, name="assignment_submissions_zip"),
+    path("teacher/assignments/<int:pk>/grade/", bulk_grade, name="bulk_grade"),
+    path("teacher/assignments/<int:pk>/grades.<str:fmt>", assignment_grades_export, name="assignment_grades_export"),
+    path("teacher/courses/<int:pk>/gradebook/", course_gradebook_view, name="course_gradebook"),
+    path("teacher/courses/<int:pk>/analytics/", course_analytics, name="course_analytics"),
+    path("teacher/courses/<int:pk>/gradebook.json", course_gradebook_json, name="course_gradebook_json"),
+    path("teacher/courses/<int:pk>/grades.<str:fmt>", course_grades_export, name="course_grades_export"),
     path("teacher/submissions/<int:pk>/grade/", grade_submission, name="grade_submission"),
     path("invite/new/", invite_new, name="invite_new"),
     path("invite/accept/", invite_accept, name="invite_accept"),
@@ -48,8 +103,12 @@ urlpatterns = [
     path("chat/start/", chat_start, name="chat_start"),
     path("chat/<int:pk>/", chat_room, name="chat_room"),
     path("chat/api/unread-count/", chat_unread_count, name="chat_unread_count"),
+    path("chat/api/sync/", chat_sync, name="chat_sync"),
     path("chat/api/messages/<int:pk>/", chat_messages_poll, name="chat_messages_poll"),
+    path("chat/api/messages/<int:pk>/history/", chat_messages_history, name="chat_messages_history"),
     path("chat/api/mark-read/<int:pk>/", chat_mark_read, name="chat_mark_read"),
+    path("chat/api/send/<int:pk>/", chat_send, name="chat_send"),
+    path("chat/api/stream/<int:pk>/", chat_stream, name="chat_stream"),
     path("profile/", profile_view, name="profile"),
     path("admin-panel/access/", admin_access_view, name="admin_access"),
     path("admin-panel/", admin_panel, name="admin_panel"),
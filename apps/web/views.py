@@ -1,24 +1,38 @@
-﻿from collections import Counter
+﻿import asyncio
+import hashlib
+import json
+from urllib.parse import urlencode
 
 from django import forms
+from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required
 from django.core.exceptions import PermissionDenied, ValidationError
-from django.db.models import Q
+from django.db.models import OuterRef, Prefetch, Q, Subquery
 from django.db import transaction
 from django.db.utils import OperationalError, ProgrammingError
-from django.http import JsonResponse
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
-from django.views.decorators.csrf import csrf_protect
+from django.urls import reverse
+from django.middleware.csrf import get_token
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
 from django.views.decorators.http import require_GET, require_POST
 from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
 
 from apps.accounts.models import Invitation, SiteSetting
 from apps.assignments.models import Assignment
 from apps.courses.models import Course
+from apps.messaging.hub import conversation_channel, hub
 from apps.messaging.models import Conversation, Message
-from apps.submissions.models import Submission, SubmissionAttachment
+from apps.submissions.analytics import grade_stats
+from apps.submissions.grading_queue import claim, claim_next, scope_from
+from apps.submissions.models import StoredBlob, Submission, SubmissionAttachment
+from apps.submissions.similarity import similar_attachments
+from apps.submissions.uploadhandlers import HashingUploadHandler
 
 from .decorators import (
     admin_gate_required,
@@ -39,6 +53,23 @@ from .forms import (
 
 User = get_user_model()
 
+# كل اتصال SSE يُغلق بعد هذه المدة ويعيد المتصفح الاتصال تلقائياً.
+CHAT_STREAM_MAX_SECONDS = 300
+CHAT_STREAM_HEARTBEAT_SECONDS = 15
+# عدد الرسائل المعروضة عند فتح المحادثة وفي كل صفحة من السجل الأقدم.
+CHAT_PAGE_SIZE = 50
+# حدود فترة المزامنة التي يقترحها الخادم على المتصفح (بالملّي ثانية).
+CHAT_SYNC_MIN_MS = 2000
+CHAT_SYNC_FOCUSED_MAX_MS = 5000
+CHAT_SYNC_MAX_MS = 60000
+CHAT_SYNC_HIDDEN_MAX_MS = 120000
+CHAT_SYNC_MAX_CONVERSATIONS = 20
+CHAT_SYNC_MAX_MESSAGES = 200
+# بعد هذا العدد من الجولات الفارغة تبلغ الفترة حدها الأقصى، فلا معنى لقيمة أكبر من العميل.
+CHAT_SYNC_MAX_IDLE = 6
+# أكبر رقم رسالة يقبله عمود BIGINT؛ القيم الأكبر من العميل تُقصّ إليه بدل OverflowError.
+MAX_MESSAGE_ID = 2**63 - 1
+
 
 class GradeForm(forms.Form):
     grade = forms.IntegerField(
@@ -74,6 +105,9 @@ def student_home(request):
     return render(request, "web/student_home.html", context)
 
 
+TEACHER_HOME_STATS_LIMIT = 6
+
+
 @login_required
 @teacher_required
 def teacher_home(request):
@@ -82,15 +116,110 @@ def teacher_home(request):
             "total_submissions": Submission.objects.count(),
             "pending_submissions": Submission.objects.filter(grade__isnull=True).count(),
             "assignments_count": Assignment.objects.count(),
+            "recent_stats": grade_stats(
+                Assignment.objects.select_related("course").order_by("-due_date")[:TEACHER_HOME_STATS_LIMIT]
+            )[1],
         }
     except (OperationalError, ProgrammingError):
         messages.info(request, "سيتم تفعيل لوحة المعلم بعد ترحيل الجداول.")
-        context = {"total_submissions": 0, "pending_submissions": 0, "assignments_count": 0}
+        context = {"total_submissions": 0, "pending_submissions": 0, "assignments_count": 0, "recent_stats": []}
     return render(request, "web/teacher_home.html", context)
 
 
+def _with_validators(response, etag=None, last_modified=None, **cache_control):
+    if etag:
+        response.headers["ETag"] = etag
+    if last_modified:
+        response.headers["Last-Modified"] = http_date(last_modified.timestamp())
+    patch_cache_control(response, **cache_control)
+    return response
+
+
+def _not_modified(request, etag=None, last_modified=None, **cache_control):
+    """Return a 304 response when the client's copy still matches, else None."""
+    response = get_conditional_response(
+        request,
+        etag=etag,
+        last_modified=int(last_modified.timestamp()) if last_modified else None,
+    )
+    if response is None:
+        return None
+    return _with_validators(response, etag, last_modified, **cache_control)
+
+
+# صفحات القوائم تُعاد التحقق منها في كل زيارة لكنها لا تُرسل كاملة إلا عند تغيّرها.
+LIST_PAGE_CACHE = {"private": True, "max_age": 0, "must_revalidate": True}
+# نقاط الاستطلاع يسأل عنها المتصفح كل بضع ثوانٍ؛ يحتفظ بآخر نسخة ويتحقق منها دائماً.
+POLL_CACHE = {"private": True, "no_cache": True}
+
+
+def _csrf_secret(request) -> str:
+    # الصفحة تحمل رمز CSRF؛ إذا تغيّر السرّ فالنسخة المخزنة لدى المتصفح لم تعد صالحة.
+    get_token(request)
+    return request.META.get("CSRF_COOKIE", "")
+
+
+def _viewer_stamp(request) -> str:
+    """Everything in ``base.html`` that differs between visitors."""
+    user = request.user
+    profile = getattr(user, "profile", None)
+    return ":".join(
+        str(part)
+        for part in (
+            user.pk,
+            getattr(profile, "role", ""),
+            getattr(profile, "is_verified_student", ""),
+            user.is_superuser,
+            bool(request.session.get("admin_gate_ok")),
+            _csrf_secret(request),
+            timezone.localdate().year,
+        )
+    )
+
+
+def _catalog_validators(request, page: str):
+    """ETag and Last-Modified for the course and assignment lists.
+
+    Both pages list every course and assignment to every viewer, so the
+    stamp covers both tables; what differs per viewer is in
+    ``_viewer_stamp``. ``updated_at`` (set on insert and on every edit)
+    catches inserts and edits, the row count catches deletes. Each value
+    is its own query so ``MAX`` is a single lookup at the end of the
+    ``updated_at`` index and ``COUNT`` walks that index rather than the
+    table; they run before the page query and the template render.
+    """
+    stamps = []
+    last_modified = None
+    for model in (Course, Assignment):
+        updated = model.objects.order_by("-updated_at").values_list("updated_at", flat=True).first()
+        count = model.objects.order_by().count()
+        stamps.append(f"{count}-{updated.timestamp() if updated else 0}")
+        if updated and (last_modified is None or updated > last_modified):
+            last_modified = updated
+    digest = hashlib.sha1(f"{_viewer_stamp(request)}|{'|'.join(stamps)}".encode()).hexdigest()
+    return f'"{page}-{digest}"', last_modified
+
+
+def _conditional_list(request, page: str, render_page):
+    # الرسائل المعلّقة تُعرض مرة واحدة، فلا يجوز الرد بـ 304 قبل أن تُستهلك.
+    if len(messages.get_messages(request)):
+        return render_page()
+    try:
+        etag, last_modified = _catalog_validators(request, page)
+    except (OperationalError, ProgrammingError):
+        return render_page()
+    response = _not_modified(request, etag, last_modified, **LIST_PAGE_CACHE)
+    if response is not None:
+        return response
+    return _with_validators(render_page(), etag, last_modified, **LIST_PAGE_CACHE)
+
+
 @login_required
 def courses_list(request):
+    return _conditional_list(request, "courses", lambda: _render_courses_list(request))
+
+
+def _render_courses_list(request):
     try:
         courses = Course.objects.all()
     except (OperationalError, ProgrammingError):
@@ -100,6 +229,10 @@ def courses_list(request):
 
 @login_required
 def assignments_list(request):
+    return _conditional_list(request, "assignments", lambda: _render_assignments_list(request))
+
+
+def _render_assignments_list(request):
     try:
         assignments = Assignment.objects.select_related("course").all()
         profile = getattr(request.user, "profile", None)
@@ -140,9 +273,18 @@ def submissions_list(request):
         submissions = Submission.objects.none()
     return render(request, "web/submissions_list.html", {"submissions": submissions})
 
+@csrf_exempt
 @login_required
 @student_verified_required
 def submission_create(request, assignment_id):
+    # معالج الرفع يجب أن يُضبط قبل أن يقرأ أي شيء request.POST، بما في ذلك وسيط CSRF،
+    # لذلك يُعفى العرض الخارجي ويُتحقق من الرمز في العرض الداخلي.
+    request.upload_handlers = [HashingUploadHandler(request)]
+    return _submission_create(request, assignment_id)
+
+
+@csrf_protect
+def _submission_create(request, assignment_id):
     try:
         assignment = get_object_or_404(Assignment, pk=assignment_id)
     except (OperationalError, ProgrammingError):
@@ -202,26 +344,66 @@ def submission_create(request, assignment_id):
 def teacher_submissions(request):
     try:
         submissions = (
-            Submission.objects.select_related("assignment", "assignment__course", "user")
-            .prefetch_related("attachments")
+            Submission.objects.select_related("assignment", "assignment__course", "user", "grading_by")
+            .prefetch_related(Prefetch("attachments", queryset=_attachments_with_blob_info()))
             .order_by("assignment__due_date", "-created_at")
         )
     except (OperationalError, ProgrammingError):
         messages.info(request, "ستظهر التسليمات بعد تهيئة قاعدة البيانات.")
         submissions = Submission.objects.none()
-        duplicates = Counter()
-    else:
-        duplicates = Counter()
-        for submission in submissions:
-            for attachment in submission.attachments.all():
-                if attachment.sha256:
-                    duplicates[attachment.sha256] += 1
     return render(
         request,
         "web/teacher_submissions.html",
         {
             "submissions": submissions,
-            "dup_map": duplicates,
+            "now": timezone.now(),
+        },
+    )
+
+
+def _attachments_with_blob_info():
+    """Attachments annotated with how many attachments share their content and whether it has a preview.
+
+    Both values are read from ``StoredBlob`` by primary key inside the
+    attachments prefetch, so the page does not scan other submissions.
+    """
+    blob = StoredBlob.objects.filter(sha256=OuterRef("sha256"))
+    return SubmissionAttachment.objects.annotate(
+        duplicates=Subquery(blob.values("copies")[:1]),
+        has_preview=Subquery(blob.values("has_preview")[:1]),
+    )
+
+
+DUPLICATE_REPORT_LIMIT = 200
+
+
+@login_required
+@teacher_required
+def teacher_duplicates(request):
+    try:
+        groups = list(
+            StoredBlob.objects.filter(copies__gt=1).order_by("-copies", "-size_bytes")[:DUPLICATE_REPORT_LIMIT]
+        )
+        total_groups = StoredBlob.objects.filter(copies__gt=1).count()
+        members = {}
+        attachments = (
+            SubmissionAttachment.objects.filter(sha256__in=[group.sha256 for group in groups])
+            .select_related("submission__user", "submission__assignment")
+            .order_by("submission__created_at")
+        )
+        for attachment in attachments:
+            members.setdefault(attachment.sha256, []).append(attachment)
+        for group in groups:
+            group.members = members.get(group.sha256, [])
+    except (OperationalError, ProgrammingError):
+        messages.info(request, "سيظهر تقرير التكرار بعد تهيئة قاعدة البيانات.")
+        groups, total_groups = [], 0
+    return render(
+        request,
+        "web/teacher_duplicates.html",
+        {
+            "groups": groups,
+            "total_groups": total_groups,
         },
     )
 
@@ -275,12 +457,22 @@ def assignment_create(request):
     return render(request, "web/assignment_form.html", {"form": form, "title": "إضافة واجب"})
 
 
+# التسليمات التي تخطاها المعلم في قائمة التقييم خلال الجلسة.
+GRADING_SKIPPED_SESSION_KEY = "grading_skipped"
+# مرفقات التسليم التالي التي يجلبها المتصفح مسبقاً أثناء تقييم الحالي؛ الأكبر منها يُنزَّل عند الطلب.
+GRADING_PREFETCH_MAX_BYTES = 2 * 1024 * 1024
+
+
 @login_required
 @teacher_required
 def grade_submission(request, pk: int):
+    in_queue = request.GET.get("queue") == "1"
+    scope = scope_from(request.GET) if in_queue else {}
     try:
         submission = get_object_or_404(
-            Submission.objects.select_related("assignment", "user").prefetch_related("attachments"),
+            Submission.objects.select_related("assignment", "user", "grading_by").prefetch_related(
+                Prefetch("attachments", queryset=_attachments_with_blob_info())
+            ),
             pk=pk,
         )
     except (OperationalError, ProgrammingError):
@@ -292,12 +484,17 @@ def grade_submission(request, pk: int):
         if form.is_valid():
             submission.grade = form.cleaned_data["grade"]
             submission.feedback = form.cleaned_data["feedback"]
+            # التسليم المقيّم يخرج من قائمة التقييم فلا معنى لبقاء حجزه.
+            submission.grading_by = None
+            submission.grading_until = None
             try:
-                submission.save(update_fields=["grade", "feedback"])
+                submission.save(update_fields=["grade", "feedback", "updated_at", "grading_by", "grading_until"])
             except (OperationalError, ProgrammingError):
                 messages.error(request, "تعذّر حفظ التقييم. حاول لاحقاً بعد تهيئة قاعدة البيانات.")
             else:
                 messages.success(request, "تم حفظ التقييم بنجاح.")
+                if in_queue:
+                    return redirect(f"{reverse('web:grading_queue')}?{urlencode(scope)}")
                 return redirect("web:teacher_submissions")
         else:
             messages.error(request, "يرجى مراجعة الحقول ثم المحاولة مجدداً.")
@@ -309,12 +506,54 @@ def grade_submission(request, pk: int):
             }
         )
 
+    try:
+        similar = similar_attachments(submission)
+    except (OperationalError, ProgrammingError):
+        similar = []
+
+    claimed = False
+    next_submission = None
+    if in_queue:
+        try:
+            claimed = claim(request.user, submission.pk)
+            # يُحجز التسليم التالي الآن ليجلب المتصفح ملفاته بينما يعمل المعلم على الحالي.
+            next_id = claim_next(
+                request.user,
+                scope,
+                exclude=[submission.pk, *request.session.get(GRADING_SKIPPED_SESSION_KEY, [])],
+            )
+            if next_id is not None:
+                next_submission = (
+                    Submission.objects.select_related("assignment", "user")
+                    .prefetch_related(Prefetch("attachments", queryset=_attachments_with_blob_info()))
+                    .filter(pk=next_id)
+                    .first()
+                )
+        except (OperationalError, ProgrammingError):
+            pass
+    lease_holder = None
+    if (
+        not claimed
+        and submission.grade is None
+        and submission.grading_by_id not in (None, request.user.pk)
+        and submission.grading_until
+        and submission.grading_until > timezone.now()
+    ):
+        lease_holder = submission.grading_by
+
     return render(
         request,
         "web/grade_form.html",
         {
             "form": form,
             "submission": submission,
+            "similar": similar,
+            "in_queue": in_queue,
+            "queue_query": urlencode(scope),
+            "next_submission": next_submission,
+            "lease_holder": lease_holder,
+            "lease_seconds": settings.GRADING_LEASE_SECONDS,
+            "prefetch_max_bytes": GRADING_PREFETCH_MAX_BYTES,
         },
     )
 
@@ -447,29 +686,11 @@ def invite_accept(request):
 @student_verified_required
 def chat_list(request):
     try:
-        qs = Conversation.objects.filter(
-            Q(student=request.user) | Q(teacher=request.user)
-        ).select_related("student", "teacher", "assignment")
-        unread_map = {}
-        try:
-            role = getattr(
-                getattr(request.user, "profile", None),
-                "role",
-                "student" if not request.user.is_staff else "teacher",
-            )
-            # unread_map اختياري؛ إن تعذّر نحطه فارغ
-            for conversation in qs:
-                msgs = conversation.messages.exclude(sender=request.user)
-                if role == "student":
-                    unread_map[conversation.id] = msgs.filter(is_read_by_student=False).count()
-                else:
-                    unread_map[conversation.id] = msgs.filter(is_read_by_teacher=False).count()
-        except (OperationalError, ProgrammingError):
-            unread_map = {}
+        conversations = list(Conversation.objects.inbox(request.user))
         return render(
             request,
             "web/chat_list.html",
-            {"conversations": qs, "unread_map": unread_map},
+            {"conversations": conversations},
         )
     except (OperationalError, ProgrammingError):
         messages.info(
@@ -479,7 +700,7 @@ def chat_list(request):
         return render(
             request,
             "web/chat_list.html",
-            {"conversations": [], "unread_map": {}},
+            {"conversations": []},
         )
 
 @login_required
@@ -518,6 +739,20 @@ def chat_start(request):
     return render(request, "web/chat_start.html", {"form": form})
 
 
+def _message_page(conversation, before=None):
+    """Return up to ``CHAT_PAGE_SIZE`` messages older than ``before`` (oldest first).
+
+    Pages are cut by keyset on ``(conversation_id, id)`` so the cost does
+    not depend on how long the conversation is.
+    """
+    queryset = Message.objects.prefetch_related("sender").filter(conversation=conversation)
+    if before:
+        queryset = queryset.filter(pk__lt=before)
+    page = list(queryset.order_by("-id")[: CHAT_PAGE_SIZE + 1])
+    has_more = len(page) > CHAT_PAGE_SIZE
+    return page[:CHAT_PAGE_SIZE][::-1], has_more
+
+
 @login_required
 @student_verified_required
 def chat_room(request, pk):
@@ -530,15 +765,6 @@ def chat_room(request, pk):
     if not conv.is_participant(request.user):
         raise PermissionDenied("لا يمكنك الوصول لهذه المحادثة.")
 
-    try:
-        chat_messages = conv.messages.select_related("sender")
-        for msg in chat_messages:
-            if msg.sender_id != request.user.id:
-                msg.mark_read_for(request.user)
-    except (OperationalError, ProgrammingError):
-        messages.info(request, "سيتم تحميل الرسائل بعد إتمام تهيئة قاعدة البيانات.")
-        chat_messages = Message.objects.none()
-
     form = MessageForm(request.POST or None)
     if request.method == "POST" and form.is_valid():
         text_value = form.cleaned_data["text"].strip()
@@ -552,12 +778,24 @@ def chat_room(request, pk):
         else:
             messages.error(request, "الرسالة فارغة.")
 
-    last_id = chat_messages.order_by("-id").values_list("id", flat=True).first() or 0
+    try:
+        chat_messages, has_more = _message_page(conv)
+        conv.mark_read(request.user)
+    except (OperationalError, ProgrammingError):
+        messages.info(request, "سيتم تحميل الرسائل بعد إتمام تهيئة قاعدة البيانات.")
+        chat_messages, has_more = [], False
 
     return render(
         request,
         "web/chat_room.html",
-        {"conv": conv, "chat_messages": chat_messages, "form": form, "last_id": last_id},
+        {
+            "conv": conv,
+            "chat_messages": chat_messages,
+            "form": form,
+            "last_id": chat_messages[-1].id if chat_messages else 0,
+            "first_id": chat_messages[0].id if chat_messages else 0,
+            "has_more": has_more,
+        },
     )
 
 
@@ -565,28 +803,107 @@ def chat_room(request, pk):
 @require_GET
 def chat_unread_count(request):
     try:
-        role = getattr(getattr(request.user, "profile", None), "role", "student" if not request.user.is_staff else "teacher")
-        conv_ids = (
-            Conversation.objects.filter(Q(student=request.user) | Q(teacher=request.user))
-            .values_list("id", flat=True)
-        )
-        if role == "student":
-            unread = (
-                Message.objects.filter(conversation_id__in=conv_ids)
-                .exclude(sender=request.user)
-                .filter(is_read_by_student=False)
-                .count()
-            )
-        else:
-            unread = (
-                Message.objects.filter(conversation_id__in=conv_ids)
-                .exclude(sender=request.user)
-                .filter(is_read_by_teacher=False)
-                .count()
-            )
-        return JsonResponse({"unread": unread})
+        unread = Conversation.unread_total(request.user)
     except (OperationalError, ProgrammingError):
         return JsonResponse({"unread": 0})
+    etag = _unread_etag(request.user, unread)
+    response = _not_modified(request, etag, **POLL_CACHE)
+    if response is not None:
+        return response
+    return _with_validators(JsonResponse({"unread": unread}), etag, **POLL_CACHE)
+
+
+def _unread_etag(user, unread: int) -> str:
+    # العدّاد نفسه هو نسخة الاستجابة؛ يتغير فقط عند وصول رسالة أو قراءتها.
+    return f'"unread-{user.pk}-{unread}"'
+
+
+def _poll_etag(conversation, user, after: int) -> str:
+    """Validator for ``chat_messages_poll``.
+
+    The response lists the messages after ``after``; it can only change once
+    ``last_message`` moves past it, so the conversation row already loaded
+    for the permission check is enough to answer 304 without touching the
+    message table.
+    """
+    return f'"poll-{conversation.pk}-{user.pk}-{after}-{conversation.last_message_id or 0}"'
+
+
+def _parse_idle(value) -> int:
+    try:
+        return min(max(int(value), 0), CHAT_SYNC_MAX_IDLE)
+    except (TypeError, ValueError):
+        return 0
+
+
+def _next_sync_delay(active: bool, idle: int, hidden: bool, focused: bool) -> int:
+    if active:
+        delay = CHAT_SYNC_MIN_MS
+    else:
+        delay = min(CHAT_SYNC_MIN_MS * 2 ** idle, CHAT_SYNC_MAX_MS)
+    if hidden:
+        return min(delay * 4, CHAT_SYNC_HIDDEN_MAX_MS)
+    if focused:
+        return min(delay, CHAT_SYNC_FOCUSED_MAX_MS)
+    return delay
+
+
+@login_required
+@require_GET
+def chat_sync(request):
+    """One round trip for the unread badge and every open conversation.
+
+    Query string: ``c=<conversation>:<after>`` per subscribed conversation,
+    ``unread`` (last total the client saw), ``idle`` (empty rounds so far),
+    ``hidden=1`` when the tab is in the background and ``focus=1`` when a
+    chat room is on screen. The reply carries ``next_poll_ms`` for the
+    client's next round.
+    """
+    cursors = {}
+    for token in request.GET.getlist("c")[:CHAT_SYNC_MAX_CONVERSATIONS]:
+        conversation_id, _, after = token.partition(":")
+        if conversation_id.isdigit():
+            cursors[int(conversation_id)] = _parse_message_id(after)
+    idle = _parse_idle(request.GET.get("idle"))
+    hidden = request.GET.get("hidden") == "1"
+    focused = request.GET.get("focus") == "1"
+
+    updates = {}
+    try:
+        rows = (
+            Conversation.objects.for_user(request.user)
+            .with_unread(request.user)
+            .values_list("id", "last_message_id", "unread")
+        )
+        unread = 0
+        pending = Q()
+        for conversation_id, last_message_id, conversation_unread in rows:
+            unread += conversation_unread
+            after = cursors.get(conversation_id)
+            if after is not None and last_message_id and last_message_id > after:
+                pending |= Q(conversation_id=conversation_id, pk__gt=after)
+        if pending:
+            queryset = Message.objects.prefetch_related("sender").filter(pending).order_by("id")
+            for message_obj in queryset[:CHAT_SYNC_MAX_MESSAGES]:
+                updates.setdefault(str(message_obj.conversation_id), []).append(
+                    message_obj.as_payload(viewer=request.user)
+                )
+    except (OperationalError, ProgrammingError):
+        return JsonResponse(
+            {"unread": 0, "conversations": {}, "idle": min(idle + 1, CHAT_SYNC_MAX_IDLE), "next_poll_ms": CHAT_SYNC_MAX_MS}
+        )
+
+    active = bool(updates) or request.GET.get("unread") not in (None, str(unread))
+    idle = 0 if active else min(idle + 1, CHAT_SYNC_MAX_IDLE)
+    return JsonResponse(
+        {
+            "unread": unread,
+            "conversations": updates,
+            "idle": idle,
+            "next_poll_ms": _next_sync_delay(active, idle, hidden, focused),
+        }
+    )
+
 
 @login_required
 @require_GET
@@ -599,32 +916,180 @@ def chat_messages_poll(request, pk):
     if not conversation.is_participant(request.user):
         return JsonResponse({"error": "forbidden"}, status=403)
 
-    after = request.GET.get("after")
-    queryset = conversation.messages.select_related("sender")
+    after = _parse_message_id(request.GET.get("after"))
+    etag = _poll_etag(conversation, request.user, after)
+    response = _not_modified(request, etag, **POLL_CACHE)
+    if response is not None:
+        return response
+
+    queryset = conversation.messages.prefetch_related("sender")
     if after:
-        try:
-            queryset = queryset.filter(pk__gt=int(after))
-        except ValueError:
-            pass
+        queryset = queryset.filter(pk__gt=after)
 
     payload = []
     try:
         for message_obj in queryset:
-            payload.append(
-                {
-                    "id": message_obj.id,
-                    "text": message_obj.text,
-                    "sender": message_obj.sender.username,
-                    "mine": message_obj.sender_id == request.user.id,
-                    "created": message_obj.created_at.strftime("%Y-%m-%d %H:%M"),
-                }
-            )
-            if message_obj.sender_id != request.user.id:
-                message_obj.mark_read_for(request.user)
+            payload.append(message_obj.as_payload(viewer=request.user))
+        if payload:
+            conversation.mark_read(request.user, upto=payload[-1]["id"])
     except (OperationalError, ProgrammingError):
         return JsonResponse({"messages": []})
 
-    return JsonResponse({"messages": payload})
+    return _with_validators(JsonResponse({"messages": payload}), etag, **POLL_CACHE)
+
+def _parse_message_id(value) -> int:
+    try:
+        return min(max(int(value), 0), MAX_MESSAGE_ID)
+    except (TypeError, ValueError):
+        return 0
+
+
+async def _messages_after(conversation, after, user) -> list:
+    queryset = (
+        Message.objects.prefetch_related("sender")
+        .filter(conversation=conversation, pk__gt=after)
+        .order_by("id")
+    )
+    return [message_obj.as_payload(viewer=user) async for message_obj in queryset]
+
+
+async def _event_payload(event, user):
+    if event.get("type") != "message":
+        return None
+    payload = event.get("message")
+    if payload is None:
+        # الحدث وصل مختصراً عبر ناقل العمليات؛ نحمّل الرسالة من قاعدة البيانات.
+        message_id = _parse_message_id(event.get("id"))
+        message_obj = await Message.objects.prefetch_related("sender").filter(pk=message_id).afirst()
+        return message_obj.as_payload(viewer=user) if message_obj else None
+    return dict(payload, mine=payload["sender_id"] == user.id)
+
+
+def _sse_frame(payload) -> str:
+    return f"id: {payload['id']}\ndata: {json.dumps(payload)}\n\n"
+
+
+async def _chat_event_stream(subscription, backlog, cursor, user):
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + CHAT_STREAM_MAX_SECONDS
+    try:
+        yield "retry: 3000\n\n"
+        for payload in backlog:
+            cursor = payload["id"]
+            yield _sse_frame(payload)
+        while loop.time() < deadline:
+            event = await subscription.aget(CHAT_STREAM_HEARTBEAT_SECONDS)
+            if event is None:
+                yield ": keepalive\n\n"
+                continue
+            payload = await _event_payload(event, user)
+            if payload is None or payload["id"] <= cursor:
+                continue
+            cursor = payload["id"]
+            yield _sse_frame(payload)
+    finally:
+        subscription.close()
+
+
+@login_required
+@student_verified_required
+@require_GET
+async def chat_stream(request, pk):
+    """Push new messages as Server-Sent Events.
+
+    SSE needs an ASGI server (``config.asgi``); under WSGI, or for a
+    request that does not accept ``text/event-stream``, the stream is
+    refused with 204 and the client falls back to ``chat_sync``.
+    """
+    user = await request.auser()
+    try:
+        conversation = await Conversation.objects.filter(pk=pk).afirst()
+    except (OperationalError, ProgrammingError):
+        return JsonResponse({"messages": []})
+    if conversation is None:
+        raise Http404
+    if not conversation.is_participant(user):
+        return JsonResponse({"error": "forbidden"}, status=403)
+
+    if "text/event-stream" not in request.headers.get("Accept", "") or not isinstance(request, ASGIRequest):
+        # 204 يوقف EventSource فيتحول المتصفح إلى دورة chat_sync المشتركة.
+        return HttpResponse(status=204)
+
+    cursor = max(
+        _parse_message_id(request.GET.get("after")),
+        _parse_message_id(request.headers.get("Last-Event-ID")),
+    )
+    # الاشتراك يسبق قراءة الرسائل المتأخرة حتى لا تضيع رسالة بينهما.
+    subscription = hub.subscribe(conversation_channel(conversation.id), loop=asyncio.get_running_loop())
+    try:
+        backlog = await _messages_after(conversation, cursor, user)
+    except (OperationalError, ProgrammingError):
+        subscription.close()
+        return JsonResponse({"messages": []})
+
+    response = StreamingHttpResponse(
+        _chat_event_stream(subscription, backlog, cursor, user),
+        content_type="text/event-stream",
+    )
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
+@login_required
+@require_GET
+def chat_messages_history(request, pk):
+    try:
+        conversation = get_object_or_404(Conversation, pk=pk)
+    except (OperationalError, ProgrammingError):
+        return JsonResponse({"messages": [], "has_more": False})
+
+    if not conversation.is_participant(request.user):
+        return JsonResponse({"error": "forbidden"}, status=403)
+
+    before = _parse_message_id(request.GET.get("before"))
+    if not before:
+        return JsonResponse({"error": "before is required"}, status=400)
+    try:
+        page, has_more = _message_page(conversation, before=before)
+    except (OperationalError, ProgrammingError):
+        return JsonResponse({"messages": [], "has_more": False})
+
+    return JsonResponse(
+        {
+            "messages": [message_obj.as_payload(viewer=request.user) for message_obj in page],
+            "has_more": has_more,
+        }
+    )
+
+
+@login_required
+@student_verified_required
+@require_POST
+@csrf_protect
+def chat_send(request, pk):
+    try:
+        conversation = get_object_or_404(Conversation, pk=pk)
+    except (OperationalError, ProgrammingError):
+        return JsonResponse({"error": "unavailable"}, status=503)
+
+    if not conversation.is_participant(request.user):
+        return JsonResponse({"error": "forbidden"}, status=403)
+
+    form = MessageForm(request.POST)
+    if not form.is_valid():
+        return JsonResponse({"errors": form.errors}, status=400)
+    text_value = form.cleaned_data["text"].strip()
+    if not text_value:
+        return JsonResponse({"errors": {"text": ["الرسالة فارغة."]}}, status=400)
+
+    try:
+        message_obj = Message.objects.create(conversation=conversation, sender=request.user, text=text_value)
+    except (OperationalError, ProgrammingError):
+        return JsonResponse({"error": "unavailable"}, status=503)
+
+    return JsonResponse({"message": message_obj.as_payload(viewer=request.user)}, status=201)
+
 
 @login_required
 @require_POST
@@ -639,8 +1104,8 @@ def chat_mark_read(request, pk):
         return JsonResponse({"error": "forbidden"}, status=403)
 
     try:
-        for message_obj in conversation.messages.exclude(sender=request.user):
-            message_obj.mark_read_for(request.user)
+        upto = _parse_message_id(request.POST.get("upto")) or None
+        conversation.mark_read(request.user, upto=upto)
     except (OperationalError, ProgrammingError):
         return JsonResponse({"ok": False})
 
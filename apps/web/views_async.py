@@ -0,0 +1,95 @@
+"""Async versions of the chat JSON endpoints.
+
+Served through ``config.asgi`` these hold no worker thread while they wait
+on the database, so a single process can keep thousands of pollers in
+flight. ``CHAT_ASYNC_VIEWS`` decides whether ``apps.web.urls`` routes the
+chat API to these views or to the synchronous ones in ``views.py``.
+"""
+from django.contrib.auth.decorators import login_required
+from django.db.utils import OperationalError, ProgrammingError
+from django.http import Http404, JsonResponse
+from django.views.decorators.csrf import csrf_protect
+from django.views.decorators.http import require_GET, require_POST
+
+from apps.messaging.models import Conversation
+
+from .views import (
+    POLL_CACHE,
+    _messages_after,
+    _not_modified,
+    _parse_message_id,
+    _poll_etag,
+    _unread_etag,
+    _with_validators,
+)
+
+
+async def _participant_conversation(request, pk):
+    user = await request.auser()
+    conversation = await Conversation.objects.filter(pk=pk).afirst()
+    if conversation is None:
+        raise Http404
+    if not conversation.is_participant(user):
+        return user, None
+    return user, conversation
+
+
+@login_required
+@require_GET
+async def chat_unread_count(request):
+    user = await request.auser()
+    try:
+        unread = await Conversation.aunread_total(user)
+    except (OperationalError, ProgrammingError):
+        return JsonResponse({"unread": 0})
+    etag = _unread_etag(user, unread)
+    response = _not_modified(request, etag, **POLL_CACHE)
+    if response is not None:
+        return response
+    return _with_validators(JsonResponse({"unread": unread}), etag, **POLL_CACHE)
+
+
+@login_required
+@require_GET
+async def chat_messages_poll(request, pk):
+    try:
+        user, conversation = await _participant_conversation(request, pk)
+    except (OperationalError, ProgrammingError):
+        return JsonResponse({"messages": []})
+    if conversation is None:
+        return JsonResponse({"error": "forbidden"}, status=403)
+
+    after = _parse_message_id(request.GET.get("after"))
+    etag = _poll_etag(conversation, user, after)
+    response = _not_modified(request, etag, **POLL_CACHE)
+    if response is not None:
+        return response
+
+    try:
+        payload = await _messages_after(conversation, after, user)
+        if payload:
+            await conversation.amark_read(user, upto=payload[-1]["id"])
+    except (OperationalError, ProgrammingError):
+        return JsonResponse({"messages": []})
+
+    return _with_validators(JsonResponse({"messages": payload}), etag, **POLL_CACHE)
+
+
+@login_required
+@require_POST
+@csrf_protect
+async def chat_mark_read(request, pk):
+    try:
+        user, conversation = await _participant_conversation(request, pk)
+    except (OperationalError, ProgrammingError):
+        return JsonResponse({"ok": False})
+    if conversation is None:
+        return JsonResponse({"error": "forbidden"}, status=403)
+
+    try:
+        upto = _parse_message_id(request.POST.get("upto")) or None
+        await conversation.amark_read(user, upto=upto)
+    except (OperationalError, ProgrammingError):
+        return JsonResponse({"ok": False})
+
+    return JsonResponse({"ok": True})
@@ -0,0 +1,423 @@
+"""Permission-checked downloads for submission and assignment files.
+
+Media is not served publicly: each view checks that the viewer owns the
+submission or is a teacher, then hands the transfer to the front proxy
+when ``PROTECTED_MEDIA_SERVER`` is set:
+
+* ``"nginx"``: ``X-Accel-Redirect`` to ``PROTECTED_MEDIA_INTERNAL_URL``,
+  an ``internal`` location aliased to ``MEDIA_ROOT``.
+* ``"apache"``: ``X-Sendfile`` with the absolute path (mod_xsendfile).
+
+Otherwise Python streams the file with ``FileResponse``, honouring a
+single ``Range`` (and ``If-Range``) so interrupted downloads resume and
+media players can seek. Attachments use their ``sha256`` as a strong
+ETag, so a repeat download is answered with 304 from the database row
+alone, without touching the file.
+
+``attachment_preview`` serves the JPEG previews rendered after upload
+with a year-long ``immutable`` cache lifetime: their URL is tied to
+content that never changes. ``attachment_zip_contents`` lists what is inside a ``.zip`` attachment
+from its cached central directory and ``attachment_zip_member`` streams
+one member out of it. ``assignment_submissions_zip`` streams every submission of an assignment
+as one ZIP built on the fly by ``zipstream``.
+"""
+import logging
+import mimetypes
+import os
+import re
+from datetime import datetime, timezone as dt_timezone
+from urllib.parse import quote
+
+from django.conf import settings
+from django.contrib.auth.decorators import login_required
+from django.core.exceptions import PermissionDenied, SuspiciousFileOperation
+from django.db.utils import OperationalError, ProgrammingError
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404, render
+from django.utils.http import content_disposition_header, http_date
+from django.utils import timezone
+from django.utils.text import get_valid_filename
+from django.views.decorators.http import require_safe
+
+from apps.assignments.models import Assignment
+from apps.submissions.archives import MAX_MEMBER_BYTES, manifest_for, member_chunks
+from apps.submissions.models import StoredBlob, Submission, SubmissionAttachment
+from apps.submissions.previews import PREVIEW_SIZES, preview_name
+from apps.submissions.storage import blob_storage
+
+from .decorators import teacher_required
+from .sheetstream import CSV_BOM, csv_line
+from .views import _not_modified, _with_validators
+from .zipstream import ZipMember, file_member, stream_zip
+
+logger = logging.getLogger(__name__)
+
+# المحتوى لا يتغير لنفس البصمة، لكن الصلاحيات قد تتغير؛ يتحقق المتصفح في كل مرة ويحصل على 304.
+DOWNLOAD_CACHE = {"private": True, "no_cache": True}
+# المعاينة مشتقة من بصمة المحتوى فلا تتغير أبداً لنفس الرابط.
+PREVIEW_CACHE = {"private": True, "max_age": 365 * 24 * 3600, "immutable": True}
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def _is_teacher(user) -> bool:
+    profile = getattr(user, "profile", None)
+    return user.is_superuser or bool(profile and profile.role == "teacher")
+
+
+def _check_submission_access(user, submission):
+    if submission.user_id != user.id and not _is_teacher(user):
+        raise PermissionDenied("لا تملك صلاحية تنزيل هذا الملف.")
+
+
+def _local_path(storage, name):
+    try:
+        path = storage.path(name)
+    except (NotImplementedError, ValueError):
+        raise Http404("الملف غير موجود.")
+    if not os.path.isfile(path):
+        raise Http404("الملف غير موجود.")
+    return path
+
+
+def _byte_range(header, size):
+    """Parse a single ``bytes=`` range into ``(start, end)`` inclusive.
+
+    Returns None for a missing or multi-range header (sent in full) and
+    ``False`` for a range that cannot be satisfied.
+    """
+    match = _RANGE_RE.match(header.strip()) if header else None
+    if match is None:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # bytes=-N: آخر N بايت.
+        length = int(last)
+        if length == 0:
+            return False
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        return False
+    return start, end
+
+
+class _RangeFile:
+    """Read-only view of ``length`` bytes from ``offset``.
+
+    It has no ``fileno`` on purpose: WSGI servers would otherwise
+    ``sendfile`` the underlying file from its start.
+    """
+
+    def __init__(self, path, offset, length):
+        self._file = open(path, "rb")
+        self._file.seek(offset)
+        self._remaining = length
+
+    def read(self, size=-1):
+        if self._remaining <= 0:
+            return b""
+        if size < 0 or size > self._remaining:
+            size = self._remaining
+        data = self._file.read(size)
+        self._remaining -= len(data)
+        return data
+
+    def close(self):
+        self._file.close()
+
+
+def _offloaded(name, path, filename, as_attachment):
+    server = settings.PROTECTED_MEDIA_SERVER
+    if server not in ("nginx", "apache"):
+        return None
+    content_type, _ = mimetypes.guess_type(filename)
+    response = HttpResponse(content_type=content_type or "application/octet-stream")
+    if server == "nginx":
+        response["X-Accel-Redirect"] = settings.PROTECTED_MEDIA_INTERNAL_URL + quote(name)
+    else:
+        response["X-Sendfile"] = path
+    response["Content-Disposition"] = content_disposition_header(as_attachment, filename)
+    return response
+
+
+def serve_file(request, storage, name, filename, etag=None, as_attachment=True, cache=DOWNLOAD_CACHE):
+    if etag:
+        not_modified = _not_modified(request, etag, **cache)
+        if not_modified is not None:
+            return not_modified
+    path = _local_path(storage, name)
+    stat = os.stat(path)
+    last_modified = datetime.fromtimestamp(int(stat.st_mtime), tz=dt_timezone.utc)
+    etag = etag or f'"{stat.st_size:x}-{int(stat.st_mtime):x}"'
+
+    not_modified = _not_modified(request, etag, last_modified, **cache)
+    if not_modified is not None:
+        return not_modified
+
+    offloaded = _offloaded(name, path, filename, as_attachment)
+    if offloaded is not None:
+        # الخادم الأمامي يتولى Range و If-Range بنفسه.
+        return _with_validators(offloaded, etag, last_modified, **cache)
+
+    size = stat.st_size
+    byte_range = _byte_range(request.headers.get("Range"), size)
+    if_range = request.headers.get("If-Range")
+    if byte_range and if_range and if_range not in (etag, http_date(stat.st_mtime)):
+        # النسخة الجزئية لدى العميل قديمة؛ يُرسل الملف كاملاً.
+        byte_range = None
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response["Content-Range"] = f"bytes */{size}"
+        return _with_validators(response, etag, last_modified, **cache)
+
+    if byte_range:
+        start, end = byte_range
+        response = FileResponse(
+            _RangeFile(path, start, end - start + 1), as_attachment=as_attachment, filename=filename, status=206
+        )
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+        response["Content-Length"] = str(end - start + 1)
+    else:
+        response = FileResponse(open(path, "rb"), as_attachment=as_attachment, filename=filename)
+    response["Accept-Ranges"] = "bytes"
+    return _with_validators(response, etag, last_modified, **cache)
+
+
+@login_required
+@require_safe
+def attachment_download(request, pk: int):
+    try:
+        attachment = get_object_or_404(SubmissionAttachment.objects.select_related("submission"), pk=pk)
+    except (OperationalError, ProgrammingError):
+        raise Http404("الملف غير متاح قبل تهيئة قاعدة البيانات.")
+    _check_submission_access(request.user, attachment.submission)
+    etag = f'"{attachment.sha256}"' if attachment.sha256 else None
+    return serve_file(request, attachment.file.storage, attachment.file.name, attachment.display_name, etag=etag)
+
+
+@login_required
+@require_safe
+def attachment_preview(request, pk: int, size: int):
+    if size not in PREVIEW_SIZES:
+        raise Http404("حجم معاينة غير معروف.")
+    try:
+        attachment = get_object_or_404(SubmissionAttachment.objects.select_related("submission"), pk=pk)
+    except (OperationalError, ProgrammingError):
+        raise Http404("المعاينة غير متاحة قبل تهيئة قاعدة البيانات.")
+    _check_submission_access(request.user, attachment.submission)
+    etag = f'"{attachment.sha256}-{size}"'
+    not_modified = _not_modified(request, etag, **PREVIEW_CACHE)
+    if not_modified is not None:
+        return not_modified
+    if not StoredBlob.objects.filter(sha256=attachment.sha256, has_preview=True).exists():
+        raise Http404("لا توجد معاينة لهذا الملف.")
+    return serve_file(
+        request,
+        blob_storage,
+        preview_name(attachment.sha256, size),
+        f"{os.path.splitext(attachment.display_name)[0]}.jpg",
+        etag=etag,
+        as_attachment=False,
+        cache=PREVIEW_CACHE,
+    )
+
+
+def _zip_attachment(request, pk):
+    try:
+        attachment = get_object_or_404(SubmissionAttachment.objects.select_related("submission__user"), pk=pk)
+    except (OperationalError, ProgrammingError):
+        raise Http404("الملف غير متاح قبل تهيئة قاعدة البيانات.")
+    _check_submission_access(request.user, attachment.submission)
+    if not attachment.is_zip or not attachment.sha256:
+        raise Http404("الملف ليس أرشيف ZIP.")
+    return attachment
+
+
+def _zip_manifest(attachment):
+    try:
+        return manifest_for(attachment), None
+    except OSError as exc:
+        # خطأ مؤقت في قراءة الملف لا يُحفظ في الفهرس؛ المحاولة التالية تعيد بناءه.
+        logger.warning("Cannot read ZIP attachment #%s: %s", attachment.pk, exc)
+        return None, HttpResponse("تعذّرت قراءة الأرشيف حالياً. حاول لاحقاً.", status=503)
+
+
+@login_required
+@require_safe
+def attachment_zip_contents(request, pk: int):
+    attachment = _zip_attachment(request, pk)
+    manifest, unavailable = _zip_manifest(attachment)
+    if unavailable is not None:
+        return unavailable
+    return render(
+        request,
+        "web/zip_manifest.html",
+        {
+            "attachment": attachment,
+            "manifest": manifest,
+            "entries": list(enumerate(manifest.entries)),
+            "truncated": manifest.entry_count > len(manifest.entries),
+            "max_member_bytes": MAX_MEMBER_BYTES,
+        },
+    )
+
+
+@login_required
+@require_safe
+def attachment_zip_member(request, pk: int, index: int):
+    attachment = _zip_attachment(request, pk)
+    etag = f'"{attachment.sha256}-{index}"'
+    not_modified = _not_modified(request, etag, **DOWNLOAD_CACHE)
+    if not_modified is not None:
+        return not_modified
+    manifest, unavailable = _zip_manifest(attachment)
+    if unavailable is not None:
+        return unavailable
+    entries = manifest.entries
+    if index >= len(entries) or entries[index]["is_dir"] or entries[index]["encrypted"]:
+        raise Http404("لا يمكن استخراج هذا الملف من الأرشيف.")
+    entry = entries[index]
+    if entry["size"] > MAX_MEMBER_BYTES:
+        return HttpResponse("الملف أكبر من الحد المسموح لاستخراجه؛ نزّل الأرشيف كاملاً.", status=413)
+    path = _local_path(attachment.file.storage, attachment.file.name)
+    try:
+        info, chunks = member_chunks(path, index, entry["name"])
+    except (KeyError, IndexError, NotImplementedError, RuntimeError, OSError) as exc:
+        # طريقة ضغط غير مدعومة أو أرشيف تغيّر عن فهرسه.
+        logger.warning("Cannot extract %s from attachment #%s: %s", entry["name"], attachment.pk, exc)
+        raise Http404("لا يمكن استخراج هذا الملف من الأرشيف.")
+    filename = os.path.basename(info.filename.rstrip("/")) or "file"
+    content_type, _ = mimetypes.guess_type(filename)
+    response = StreamingHttpResponse(chunks, content_type=content_type or "application/octet-stream")
+    response["Content-Length"] = str(info.file_size)
+    response["Content-Disposition"] = content_disposition_header(True, filename)
+    return _with_validators(response, etag, **DOWNLOAD_CACHE)
+
+
+@login_required
+@require_safe
+def submission_file_download(request, pk: int):
+    try:
+        submission = get_object_or_404(Submission, pk=pk)
+    except (OperationalError, ProgrammingError):
+        raise Http404("الملف غير متاح قبل تهيئة قاعدة البيانات.")
+    _check_submission_access(request.user, submission)
+    if not submission.file:
+        raise Http404("لا يوجد ملف لهذا التسليم.")
+    return serve_file(
+        request, submission.file.storage, submission.file.name, os.path.basename(submission.file.name)
+    )
+
+
+@login_required
+@require_safe
+def assignment_attachment_download(request, pk: int):
+    # ملف الواجب متاح لكل من يرى صفحة الواجب، مثل assignment_detail.
+    try:
+        assignment = get_object_or_404(Assignment, pk=pk)
+    except (OperationalError, ProgrammingError):
+        raise Http404("الملف غير متاح قبل تهيئة قاعدة البيانات.")
+    if not assignment.attachment:
+        raise Http404("لا يوجد ملف لهذا الواجب.")
+    return serve_file(
+        request, assignment.attachment.storage, assignment.attachment.name, os.path.basename(assignment.attachment.name)
+    )
+
+
+def _safe_name(name, fallback) -> str:
+    # get_valid_filename يرفع استثناءً بدل إرجاع "" لأسماء مثل "+" أو "@@"، والتوقف هنا يقطع الأرشيف في منتصفه.
+    try:
+        return get_valid_filename(name)
+    except SuspiciousFileOperation:
+        return fallback
+
+
+def _archive_folder(submission) -> str:
+    student = _safe_name(submission.user.username, f"user-{submission.user_id}")
+    stamp = timezone.localtime(submission.created_at).strftime("%Y%m%d-%H%M")
+    return f"{student}/{submission.pk}_{stamp}"
+
+
+def _unique_name(folder, name, used) -> str:
+    base, ext = os.path.splitext(_safe_name(name, "file"))
+    candidate, counter = f"{folder}/{base}{ext}", 1
+    while candidate in used:
+        counter += 1
+        candidate = f"{folder}/{base}-{counter}{ext}"
+    used.add(candidate)
+    return candidate
+
+
+def _assignment_archive(assignment, dedupe: bool):
+    """ZIP members for every submission of ``assignment``, then ``grades.csv``.
+
+    Submissions are read with ``iterator()`` and files one chunk at a time;
+    only the manifest rows (a few hundred bytes per submission) stay in memory.
+    """
+    submissions = (
+        Submission.objects.filter(assignment=assignment)
+        .select_related("user")
+        .prefetch_related("attachments")
+        .order_by("user__username", "created_at")
+    )
+    used, seen = set(), {}
+    manifest = [csv_line(["الطالب", "الاسم", "رقم التسليم", "تاريخ الإرسال", "التقدير", "ملاحظات", "الملفات"])]
+    for submission in submissions.iterator(chunk_size=100):
+        folder = _archive_folder(submission)
+        files = [
+            (attachment.display_name, attachment.file, attachment.sha256)
+            for attachment in submission.attachments.all()
+        ]
+        if submission.file:
+            files.append((os.path.basename(submission.file.name), submission.file, ""))
+        paths = []
+        for name, field_file, sha256 in files:
+            if dedupe and sha256 and sha256 in seen:
+                # نسخة مطابقة موجودة في الأرشيف؛ يشير إليها ملف الدرجات بدل تكرارها.
+                paths.append(f"={seen[sha256]}")
+                continue
+            try:
+                path = field_file.path
+                member = file_member(_unique_name(folder, name, used), path)
+            except (OSError, NotImplementedError, ValueError):
+                logger.warning("Skipping missing file %s of submission #%s", field_file.name, submission.pk)
+                paths.append(f"!{name}")
+                continue
+            if sha256:
+                seen[sha256] = member.name
+            paths.append(member.name)
+            yield member
+        manifest.append(
+            csv_line(
+                [
+                    submission.user.username,
+                    submission.user.get_full_name(),
+                    submission.pk,
+                    timezone.localtime(submission.created_at).strftime("%Y-%m-%d %H:%M"),
+                    "" if submission.grade is None else submission.grade,
+                    submission.feedback,
+                    " | ".join(paths),
+                ]
+            )
+        )
+    yield ZipMember(name="grades.csv", chunks=[CSV_BOM, *manifest], size=len(CSV_BOM) + sum(map(len, manifest)))
+
+
+@login_required
+@teacher_required
+@require_safe
+def assignment_submissions_zip(request, pk: int):
+    try:
+        assignment = get_object_or_404(Assignment, pk=pk)
+    except (OperationalError, ProgrammingError):
+        raise Http404("التسليمات غير متاحة قبل تهيئة قاعدة البيانات.")
+    dedupe = request.GET.get("dedupe") == "1"
+    response = StreamingHttpResponse(
+        stream_zip(_assignment_archive(assignment, dedupe)),
+        content_type="application/zip",
+    )
+    response["Content-Disposition"] = content_disposition_header(True, f"assignment-{assignment.pk}-submissions.zip")
+    return _with_validators(response, private=True, no_store=True)
@@ -0,0 +1,145 @@
+"""Course gradebook and grade analytics.
+
+The students × assignments matrix comes from ``apps.submissions.gradebook``
+and is served as a page and as JSON. Its stamp doubles as the ETag, so a
+reload of an unchanged course is answered with 304 after the two aggregate
+queries that compute it. ``course_analytics`` shows the distributions from
+``apps.submissions.analytics``.
+"""
+import hashlib
+import math
+
+from django.contrib import messages
+from django.contrib.auth import get_user_model
+from django.contrib.auth.decorators import login_required
+from django.db.utils import OperationalError, ProgrammingError
+from django.http import Http404, JsonResponse
+from django.shortcuts import get_object_or_404, redirect, render
+from django.views.decorators.http import require_safe
+
+from apps.assignments.models import Assignment
+from apps.courses.models import Course
+from apps.submissions.analytics import grade_stats
+from apps.submissions.gradebook import course_gradebook, course_stamp
+
+from .decorators import teacher_required
+from .views import LIST_PAGE_CACHE, _not_modified, _viewer_stamp, _with_validators
+
+User = get_user_model()
+
+
+def _grade(value):
+    if math.isnan(value):
+        return None
+    return int(value) if float(value).is_integer() else round(float(value), 2)
+
+
+def _labels(gradebook):
+    # None لصف حُذف بعد بناء المصفوفة؛ الحذف يغير الختم فتُبنى من جديد في الطلب التالي.
+    users = User.objects.in_bulk(gradebook.user_ids)
+    assignments = Assignment.objects.in_bulk(gradebook.assignment_ids)
+    return [users.get(pk) for pk in gradebook.user_ids], [assignments.get(pk) for pk in gradebook.assignment_ids]
+
+
+@login_required
+@teacher_required
+@require_safe
+def course_gradebook_view(request, pk: int):
+    try:
+        course = get_object_or_404(Course, pk=pk)
+        stamp = course_stamp(course.pk)
+    except (OperationalError, ProgrammingError):
+        messages.info(request, "سيظهر دفتر الدرجات بعد تهيئة قاعدة البيانات.")
+        return redirect("web:courses_list")
+    # الرسائل المعلّقة تُعرض مرة واحدة، فلا يجوز الرد بـ 304 قبل أن تُستهلك.
+    pending = len(messages.get_messages(request))
+    etag = f'"gradebook-{hashlib.sha1(f"{stamp}|{_viewer_stamp(request)}".encode()).hexdigest()}"'
+    if not pending:
+        response = _not_modified(request, etag, **LIST_PAGE_CACHE)
+        if response is not None:
+            return response
+
+    gradebook = course_gradebook(course.pk, stamp)
+    users, assignments = _labels(gradebook)
+    grades = gradebook.grades.tolist()
+    submission_ids = gradebook.submission_ids.tolist()
+    attempts = gradebook.attempts.tolist()
+    rows = [
+        {
+            "user": user,
+            "mean": _grade(mean),
+            "cells": [
+                {"grade": _grade(grade), "submission_id": submission_id, "attempts": count}
+                for grade, submission_id, count in zip(grades[i], submission_ids[i], attempts[i])
+            ],
+        }
+        for i, (user, mean) in enumerate(zip(users, gradebook.student_means.tolist()))
+        if user is not None
+    ]
+    rows.sort(key=lambda row: row["user"].username.lower())
+    response = render(
+        request,
+        "web/gradebook.html",
+        {
+            "course": course,
+            "assignments": assignments,
+            "rows": rows,
+            "assignment_means": [_grade(mean) for mean in gradebook.assignment_means.tolist()],
+        },
+    )
+    return response if pending else _with_validators(response, etag, **LIST_PAGE_CACHE)
+
+
+@login_required
+@teacher_required
+@require_safe
+def course_gradebook_json(request, pk: int):
+    try:
+        course = get_object_or_404(Course, pk=pk)
+        stamp = course_stamp(course.pk)
+    except (OperationalError, ProgrammingError):
+        raise Http404("دفتر الدرجات غير متاح قبل تهيئة قاعدة البيانات.")
+    etag = f'"gradebook-{stamp}"'
+    response = _not_modified(request, etag, **LIST_PAGE_CACHE)
+    if response is not None:
+        return response
+
+    gradebook = course_gradebook(course.pk, stamp)
+    users, assignments = _labels(gradebook)
+    payload = {
+        "course": course.pk,
+        "students": [
+            {"id": pk, "username": user.username if user else None} for pk, user in zip(gradebook.user_ids, users)
+        ],
+        "assignments": [
+            {"id": pk, "title": assignment.title if assignment else None}
+            for pk, assignment in zip(gradebook.assignment_ids, assignments)
+        ],
+        # صف لكل طالب وعمود لكل واجب بنفس ترتيب القائمتين أعلاه؛ null خانة بلا درجة.
+        "grades": [[_grade(value) for value in row] for row in gradebook.grades.tolist()],
+        "submissions": [[pk or None for pk in row] for row in gradebook.submission_ids.tolist()],
+        "student_means": [_grade(mean) for mean in gradebook.student_means.tolist()],
+        "assignment_means": [_grade(mean) for mean in gradebook.assignment_means.tolist()],
+    }
+    return _with_validators(JsonResponse(payload), etag, **LIST_PAGE_CACHE)
+
+
+@login_required
+@teacher_required
+@require_safe
+def course_analytics(request, pk: int):
+    try:
+        course = get_object_or_404(Course, pk=pk)
+        overall, per_assignment = grade_stats(Assignment.objects.filter(course=course).order_by("due_date", "id"))
+    except (OperationalError, ProgrammingError):
+        messages.info(request, "ستظهر الإحصائيات بعد تهيئة قاعدة البيانات.")
+        return redirect("web:courses_list")
+    return render(
+        request,
+        "web/course_analytics.html",
+        {
+            "course": course,
+            "overall": overall,
+            "per_assignment": per_assignment,
+        },
+    )
@@ -0,0 +1,252 @@
+"""Grading many submissions in one request.
+
+``apply_grades`` takes rows of ``submission_id``/``grade``/``feedback``,
+checks each one with the same ``GradeForm`` used by the single grading
+page and writes all valid rows with one ``bulk_update`` inside a
+transaction. Invalid rows are reported back per row and do not stop the
+valid ones from being saved. A field missing from a row keeps its
+current value, so an API client can send grades without feedback.
+
+``bulk_grade`` is the page version for one assignment and
+``bulk_grade_api`` the JSON version for any set of submissions.
+
+``grading_queue`` hands each grader the next ungraded submission under a
+lease from ``apps.submissions.grading_queue`` and sends them to the
+grading page in queue mode; the other queue views skip, stop and renew.
+"""
+import json
+from urllib.parse import urlencode
+
+from django.contrib import messages
+from django.contrib.auth.decorators import login_required
+from django.db import transaction
+from django.db.models import Prefetch
+from django.db.utils import OperationalError, ProgrammingError
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404, redirect, render
+from django.urls import reverse
+from django.utils import timezone
+from django.views.decorators.csrf import csrf_protect
+from django.views.decorators.http import require_POST
+
+from apps.assignments.models import Assignment
+from apps.submissions.grading_queue import claim_next, extend, release, scope_from
+from apps.submissions.models import Submission
+
+from .decorators import teacher_required
+from .views import GRADING_SKIPPED_SESSION_KEY, GradeForm, _attachments_with_blob_info
+
+BULK_GRADE_MAX_ROWS = 1000
+GRADE_FIELDS = ("grade", "feedback")
+# التسليمات التي تخطاها المعلم لا تُعرض عليه مجدداً حتى تفرغ القائمة أو يُنهيها.
+SKIPPED_LIMIT = 200
+
+
+def _row_id(row):
+    if not isinstance(row, dict):
+        return None
+    try:
+        return int(row.get("submission_id"))
+    except (TypeError, ValueError):
+        return None
+
+
+def apply_grades(rows, assignment=None):
+    """Validate and save ``rows``; return ``(updated count, errors)``.
+
+    ``errors`` is a list of ``{"row", "submission_id", "errors"}`` dicts,
+    one per rejected row, with field errors keyed like ``form.errors``.
+    """
+    errors = []
+    wanted = {}
+    for index, row in enumerate(rows):
+        submission_id = _row_id(row)
+        if submission_id is None:
+            errors.append({"row": index, "submission_id": None, "errors": {"submission_id": ["رقم التسليم مطلوب."]}})
+        elif submission_id in wanted:
+            errors.append(
+                {"row": index, "submission_id": submission_id, "errors": {"submission_id": ["التسليم مكرر في الطلب."]}}
+            )
+        else:
+            wanted[submission_id] = index
+
+    changed = []
+    now = timezone.now()
+    with transaction.atomic():
+        queryset = Submission.objects.select_for_update().filter(pk__in=wanted).only("pk", "assignment_id", *GRADE_FIELDS)
+        if assignment is not None:
+            queryset = queryset.filter(assignment=assignment)
+        submissions = queryset.in_bulk()
+        for submission_id, index in wanted.items():
+            submission = submissions.get(submission_id)
+            if submission is None:
+                errors.append(
+                    {"row": index, "submission_id": submission_id, "errors": {"submission_id": ["التسليم غير موجود."]}}
+                )
+                continue
+            row = rows[index]
+            data = {field: row[field] if field in row else getattr(submission, field) for field in GRADE_FIELDS}
+            form = GradeForm(data)
+            if not form.is_valid():
+                errors.append(
+                    {
+                        "row": index,
+                        "submission_id": submission_id,
+                        "errors": {field: [str(error) for error in field_errors] for field, field_errors in form.errors.items()},
+                    }
+                )
+                continue
+            values = (form.cleaned_data["grade"], form.cleaned_data["feedback"])
+            if values == (submission.grade, submission.feedback):
+                continue
+            submission.grade, submission.feedback = values
+            # bulk_update لا يحدّث حقول auto_now، ودفتر الدرجات يعتمد على updated_at.
+            submission.updated_at = now
+            changed.append(submission)
+        # تحديث واحد لكل دفعة بدل حفظ كل تسليم على حدة.
+        Submission.objects.bulk_update(changed, [*GRADE_FIELDS, "updated_at"], batch_size=500)
+    errors.sort(key=lambda error: error["row"])
+    return len(changed), errors
+
+
+@login_required
+@teacher_required
+def bulk_grade(request, pk: int):
+    try:
+        assignment = get_object_or_404(Assignment.objects.select_related("course"), pk=pk)
+        submissions = list(
+            Submission.objects.filter(assignment=assignment)
+            .select_related("user")
+            .prefetch_related(Prefetch("attachments", queryset=_attachments_with_blob_info()))
+            .order_by("user__username", "-created_at")
+        )
+    except (OperationalError, ProgrammingError):
+        messages.info(request, "سيتم تفعيل التقييم الجماعي بعد تهيئة قاعدة البيانات.")
+        return redirect("web:teacher_submissions")
+
+    row_errors = {}
+    if request.method == "POST":
+        rows = [
+            {
+                "submission_id": submission.pk,
+                "grade": request.POST.get(f"grade-{submission.pk}", ""),
+                "feedback": request.POST.get(f"feedback-{submission.pk}", ""),
+            }
+            for submission in submissions
+            if f"grade-{submission.pk}" in request.POST
+        ]
+        try:
+            updated, errors = apply_grades(rows, assignment=assignment)
+        except (OperationalError, ProgrammingError):
+            messages.error(request, "تعذّر حفظ التقييمات. حاول لاحقاً بعد تهيئة قاعدة البيانات.")
+            errors, updated = [], None
+        if updated is not None and not errors:
+            messages.success(request, f"تم حفظ {updated} تقييم.")
+            return redirect("web:bulk_grade", pk=assignment.pk)
+        if errors:
+            messages.error(request, f"تم حفظ {updated} تقييم، ويرجى مراجعة {len(errors)} صف.")
+        row_errors = {error["submission_id"]: error["errors"] for error in errors}
+        # تعرض الصفحة القيم المرسلة كما هي ليصحح المعلم الصفوف المرفوضة دون إعادة كتابة البقية.
+        for submission in submissions:
+            submission.grade = request.POST.get(f"grade-{submission.pk}", submission.grade)
+            submission.feedback = request.POST.get(f"feedback-{submission.pk}", submission.feedback)
+
+    for submission in submissions:
+        submission.row_errors = [message for field in row_errors.get(submission.pk, {}).values() for message in field]
+    return render(
+        request,
+        "web/bulk_grade.html",
+        {
+            "assignment": assignment,
+            "submissions": submissions,
+        },
+    )
+
+
+@login_required
+@teacher_required
+@require_POST
+@csrf_protect
+def bulk_grade_api(request):
+    try:
+        body = json.loads(request.body or b"{}")
+    except ValueError:
+        return JsonResponse({"error": "صيغة الطلب غير صحيحة."}, status=400)
+    rows = body.get("grades") if isinstance(body, dict) else None
+    if not isinstance(rows, list):
+        return JsonResponse({"error": "يجب إرسال قائمة grades."}, status=400)
+    if len(rows) > BULK_GRADE_MAX_ROWS:
+        return JsonResponse({"error": f"الحد الأقصى {BULK_GRADE_MAX_ROWS} صف في الطلب الواحد."}, status=400)
+    try:
+        updated, errors = apply_grades(rows)
+    except (OperationalError, ProgrammingError):
+        return JsonResponse({"error": "التقييم غير متاح قبل تهيئة قاعدة البيانات."}, status=503)
+    return JsonResponse({"updated": updated, "errors": errors})
+
+
+def _queue_url(name, scope, *args, **params) -> str:
+    return f"{reverse(name, args=args)}?{urlencode({**params, **scope})}"
+
+
+def _skipped_submissions(request) -> list:
+    return request.session.get(GRADING_SKIPPED_SESSION_KEY, [])
+
+
+@login_required
+@teacher_required
+def grading_queue(request):
+    scope = scope_from(request.GET)
+    try:
+        submission_id = claim_next(request.user, scope, exclude=_skipped_submissions(request))
+    except (OperationalError, ProgrammingError):
+        messages.info(request, "سيتم تفعيل قائمة التقييم بعد تهيئة قاعدة البيانات.")
+        return redirect("web:teacher_submissions")
+    if submission_id is None:
+        request.session.pop(GRADING_SKIPPED_SESSION_KEY, None)
+        messages.success(request, "لا توجد تسليمات بانتظار التقييم.")
+        return redirect("web:teacher_submissions")
+    return redirect(_queue_url("web:grade_submission", scope, submission_id, queue=1))
+
+
+@login_required
+@teacher_required
+@require_POST
+def grading_queue_skip(request, pk: int):
+    scope = scope_from(request.GET)
+    skipped = [*_skipped_submissions(request), pk][-SKIPPED_LIMIT:]
+    request.session[GRADING_SKIPPED_SESSION_KEY] = skipped
+    try:
+        release(request.user, [pk])
+    except (OperationalError, ProgrammingError):
+        pass
+    return redirect(_queue_url("web:grading_queue", scope))
+
+
+@login_required
+@teacher_required
+@require_POST
+def grading_queue_stop(request):
+    request.session.pop(GRADING_SKIPPED_SESSION_KEY, None)
+    try:
+        release(request.user)
+    except (OperationalError, ProgrammingError):
+        pass
+    messages.info(request, "تم إنهاء جلسة التقييم وإتاحة التسليمات المحجوزة لبقية المعلمين.")
+    return redirect("web:teacher_submissions")
+
+
+@login_required
+@teacher_required
+@require_POST
+@csrf_protect
+def grading_queue_extend(request):
+    try:
+        body = json.loads(request.body or b"{}")
+        submission_ids = [int(pk) for pk in body.get("submissions", [])]
+    except (ValueError, TypeError, AttributeError):
+        return JsonResponse({"error": "صيغة الطلب غير صحيحة."}, status=400)
+    try:
+        until = extend(request.user, submission_ids)
+    except (OperationalError, ProgrammingError):
+        return JsonResponse({"error": "قائمة التقييم غير متاحة قبل تهيئة قاعدة البيانات."}, status=503)
+    return JsonResponse({"until": until.isoformat()})
@@ -0,0 +1,317 @@
+"""Resumable, chunked submission uploads.
+
+Protocol (all JSON except the chunk body):
+
+1. ``POST submissions/upload/<assignment_id>/`` with
+   ``{"files": [{"name": ..., "size": ...}, ...]}`` opens an
+   ``UploadSession`` and returns its id and the chunk size.
+2. ``PUT submissions/upload/session/<id>/<index>/?offset=N`` with the raw
+   chunk as body and its SHA-256 in ``X-Chunk-SHA256``. The offset must
+   equal the bytes already received, so a retried or duplicated chunk is
+   answered with 409 and the current offset instead of corrupting the file.
+3. ``GET submissions/upload/session/<id>/`` reports what arrived, which is
+   all a client needs to resume after a dropped connection.
+4. ``POST submissions/upload/session/<id>/finalize/`` creates the
+   ``Submission`` and its attachments in one transaction. Repeating it
+   returns the same submission.
+
+Partial files live under ``SUBMISSION_UPLOAD_TEMP_DIR/sessions/<id>/`` on
+the media filesystem. Finalizing hard-links each part and lets blob
+storage rename the link into place, so a rolled-back finalize leaves the
+parts intact and can be retried.
+
+Each file's SHA-256 is fed chunk by chunk as the PUTs arrive. ``hashlib``
+state cannot be stored, so the running digest lives in the process that
+received the chunks; when they were spread over several processes the
+finalize step hashes the assembled file instead.
+Each session schedules a ``submissions.expire_upload_session`` job that
+removes it once it is finalized or has been idle for
+``SUBMISSION_UPLOAD_SESSION_MAX_AGE_HOURS``.
+"""
+import hashlib
+import json
+import os
+import shutil
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib import messages
+from django.contrib.auth.decorators import login_required
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import F
+from django.db.utils import OperationalError, ProgrammingError
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils import timezone
+from django.views.decorators.csrf import csrf_protect
+from django.views.decorators.http import require_GET, require_http_methods, require_POST
+
+from apps.assignments.models import Assignment
+from apps.jobs.registry import enqueue
+from apps.submissions.models import (
+    ALLOWED_EXTS,
+    MAX_BYTES,
+    Submission,
+    SubmissionAttachment,
+    UploadSession,
+    UploadSessionFile,
+)
+from apps.submissions.uploadhandlers import StagedFile
+
+from .decorators import student_verified_required
+
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+UPLOAD_MAX_FILES = 20
+# عدد الملفات التي تُحفظ بصمتها الجارية في هذه العملية؛ الأقدم يُسقط ويُحسب عند الإنهاء.
+RUNNING_HASHES_MAX = 1000
+
+_running_hashes = OrderedDict()
+_running_hashes_lock = threading.Lock()
+
+
+def _error(message, status=400, **extra):
+    return JsonResponse({"error": message, **extra}, status=status)
+
+
+def _assignment_error(user, assignment):
+    profile = getattr(user, "profile", None)
+    if not profile or profile.role != "student":
+        return "هذه الصفحة متاحة للطلاب فقط."
+    if assignment.due_date and assignment.due_date < timezone.now():
+        return "انتهى موعد تسليم هذا الواجب."
+    if hasattr(assignment, "is_active") and not getattr(assignment, "is_active"):
+        return "هذا الواجب غير متاح حالياً."
+    return None
+
+
+def _file_errors(name, size):
+    errors = []
+    ext = os.path.splitext(name)[1].lower()
+    if ext not in ALLOWED_EXTS:
+        errors.append(f"الملف {name} غير مسموح به.")
+    if size > MAX_BYTES:
+        errors.append(f"الملف {name} يتجاوز الحد المسموح (10MB).")
+    if size <= 0:
+        errors.append(f"الملف {name} فارغ.")
+    return errors
+
+
+def _own_session(request, session_id):
+    session = get_object_or_404(UploadSession.objects.prefetch_related("files"), pk=session_id)
+    if session.user_id != request.user.id:
+        return None
+    return session
+
+
+def _session_payload(session):
+    payload = {
+        "session": str(session.pk),
+        "status": session.status,
+        "chunk_size": UPLOAD_CHUNK_BYTES,
+        "files": [upload.as_payload() for upload in session.files.all()],
+    }
+    if session.submission_id:
+        payload["redirect"] = reverse("web:submissions_list")
+    return payload
+
+
+@login_required
+@student_verified_required
+@require_POST
+@csrf_protect
+def upload_init(request, assignment_id):
+    try:
+        assignment = get_object_or_404(Assignment, pk=assignment_id)
+    except (OperationalError, ProgrammingError):
+        return _error("الرفع غير متاح قبل تهيئة قاعدة البيانات.", status=503)
+    blocked = _assignment_error(request.user, assignment)
+    if blocked:
+        return _error(blocked, status=403)
+
+    try:
+        files = json.loads(request.body or b"{}").get("files") or []
+        declared = [(str(item["name"])[:255], int(item["size"])) for item in files]
+    except (ValueError, TypeError, KeyError, AttributeError):
+        return _error("طلب غير صالح.")
+    if not declared:
+        return _error("يجب رفع ملف واحد على الأقل.")
+    if len(declared) > UPLOAD_MAX_FILES:
+        return _error(f"الحد الأقصى {UPLOAD_MAX_FILES} ملفاً في التسليم الواحد.")
+    errors = [error for name, size in declared for error in _file_errors(name, size)]
+    if errors:
+        return _error(" ".join(errors), errors=errors)
+
+    with transaction.atomic():
+        session = UploadSession.objects.create(user=request.user, assignment=assignment)
+        UploadSessionFile.objects.bulk_create(
+            [
+                UploadSessionFile(session=session, index=index, name=name, size=size)
+                for index, (name, size) in enumerate(declared)
+            ]
+        )
+        enqueue(
+            "submissions.expire_upload_session",
+            {"session_id": str(session.pk)},
+            delay=settings.SUBMISSION_UPLOAD_SESSION_MAX_AGE_HOURS * 3600,
+        )
+    session.directory.mkdir(parents=True, exist_ok=True)
+    return JsonResponse(_session_payload(session), status=201)
+
+
+@login_required
+@require_GET
+def upload_status(request, session_id):
+    session = _own_session(request, session_id)
+    if session is None:
+        return _error("forbidden", status=403)
+    return JsonResponse(_session_payload(session))
+
+
+@login_required
+@require_http_methods(["PUT"])
+@csrf_protect
+def upload_chunk(request, session_id, index):
+    session = _own_session(request, session_id)
+    if session is None:
+        return _error("forbidden", status=403)
+    if session.status != UploadSession.STATUS_OPEN:
+        return _error("تم إنهاء جلسة الرفع.", status=409)
+    upload = next((item for item in session.files.all() if item.index == index), None)
+    if upload is None:
+        return _error("ملف غير موجود في الجلسة.", status=404)
+
+    try:
+        offset = int(request.GET.get("offset", ""))
+    except ValueError:
+        return _error("offset مطلوب.")
+    if offset != upload.received:
+        # مقطع مكرر أو خارج الترتيب؛ يستأنف العميل من القيمة المعادة.
+        return _error("offset غير متوافق.", status=409, received=upload.received)
+
+    chunk = request.body
+    if not chunk or len(chunk) > UPLOAD_CHUNK_BYTES or offset + len(chunk) > upload.size:
+        return _error("حجم المقطع غير صالح.", received=upload.received)
+    expected = request.headers.get("X-Chunk-SHA256", "").lower()
+    if hashlib.sha256(chunk).hexdigest() != expected:
+        return _error("بصمة المقطع غير مطابقة.", status=422, received=upload.received)
+
+    path = upload.part_path
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "r+b" if path.exists() else "wb") as handle:
+        handle.seek(offset)
+        handle.write(chunk)
+        handle.truncate()
+    # تحديث مشروط: طلبان متزامنان بنفس offset لا يتقدم إلا أحدهما.
+    advanced = UploadSessionFile.objects.filter(pk=upload.pk, received=offset).update(
+        received=F("received") + len(chunk)
+    )
+    if not advanced:
+        upload.refresh_from_db(fields=["received"])
+        return _error("offset غير متوافق.", status=409, received=upload.received)
+    digest = _advance_hash(upload, offset, chunk)
+    if digest:
+        UploadSessionFile.objects.filter(pk=upload.pk).update(sha256=digest)
+    UploadSession.objects.filter(pk=session.pk).update(updated_at=timezone.now())
+    return JsonResponse({"index": index, "received": offset + len(chunk)})
+
+
+def _advance_hash(upload, offset, chunk) -> str:
+    """Feed ``chunk`` into the file's running SHA-256; return the digest once the file is complete."""
+    with _running_hashes_lock:
+        entry = _running_hashes.pop(upload.pk, None)
+    if offset == 0:
+        entry = (0, hashlib.sha256())
+    if entry is None or entry[0] != offset:
+        # مقاطع سابقة وصلت إلى عملية أخرى؛ البصمة تُحسب عند الإنهاء.
+        return ""
+    hasher = entry[1]
+    hasher.update(chunk)
+    received = offset + len(chunk)
+    if received == upload.size:
+        return hasher.hexdigest()
+    with _running_hashes_lock:
+        _running_hashes[upload.pk] = (received, hasher)
+        while len(_running_hashes) > RUNNING_HASHES_MAX:
+            _running_hashes.popitem(last=False)
+    return ""
+
+
+def _sha256_path(path):
+    hasher = hashlib.sha256()
+    with open(path, "rb") as handle:
+        for block in iter(lambda: handle.read(1024 * 1024), b""):
+            hasher.update(block)
+    return hasher.hexdigest()
+
+
+def _stage(upload):
+    """A ``StagedFile`` over a hard link to the upload's part, which blob storage may rename away."""
+    part = upload.part_path
+    link = part.with_suffix(".staged")
+    link.unlink(missing_ok=True)
+    try:
+        os.link(part, link)
+    except OSError:
+        # نظام ملفات بلا روابط صلبة؛ الملف لا يتجاوز 10MB فالنسخ مقبول. الجزء المفقود يرفع FileNotFoundError هنا أيضاً.
+        shutil.copyfile(part, link)
+    return StagedFile(link, upload.name, upload.sha256 or _sha256_path(part))
+
+
+@login_required
+@student_verified_required
+@require_POST
+@csrf_protect
+def upload_finalize(request, session_id):
+    session = _own_session(request, session_id)
+    if session is None:
+        return _error("forbidden", status=403)
+    if session.status == UploadSession.STATUS_FINALIZED:
+        return JsonResponse(_session_payload(session))
+    blocked = _assignment_error(request.user, session.assignment)
+    if blocked:
+        return _error(blocked, status=403)
+    uploads = list(session.files.all())
+    missing = [upload.as_payload() for upload in uploads if not upload.complete]
+    if missing:
+        return _error("لم تكتمل كل الملفات بعد.", status=409, files=missing)
+
+    staged = []
+    try:
+        for upload in uploads:
+            staged.append(_stage(upload))
+    except FileNotFoundError:
+        for file_obj in staged:
+            file_obj.close()
+        # المجلد حُذف (انتهت الجلسة أو نُظّفت) فلا يمكن إكمالها.
+        return _error("انتهت صلاحية جلسة الرفع. ابدأ الرفع من جديد.", status=410)
+    try:
+        with transaction.atomic():
+            # القفل على صف الجلسة يمنع إنهاءين متزامنين من إنشاء تسليمين.
+            locked = UploadSession.objects.select_for_update().get(pk=session.pk)
+            if locked.status == UploadSession.STATUS_FINALIZED:
+                return JsonResponse(_session_payload(locked))
+            submission = Submission.objects.create(assignment=session.assignment, user=request.user)
+            attachments = [SubmissionAttachment(submission=submission, file=file_obj) for file_obj in staged]
+            for attachment in attachments:
+                attachment.full_clean()
+            for attachment in attachments:
+                attachment.save()
+            locked.status = UploadSession.STATUS_FINALIZED
+            locked.submission = submission
+            locked.save(update_fields=["status", "submission", "updated_at"])
+    except ValidationError as exc:
+        return _error(" ".join(exc.messages), status=422)
+    except FileNotFoundError:
+        return _error("انتهت صلاحية جلسة الرفع. ابدأ الرفع من جديد.", status=410)
+    except (OperationalError, ProgrammingError):
+        return _error("تعذّر حفظ التسليم. حاول مجدداً.", status=503)
+    finally:
+        for file_obj in staged:
+            file_obj.close()
+
+    shutil.rmtree(session.directory, ignore_errors=True)
+    messages.success(request, f"تم رفع {len(staged)} ملف/مرفق بنجاح.")
+    return JsonResponse(_session_payload(locked), status=201)
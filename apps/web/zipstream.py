@@ -0,0 +1,91 @@
+"""Write a ZIP archive as a stream of byte chunks.
+
+``zipfile`` can write to an unseekable target: it then puts each
+member's CRC and sizes in a data descriptor after the data instead of
+going back to patch the local header. ``stream_zip`` gives it a sink
+that only counts and buffers bytes, and yields whatever is buffered after
+every chunk of input, so memory stays at about one read buffer no matter
+how large the archive gets.
+"""
+import os
+import time
+import zipfile
+from dataclasses import dataclass
+from typing import Iterable, Optional
+
+READ_CHUNK = 1024 * 1024
+# صيغ مضغوطة أصلاً؛ ضغطها مجدداً يستهلك المعالج دون أن يصغّر الحجم.
+STORED_EXTS = {".zip", ".docx", ".xlsx", ".pptx", ".png", ".jpg", ".jpeg", ".gif", ".mp4", ".gz", ".7z", ".rar"}
+
+
+@dataclass
+class ZipMember:
+    name: str
+    chunks: Iterable[bytes]
+    size: Optional[int] = None
+    modified: Optional[float] = None
+    compress: bool = True
+
+
+class _Sink:
+    def __init__(self):
+        self._parts = []
+        self._offset = 0
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        self._offset += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._offset
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts.clear()
+        return data
+
+
+def file_chunks(path, chunk_size=READ_CHUNK):
+    with open(path, "rb") as handle:
+        while True:
+            block = handle.read(chunk_size)
+            if not block:
+                return
+            yield block
+
+
+def file_member(name, path) -> ZipMember:
+    stat = os.stat(path)
+    return ZipMember(
+        name=name,
+        chunks=file_chunks(path),
+        size=stat.st_size,
+        modified=stat.st_mtime,
+        compress=os.path.splitext(name)[1].lower() not in STORED_EXTS,
+    )
+
+
+def stream_zip(members: Iterable[ZipMember]):
+    sink = _Sink()
+    with zipfile.ZipFile(sink, "w", allowZip64=True) as archive:
+        for member in members:
+            info = zipfile.ZipInfo(member.name, date_time=time.localtime(member.modified or time.time())[:6])
+            info.compress_type = zipfile.ZIP_DEFLATED if member.compress else zipfile.ZIP_STORED
+            info.external_attr = 0o644 << 16
+            if member.size is not None:
+                # الحجم المعروف مسبقاً يحدد هل يلزم ZIP64 لهذا العضو.
+                info.file_size = member.size
+            with archive.open(info, "w", force_zip64=member.size is None) as target:
+                for chunk in member.chunks:
+                    target.write(chunk)
+                    data = sink.drain()
+                    if data:
+                        yield data
+            data = sink.drain()
+            if data:
+                yield data
+    yield sink.drain()
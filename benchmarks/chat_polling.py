@@ -0,0 +1,102 @@
+"""Load test for the chat polling endpoints: sync (WSGI) vs async (ASGI).
+
+Start both deployments against the same database, then point this script
+at each of them with a logged-in session cookie::
+
+    gunicorn config.wsgi:application -w 4 -b 127.0.0.1:8001
+    CHAT_ASYNC_VIEWS=1 gunicorn config.asgi:application \\
+        -k uvicorn.workers.UvicornWorker -w 4 -b 127.0.0.1:8002
+
+    python benchmarks/chat_polling.py --session <sessionid> \\
+        --base http://127.0.0.1:8001 --base http://127.0.0.1:8002 \\
+        --path /chat/api/unread-count/ --concurrency 200 --duration 20
+
+Each virtual client loops on GET ``--path`` for ``--duration`` seconds.
+The report gives throughput, errors and latency percentiles per base URL.
+Only the standard library is used.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from urllib.parse import urlsplit
+
+
+async def _request(host, port, path, cookie, timeout):
+    reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+    try:
+        writer.write(
+            (
+                f"GET {path} HTTP/1.1\r\n"
+                f"Host: {host}:{port}\r\n"
+                f"Cookie: sessionid={cookie}\r\n"
+                "Accept: application/json\r\n"
+                "Connection: close\r\n\r\n"
+            ).encode()
+        )
+        await writer.drain()
+        status_line = await asyncio.wait_for(reader.readline(), timeout)
+        await asyncio.wait_for(reader.read(), timeout)
+        return int(status_line.split()[1])
+    finally:
+        writer.close()
+
+
+async def _client(target, args, deadline, latencies, errors):
+    host, port, path = target
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        try:
+            status = await _request(host, port, path, args.session, args.timeout)
+        except (OSError, asyncio.TimeoutError, IndexError, ValueError):
+            errors.append("connection")
+            continue
+        if status != 200:
+            errors.append(status)
+            continue
+        latencies.append(time.perf_counter() - started)
+
+
+def _percentile(values, fraction):
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    index = min(int(round(fraction * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+async def _run(base, args):
+    parts = urlsplit(base)
+    target = (parts.hostname, parts.port or 80, args.path)
+    latencies, errors = [], []
+    deadline = time.perf_counter() + args.duration
+    await asyncio.gather(
+        *(_client(target, args, deadline, latencies, errors) for _ in range(args.concurrency))
+    )
+    ms = [value * 1000 for value in latencies]
+    print(f"{base}{args.path}")
+    print(f"  concurrency   {args.concurrency}")
+    print(f"  requests      {len(latencies)} ok, {len(errors)} failed")
+    print(f"  throughput    {len(latencies) / args.duration:.1f} req/s")
+    if ms:
+        print(f"  latency mean  {statistics.mean(ms):.1f} ms")
+        print(f"  latency p50   {_percentile(ms, 0.50):.1f} ms")
+        print(f"  latency p95   {_percentile(ms, 0.95):.1f} ms")
+        print(f"  latency p99   {_percentile(ms, 0.99):.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base", action="append", required=True, help="Server base URL; repeat to compare.")
+    parser.add_argument("--session", required=True, help="Value of the sessionid cookie of a chat user.")
+    parser.add_argument("--path", default="/chat/api/unread-count/")
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--duration", type=float, default=15.0)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    args = parser.parse_args()
+    for base in args.base:
+        asyncio.run(_run(base, args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""Throughput of the submission upload path: default handlers vs HashingUploadHandler.
+
+Builds one multipart body holding ``--files`` attachments that add up to
+``--size-mb`` megabytes, then for each round parses it and stores every
+file the way ``submission_create`` does:
+
+* ``default``: Django's memory/temp-file handlers, a second read of each
+  file for the SHA-256 in ``SubmissionAttachment.save``, and a copy (or
+  rename, when ``FILE_UPLOAD_TEMP_DIR`` shares the filesystem) into media.
+* ``hashing``: ``HashingUploadHandler`` hashes while parsing and spools
+  into ``SUBMISSION_UPLOAD_TEMP_DIR`` so the storage renames the file.
+
+Run from the project root::
+
+    python benchmarks/upload_bench.py --size-mb 10 --files 4 --rounds 20
+
+Files are written to a throwaway directory under ``--workdir`` (the
+system temp directory by default); put it on the same disk as
+``MEDIA_ROOT`` to measure what production sees.
+"""
+import argparse
+import io
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.core.files.storage import FileSystemStorage  # noqa: E402
+from django.core.files.uploadhandler import load_handler  # noqa: E402
+from django.http.multipartparser import MultiPartParser  # noqa: E402
+from django.test.client import BOUNDARY, MULTIPART_CONTENT, encode_multipart  # noqa: E402
+
+from apps.submissions.models import _sha256_file  # noqa: E402
+from apps.submissions.uploadhandlers import HashingUploadHandler  # noqa: E402
+
+
+def _build_body(total_bytes, count):
+    size = total_bytes // count
+    files = []
+    for index in range(count):
+        file_obj = io.BytesIO(os.urandom(size))
+        file_obj.name = f"part-{index}.pdf"
+        files.append(file_obj)
+    return encode_multipart(BOUNDARY, {"files": files})
+
+
+def _parse(body, handlers):
+    meta = {"CONTENT_TYPE": MULTIPART_CONTENT, "CONTENT_LENGTH": str(len(body))}
+    _, files = MultiPartParser(meta, io.BytesIO(body), handlers, "utf-8").parse()
+    return files.getlist("files")
+
+
+def _default_round(body, storage):
+    handlers = [load_handler(path) for path in settings.FILE_UPLOAD_HANDLERS]
+    for upload in _parse(body, handlers):
+        upload.seek(0)
+        _sha256_file(upload)
+        upload.seek(0)
+        storage.save(f"submission_files/{upload.name}", upload)
+        upload.close()
+
+
+def _hashing_round(body, storage):
+    for upload in _parse(body, [HashingUploadHandler()]):
+        assert upload.sha256
+        storage.save(f"submission_files/{upload.name}", upload)
+        upload.close()
+
+
+MODES = {"default": _default_round, "hashing": _hashing_round}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size-mb", type=float, default=10.0, help="Total payload per submission.")
+    parser.add_argument("--files", type=int, default=4, help="Attachments per submission.")
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--workdir", default=tempfile.gettempdir())
+    args = parser.parse_args()
+
+    body = _build_body(int(args.size_mb * 1024 * 1024), args.files)
+    payload_mb = len(body) / (1024 * 1024)
+    print(f"body: {payload_mb:.1f} MB, {args.files} files, {args.rounds} rounds")
+
+    for mode, run in MODES.items():
+        root = Path(tempfile.mkdtemp(prefix="upload-bench-", dir=args.workdir))
+        settings.SUBMISSION_UPLOAD_TEMP_DIR = root / "media" / ".incoming"
+        storage = FileSystemStorage(location=root / "media")
+        timings = []
+        try:
+            for _ in range(args.rounds):
+                started = time.perf_counter()
+                run(body, storage)
+                timings.append(time.perf_counter() - started)
+        finally:
+            shutil.rmtree(root, ignore_errors=True)
+        median = statistics.median(timings)
+        print(
+            f"{mode:8} median {median * 1000:8.1f} ms  "
+            f"best {min(timings) * 1000:8.1f} ms  "
+            f"{payload_mb / median:8.1f} MB/s"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,14 @@
-﻿"""ASGI config for task_exchange_project."""
+﻿"""ASGI config for task_exchange_project.
+
+Serves the whole site, including the chat event stream
+(``web:chat_stream``), which needs an ASGI server to hold many open
+connections cheaply, e.g.::
+
+    CHAT_ASYNC_VIEWS=1 gunicorn config.asgi:application -k uvicorn.workers.UvicornWorker -w 4
+
+``CHAT_ASYNC_VIEWS=1`` routes the polling endpoints to the async views
+in ``apps.web.views_async``.
+"""
 import os
 
 from django.core.asgi import get_asgi_application
@@ -1,4 +1,6 @@
 ﻿"""ط¥ط¹ط¯ط§ط¯ط§طھ ظ…ط´ط±ظˆط¹ Django ظ„ظ€ task_exchange_project."""
+import os
+import tempfile
 from pathlib import Path
 
 from django.contrib.messages import constants as messages
@@ -25,6 +27,7 @@ INSTALLED_APPS = [
     "apps.courses",
     "apps.assignments",
     "apps.submissions",
+    "apps.jobs",
     "apps.messaging",  # ظ…ظ‡ظ…
 ]
 
@@ -63,9 +66,17 @@ DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": BASE_DIR / "db.sqlite3",
-    }
+    },
+    # الدردشة في ملف مستقل حتى لا تنتظر عمليات الرفع والتقييم قفل الكتابة خلف رسائلها.
+    # بعد الترحيل: python manage.py migrate --database=messaging
+    "messaging": {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": BASE_DIR / "messaging.sqlite3",
+    },
 }
 
+DATABASE_ROUTERS = ["apps.messaging.routers.MessagingRouter"]
+
 AUTH_PASSWORD_VALIDATORS = [
     {"NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator"},
     {"NAME": "django.contrib.auth.password_validation.MinimumLengthValidator"},
@@ -86,9 +97,31 @@ STATICFILES_STORAGE = "whitenoise.storage.CompressedManifestStaticFilesStorage"
 
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
+# مجلد مؤقت لرفع ملفات التسليمات داخل MEDIA_ROOT حتى يُنقل الملف إلى مكانه النهائي بإعادة تسمية لا بنسخ.
+SUBMISSION_UPLOAD_TEMP_DIR = MEDIA_ROOT / ".incoming"
+# ملفات التسليمات والواجبات تُنزَّل عبر عروض تتحقق من الصلاحية. "nginx" يسلّم النقل إلى nginx عبر
+# X-Accel-Redirect (موقع internal مرتبط بـ MEDIA_ROOT)، و"apache" عبر X-Sendfile؛ فارغ يعني البث من Django.
+PROTECTED_MEDIA_SERVER = os.environ.get("PROTECTED_MEDIA_SERVER", "")
+PROTECTED_MEDIA_INTERNAL_URL = "/protected-media/"
+# جلسة رفع مقسّم لم يصلها مقطع خلال هذه المدة تُحذف مع ملفاتها الجزئية.
+SUBMISSION_UPLOAD_SESSION_MAX_AGE_HOURS = 24
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
+# مجلد مقابس Unix التي تنقل أحداث الدردشة بين عمليات الخادم على نفس الجهاز.
+CHAT_BUS_DIR = Path(tempfile.gettempdir()) / "task_exchange_chat_bus"
+# فعّلها عند التشغيل عبر config.asgi لتوجيه واجهات الدردشة إلى العروض غير المتزامنة.
+CHAT_ASYNC_VIEWS = os.environ.get("CHAT_ASYNC_VIEWS", "0") == "1"
+
+# مدة حجز المهمة الخلفية لعامل واحد؛ العامل يجددها أثناء التنفيذ، وإن توقف تعود المهمة للطابور بعدها.
+JOBS_LEASE_SECONDS = 300
+# تأخير إعادة المحاولة يتضاعف مع كل فشل بدءاً من هذه القيمة حتى الحد الأقصى.
+JOBS_RETRY_BASE_SECONDS = 30
+JOBS_RETRY_MAX_SECONDS = 3600
+
+# مدة حجز التسليم لمعلم في قائمة التقييم؛ صفحة التقييم تجددها ما دامت مفتوحة.
+GRADING_LEASE_SECONDS = 900
+
 LOGIN_URL = "/login/"
 LOGIN_REDIRECT_URL = "/"
 LOGOUT_REDIRECT_URL = "/login/"
@@ -128,6 +161,7 @@ JAZZMIN_SETTINGS = {
         "submissions.SubmissionAttachment",
         "messaging.Conversation",
         "messaging.Message",
+        "jobs.Job",
     ],
     "icons": {
         "accounts.Profile": "fas fa-id-badge",
@@ -139,6 +173,7 @@ JAZZMIN_SETTINGS = {
         "submissions.Submissionattachment": "fas fa-paperclip",
         "messaging.Conversation": "fas fa-comments",
         "messaging.Message": "fas fa-comment-dots",
+        "jobs.Job": "fas fa-cogs",
         "auth.User": "fas fa-user",
         "auth.Group": "fas fa-users",
     },
@@ -148,6 +183,7 @@ JAZZMIN_SETTINGS = {
         {"label": "الواجبات", "icon": "fas fa-tasks", "models": ("assignments.Assignment",)},
         {"label": "التسليمات", "icon": "fas fa-inbox", "models": ("submissions.Submission", "submissions.SubmissionAttachment")},
         {"label": "المراسلات", "icon": "fas fa-comments", "models": ("messaging.Conversation", "messaging.Message")},
+        {"label": "المهام الخلفية", "icon": "fas fa-cogs", "models": ("jobs.Job",)},
         {"label": "إدارة المستخدمين", "icon": "fas fa-user-shield", "models": ("auth.User", "auth.Group")},
     ],
     "custom_links": {